@@ -4,10 +4,16 @@ Tracks all actions taken on each booking
 """
 import json
 import os
+import sqlite3
+import threading
+import uuid
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 
+ACTION_ITEMS_DB = "action_items.db"
+
+# Legacy whole-file store; imported into ACTION_ITEMS_DB on first use
 ACTION_ITEMS_FILE = "action_items.json"
 
 class ActionItem(BaseModel):
@@ -19,90 +25,188 @@ class ActionItem(BaseModel):
     timestamp: str
     metadata: Optional[Dict[str, Any]] = None
 
+_COLUMNS = "id, booking_id, action_type, description, performed_by, timestamp, metadata"
+
+def _to_item(row) -> ActionItem:
+    item_id, booking_id, action_type, description, performed_by, timestamp, metadata = row
+    return ActionItem(
+        id=item_id,
+        booking_id=booking_id,
+        action_type=action_type,
+        description=description,
+        performed_by=performed_by,
+        timestamp=timestamp,
+        metadata=json.loads(metadata) if metadata else {}
+    )
+
+class ActionLog:
+    """
+    Append-only SQLite (WAL) log of action items.
+
+    Adding is one INSERT, deleting one DELETE by id; nothing rewrites the
+    store. Indexes on (booking_id, seq) and timestamp serve per-booking and
+    most-recent reads without scanning every action. A revision counter,
+    bumped in the same transaction as each write, tells caches when to
+    refresh.
+    """
+
+    def __init__(self, path=ACTION_ITEMS_DB, legacy_path=ACTION_ITEMS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS action_items (
+                   seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                   id TEXT UNIQUE,
+                   booking_id INTEGER NOT NULL,
+                   action_type TEXT NOT NULL,
+                   description TEXT NOT NULL,
+                   performed_by TEXT NOT NULL,
+                   timestamp TEXT NOT NULL,
+                   metadata TEXT
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_action_booking ON action_items(booking_id, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_action_timestamp ON action_items(timestamp)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS action_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # The instance id tells a recreated database apart from the old one
+        self._conn.execute(
+            "INSERT OR IGNORE INTO action_meta VALUES ('instance', ?), ('revision', '0')", (uuid.uuid4().hex[:8],)
+        )
+        self._conn.commit()
+        if legacy_path and os.path.exists(legacy_path):
+            self.migrate(legacy_path)
+
+    def _bump_revision(self):
+        self._conn.execute("UPDATE action_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+
+    def migrate(self, legacy_path):
+        """Import a legacy action_items.json (kept as <name>.migrated)"""
+        with open(legacy_path, 'r') as f:
+            items = json.load(f)
+        actions = sorted(
+            (action for booking_actions in items.values() for action in booking_actions),
+            key=lambda action: action['timestamp']
+        )
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO action_items ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (action['id'], int(action['booking_id']), action['action_type'], action['description'],
+                     action['performed_by'], action['timestamp'], json.dumps(action.get('metadata') or {}))
+                    for action in actions
+                ]
+            )
+            self._bump_revision()
+            self._conn.commit()
+        os.replace(legacy_path, legacy_path + '.migrated')
+        print(f"📥 Migrated {len(actions)} action items from {legacy_path} to {self.path}")
+
+    def version(self) -> str:
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT key, value FROM action_meta").fetchall())
+        return f"{rows['instance']}-{rows['revision']}"
+
+    def add(self, booking_id: int, action_type: str, description: str,
+            performed_by: str, metadata: Optional[Dict] = None) -> ActionItem:
+        timestamp = datetime.now()
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT INTO action_items ({_COLUMNS}) VALUES (NULL, ?, ?, ?, ?, ?, ?)",
+                (booking_id, action_type, description, performed_by,
+                 timestamp.isoformat(), json.dumps(metadata or {}))
+            )
+            # The sequence number keeps ids unique even after deletes
+            action_id = f"{booking_id}_{cursor.lastrowid}_{timestamp.strftime('%Y%m%d%H%M%S')}"
+            self._conn.execute("UPDATE action_items SET id = ? WHERE seq = ?", (action_id, cursor.lastrowid))
+            self._bump_revision()
+            self._conn.commit()
+        return ActionItem(
+            id=action_id,
+            booking_id=booking_id,
+            action_type=action_type,
+            description=description,
+            performed_by=performed_by,
+            timestamp=timestamp.isoformat(),
+            metadata=metadata or {}
+        )
+
+    def for_booking(self, booking_id: int) -> List[ActionItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM action_items WHERE booking_id = ? ORDER BY seq", (booking_id,)
+            ).fetchall()
+        return [_to_item(row) for row in rows]
+
+    def recent(self, limit: int) -> List[ActionItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM action_items ORDER BY timestamp DESC, seq DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_to_item(row) for row in rows]
+
+    def all(self) -> List[ActionItem]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM action_items ORDER BY booking_id, seq").fetchall()
+        return [_to_item(row) for row in rows]
+
+    def delete(self, action_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM action_items WHERE id = ?", (action_id,)).rowcount
+            if deleted:
+                self._bump_revision()
+            self._conn.commit()
+        return bool(deleted)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_action_log() -> ActionLog:
+    """The shared ActionLog, opened (and migrated) on first use"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = ActionLog()
+        return _log
+
 class ActionItemsManager:
     """Manager for booking action items"""
 
     @staticmethod
-    def load_action_items() -> Dict[int, List[Dict]]:
-        """Load action items from file"""
-        if not os.path.exists(ACTION_ITEMS_FILE):
-            return {}
-
-        with open(ACTION_ITEMS_FILE, 'r') as f:
-            return json.load(f)
-
-    @staticmethod
-    def save_action_items(items: Dict[int, List[Dict]]):
-        """Save action items to file"""
-        with open(ACTION_ITEMS_FILE, 'w') as f:
-            json.dump(items, f, indent=2)
+    def version() -> str:
+        """Tag that changes whenever an action item is added or deleted"""
+        return get_action_log().version()
 
     @staticmethod
     def add_action_item(booking_id: int, action_type: str, description: str,
                        performed_by: str, metadata: Optional[Dict] = None) -> ActionItem:
         """Add a new action item for a booking"""
-        items = ActionItemsManager.load_action_items()
-
-        # Initialize booking's action list if it doesn't exist
-        if str(booking_id) not in items:
-            items[str(booking_id)] = []
-
-        # Create new action item
-        action_id = f"{booking_id}_{len(items[str(booking_id)]) + 1}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        action_item = {
-            "id": action_id,
-            "booking_id": booking_id,
-            "action_type": action_type,
-            "description": description,
-            "performed_by": performed_by,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
-
-        items[str(booking_id)].append(action_item)
-        ActionItemsManager.save_action_items(items)
-
-        return ActionItem(**action_item)
+        return get_action_log().add(booking_id, action_type, description, performed_by, metadata)
 
     @staticmethod
     def get_booking_actions(booking_id: int) -> List[ActionItem]:
         """Get all action items for a specific booking"""
-        items = ActionItemsManager.load_action_items()
-        booking_items = items.get(str(booking_id), [])
-        return [ActionItem(**item) for item in booking_items]
+        return get_action_log().for_booking(booking_id)
 
     @staticmethod
     def get_all_actions() -> Dict[int, List[ActionItem]]:
         """Get all action items grouped by booking_id"""
-        items = ActionItemsManager.load_action_items()
         result = {}
-        for booking_id, actions in items.items():
-            result[int(booking_id)] = [ActionItem(**item) for item in actions]
+        for action in get_action_log().all():
+            result.setdefault(action.booking_id, []).append(action)
         return result
 
     @staticmethod
     def delete_action_item(action_id: str) -> bool:
         """Delete a specific action item"""
-        items = ActionItemsManager.load_action_items()
-
-        for booking_id, actions in items.items():
-            for i, action in enumerate(actions):
-                if action['id'] == action_id:
-                    del items[booking_id][i]
-                    ActionItemsManager.save_action_items(items)
-                    return True
-        return False
+        return get_action_log().delete(action_id)
 
     @staticmethod
     def get_recent_actions(limit: int = 50) -> List[ActionItem]:
         """Get the most recent action items across all bookings"""
-        items = ActionItemsManager.load_action_items()
-        all_actions = []
-
-        for booking_id, actions in items.items():
-            all_actions.extend([ActionItem(**item) for item in actions])
-
-        # Sort by timestamp (newest first)
-        all_actions.sort(key=lambda x: x.timestamp, reverse=True)
-
-        return all_actions[:limit]
+        return get_action_log().recent(limit)
@@ -3,27 +3,69 @@ HCN Email Management System - Backend API
 FastAPI backend for React frontend
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-from datetime import timedelta
+from pydantic import BaseModel, Field
+from typing import Annotated, Optional, Dict, Any, List
+from datetime import date, timedelta
+from contextlib import asynccontextmanager
 import uvicorn
 from sending_update import HCNEmailManager
+from scheduler import Scheduler
+from imap_idle import InboxListener
+from config import ENABLE_SCHEDULER, ENABLE_IMAP_IDLE, HTTP_CACHE_ENABLED, HTTP_COMPRESSION_MIN_BYTES
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import json
 import threading
-import pandas as pd
 from auth import (
     authenticate_user, create_access_token, decode_token,
     Token, User, ACCESS_TOKEN_EXPIRE_MINUTES, get_user
 )
 from action_items import ActionItemsManager, ActionItem
+from booking_query import QueryError, query_bookings
+from serializers import format_record, frame_records, stream_json, summary_records
+from booking_store import lookup_key
+from http_cache import CacheStats, CompressionMiddleware, ConditionalGetMiddleware, etag_matches, make_etag
+from jobs import JobManager
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start the background scheduler / IMAP listener with the server when enabled"""
+    if scheduler is not None:
+        scheduler.start()
+    if inbox_listener is not None:
+        inbox_listener.start()
+    yield
+    if scheduler is not None:
+        scheduler.stop(timeout=5)
+    if inbox_listener is not None:
+        inbox_listener.stop(timeout=5)
+
+app = FastAPI(title="HCN Email Management API", lifespan=lifespan)
+
+# Read endpoints whose responses depend only on the booking and action item
+# data: (path prefix, answer 304 before running the endpoint). Action items sit
+# behind auth, so they are checked after the endpoint has authenticated.
+CACHE_RULES = [
+    ("/api/status", True),
+    ("/api/bookings", True),
+    ("/api/config", True),
+    ("/api/action-items", False),
+]
+cache_stats = CacheStats()
+
+if HTTP_CACHE_ENABLED:
+    app.add_middleware(
+        ConditionalGetMiddleware,
+        version=lambda: (manager.store.current_version(), ActionItemsManager.version()),
+        rules=CACHE_RULES,
+        stats=cache_stats
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=HTTP_COMPRESSION_MIN_BYTES, stats=cache_stats)
 
-app = FastAPI(title="HCN Email Management API")
-
-# CORS middleware to allow React frontend
+# CORS middleware to allow React frontend (added last so it also wraps 304s)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173"],  # React dev servers
@@ -34,9 +76,22 @@ app.add_middleware(
 
 # Global manager instance
 manager = HCNEmailManager()
-executor = ThreadPoolExecutor(max_workers=1)
+jobs = JobManager()
 processing_lock = threading.Lock()
 
+# Largest page the booking list endpoints return at once
+MAX_PAGE_SIZE = 5000
+
+# How often an open job event stream checks for new events
+JOB_EVENT_POLL_SECONDS = 0.25
+
+# How often an open change feed stream checks for new changes, and how long it
+# may stay silent before sending a keep-alive comment
+CHANGE_FEED_POLL_SECONDS = 1.0
+CHANGE_FEED_KEEPALIVE_SECONDS = 15.0
+scheduler = Scheduler(manager) if ENABLE_SCHEDULER else None
+inbox_listener = InboxListener(manager) if ENABLE_IMAP_IDLE else None
+
 # Security
 security = HTTPBearer()
 
@@ -55,6 +110,27 @@ class AddActionItemRequest(BaseModel):
 class ProcessRequest(BaseModel):
     action: str  # "send_emails", "check_inbox", "send_reminders", "full_process"
 
+# ProcessRequest action -> (manager stage, description)
+PROCESS_STAGES = {
+    "send_emails": ("send", "Sending initial emails"),
+    "check_inbox": ("inbox", "Inbox check"),
+    "send_reminders": ("reminders", "Sending reminders"),
+}
+
+class BookingListParams(BaseModel):
+    """Paging, projection, sorting and filters shared by the booking list endpoints"""
+    offset: int = Field(0, ge=0, description="Rows to skip (ignored with cursor)")
+    limit: Optional[int] = Field(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for every match")
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page")
+    fields: Optional[str] = Field(None, description="Comma-separated columns to return, e.g. FileNo,GuestName")
+    sort: Optional[str] = Field(None, description="Comma-separated columns, '-' for descending, e.g. -FromDate")
+    issue: Optional[str] = Field(None, description="received, critical, non_critical, pending (comma-separated)")
+    supplier: Optional[str] = None
+    city: Optional[str] = None
+    check_in_from: Optional[date] = None
+    check_in_to: Optional[date] = None
+    q: Optional[str] = Field(None, description="Guest name contains")
+
 # ==================== Response Models ====================
 
 class StatusResponse(BaseModel):
@@ -185,78 +261,60 @@ async def get_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/bookings")
-async def get_bookings():
-    """Get all bookings data"""
+@app.get("/api/status/breakdown")
+async def get_status_breakdown():
+    """Get status counts per supplier, hotel and city"""
     try:
-        df = manager.read_excel()
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-
-        # Convert to dict and handle NaN values
-        bookings = relevant.fillna('').to_dict('records')
-
-        # Convert datetime objects to strings
-        for booking in bookings:
-            for key, value in booking.items():
-                if hasattr(value, 'strftime'):
-                    booking[key] = value.strftime('%Y-%m-%d')
-
-        return {
-            "status": "success",
-            "count": len(bookings),
-            "bookings": bookings
-        }
+        return {"status": "success", "breakdowns": manager.get_status_breakdowns()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/bookings/pending")
-async def get_pending_bookings():
-    """Get bookings pending HCN"""
+def list_bookings(params: BookingListParams, issue: Optional[str] = None):
+    """Run a booking list query; `issue` overrides the client's issue filter"""
     try:
-        df = manager.read_excel()
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-        pending = relevant[relevant['Issue'].isna()]
-
-        bookings = pending.fillna('').to_dict('records')
-
-        for booking in bookings:
-            for key, value in booking.items():
-                if hasattr(value, 'strftime'):
-                    booking[key] = value.strftime('%Y-%m-%d')
-
-        return {
-            "status": "success",
-            "count": len(bookings),
-            "bookings": bookings
-        }
+        page, total, next_cursor = query_bookings(
+            manager.store.view(),
+            issue=issue or params.issue,
+            supplier=params.supplier,
+            city=params.city,
+            check_in_from=params.check_in_from,
+            check_in_to=params.check_in_to,
+            q=params.q,
+            sort=params.sort,
+            fields=params.fields,
+            offset=params.offset,
+            limit=params.limit,
+            cursor=params.cursor
+        )
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    envelope = {
+        "status": "success",
+        "count": len(page),
+        "total": total,
+        "offset": params.offset if not params.cursor else None,
+        "limit": params.limit,
+        "next_cursor": next_cursor
+    }
+    return StreamingResponse(stream_json(envelope, "bookings", frame_records(page)), media_type="application/json")
+
+@app.get("/api/bookings")
+async def get_bookings(params: Annotated[BookingListParams, Query()]):
+    """Get bookings (paged, filtered and sorted on request)"""
+    return list_bookings(params)
+
+@app.get("/api/bookings/pending")
+async def get_pending_bookings(params: Annotated[BookingListParams, Query()]):
+    """Get bookings pending HCN"""
+    return list_bookings(params, issue="pending")
+
 @app.get("/api/bookings/critical")
-async def get_critical_bookings():
+async def get_critical_bookings(params: Annotated[BookingListParams, Query()]):
     """Get bookings with critical issues"""
-    try:
-        df = manager.read_excel()
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-        critical = relevant[relevant['Issue'] == 'Critical']
-
-        bookings = critical.fillna('').to_dict('records')
-
-        for booking in bookings:
-            for key, value in booking.items():
-                if hasattr(value, 'strftime'):
-                    booking[key] = value.strftime('%Y-%m-%d')
-
-        return {
-            "status": "success",
-            "count": len(bookings),
-            "bookings": bookings
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return list_bookings(params, issue="critical")
 
 @app.get("/api/bookings/summary")
 async def get_bookings_summary():
@@ -264,132 +322,251 @@ async def get_bookings_summary():
     Get summary of all bookings with key details: guest name, dates, hotel, status
     """
     try:
-        df = manager.read_excel()
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-
-        # Create summary list
-        summaries = []
-        for _, row in relevant.iterrows():
-            summary = {
-                "booking_id": int(row['SrNo']) if pd.notna(row['SrNo']) else None,
-                "guest_name": str(row['GuestName']) if pd.notna(row['GuestName']) else '',
-                "check_in": row['FromDate'].strftime('%Y-%m-%d') if pd.notna(row['FromDate']) else '',
-                "check_out": row['ToDate'].strftime('%Y-%m-%d') if pd.notna(row['ToDate']) else '',
-                "hotel_name": str(row['HotelName']) if pd.notna(row['HotelName']) else '',
-                "city": str(row['CityName']) if pd.notna(row['CityName']) else '',
-                "status": str(row['Status']) if pd.notna(row['Status']) else '',
-                "issue": str(row['Issue']) if pd.notna(row['Issue']) else '',
-                "has_hcn": bool(pd.notna(row['SupplierHCN']) and str(row['SupplierHCN']).strip())
-            }
-            summaries.append(summary)
-
-        return {
-            "status": "success",
-            "count": len(summaries),
-            "bookings": summaries
-        }
+        summaries = summary_records(manager.store.relevant())
+        envelope = {"status": "success", "count": len(summaries)}
+        return StreamingResponse(stream_json(envelope, "bookings", summaries), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def booking_details(booking, booking_id, request: Request, response: Response):
+    """
+    Detail payload of a booking row (BookingStore.lookup). Answers 304 when the client's
+    If-None-Match still matches: the tag covers the row's values and the
+    action items, so nothing is serialized for an unchanged booking.
+    """
+    etag = make_etag(tuple(booking.values()), ActionItemsManager.version())
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
+
+    booking_data = format_record({key: value for key, value in booking.items() if key != 'Status_lower'})
+
+    # Get action items for this booking
+    action_items = ActionItemsManager.get_booking_actions(booking_id)
+
+    # Extract key information for easier access
+    details = {
+        "status": "success",
+        "booking_id": booking_id,
+        "guest_name": booking_data.get('GuestName', ''),
+        "check_in": booking_data.get('FromDate', ''),
+        "check_out": booking_data.get('ToDate', ''),
+        "hotel_name": booking_data.get('HotelName', ''),
+        "city": booking_data.get('CityName', ''),
+        "country": booking_data.get('CountryName', ''),
+        "booking_date": booking_data.get('BookingDate', ''),
+        "file_no": booking_data.get('FileNo', ''),
+        "room_type": booking_data.get('RoomType', ''),
+        "num_rooms": booking_data.get('NoOFRooms', 0),
+        "num_pax": booking_data.get('NoOfPax', 0),
+        "status": booking_data.get('Status', ''),
+        "supplier_name": booking_data.get('SupplierName', ''),
+        "supplier_ref": booking_data.get('SupplierRef', ''),
+        "supplier_hcn": booking_data.get('SupplierHCN', ''),
+        "agent_name": booking_data.get('AgentName', ''),
+        "agent_email": booking_data.get('Agent Email', ''),
+        "issue": booking_data.get('Issue', ''),
+        "email_sent": booking_data.get('EmailSent', ''),
+        "email_sent_time": booking_data.get('EmailSentTime', ''),
+        "reminder_sent": booking_data.get('ReminderSent', ''),
+        "reminder_time": booking_data.get('ReminderTime', ''),
+        "action_items": [item.dict() for item in action_items],  # Include action items
+        "full_details": booking_data  # Complete booking data
+    }
+
+    return details
+
+@app.get("/api/bookings/by-file/{file_no}")
+async def get_booking_details_by_file_no(file_no: str, request: Request, response: Response):
+    """Get detailed information for a booking by its FileNo (e.g. OSTR100028)"""
+    try:
+        booking = manager.store.lookup('FileNo', file_no)
+        if booking is None:
+            raise HTTPException(status_code=404, detail=f"Booking with FileNo {file_no} not found")
+        return booking_details(booking, lookup_key(booking.get('SrNo')), request, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/bookings/{booking_id}")
-async def get_booking_details(booking_id: int):
+async def get_booking_details(booking_id: int, request: Request, response: Response):
     """
     Get detailed information for a specific booking
     Returns: guest name, check-in/check-out dates, hotel info, and all other booking details
     """
     try:
-        df = manager.read_excel()
-
         # Find booking by SrNo (serial number)
-        booking = df[df['SrNo'] == booking_id]
-
-        if booking.empty:
+        booking = manager.store.lookup('SrNo', booking_id)
+        if booking is None:
             raise HTTPException(status_code=404, detail=f"Booking with ID {booking_id} not found")
-
-        # Convert to dict
-        booking_data = booking.fillna('').to_dict('records')[0]
-
-        # Convert datetime objects to strings
-        for key, value in booking_data.items():
-            if hasattr(value, 'strftime'):
-                booking_data[key] = value.strftime('%Y-%m-%d')
-
-        # Get action items for this booking
-        action_items = ActionItemsManager.get_booking_actions(booking_id)
-
-        # Extract key information for easier access
-        details = {
-            "status": "success",
-            "booking_id": booking_id,
-            "guest_name": booking_data.get('GuestName', ''),
-            "check_in": booking_data.get('FromDate', ''),
-            "check_out": booking_data.get('ToDate', ''),
-            "hotel_name": booking_data.get('HotelName', ''),
-            "city": booking_data.get('CityName', ''),
-            "country": booking_data.get('CountryName', ''),
-            "booking_date": booking_data.get('BookingDate', ''),
-            "file_no": booking_data.get('FileNo', ''),
-            "room_type": booking_data.get('RoomType', ''),
-            "num_rooms": booking_data.get('NoOFRooms', 0),
-            "num_pax": booking_data.get('NoOfPax', 0),
-            "status": booking_data.get('Status', ''),
-            "supplier_name": booking_data.get('SupplierName', ''),
-            "supplier_ref": booking_data.get('SupplierRef', ''),
-            "supplier_hcn": booking_data.get('SupplierHCN', ''),
-            "agent_name": booking_data.get('AgentName', ''),
-            "agent_email": booking_data.get('Agent Email', ''),
-            "issue": booking_data.get('Issue', ''),
-            "email_sent": booking_data.get('EmailSent', ''),
-            "email_sent_time": booking_data.get('EmailSentTime', ''),
-            "reminder_sent": booking_data.get('ReminderSent', ''),
-            "reminder_time": booking_data.get('ReminderTime', ''),
-            "action_items": [item.dict() for item in action_items],  # Include action items
-            "full_details": booking_data  # Complete booking data
-        }
-
-        return details
+        return booking_details(booking, booking_id, request, response)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/process", response_model=ProcessResponse)
+@app.post("/api/process", response_model=ProcessResponse, status_code=202)
 async def process_emails(request: ProcessRequest):
     """
-    Process emails based on action:
+    Start processing in the background and return its job id:
     - full_process: Run complete process (send → check → remind)
     - send_emails: Send initial emails only
     - check_inbox: Check inbox and analyze only
     - send_reminders: Send reminders only
+    Follow it with GET /api/jobs/{job_id} or GET /api/jobs/{job_id}/events.
     """
+    if request.action == "full_process":
+        description = "Full process"
+        run = lambda progress: manager.process_all(progress=progress)
+    elif request.action in PROCESS_STAGES:
+        stage, description = PROCESS_STAGES[request.action]
+        run = lambda progress: {"stage": stage, "result": manager.run_stage(stage, progress=progress)}
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {request.action}")
 
     # Check if already processing
     if not processing_lock.acquire(blocking=False):
         raise HTTPException(status_code=409, detail="Process already running")
 
     try:
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-
-        if request.action == "full_process":
-            await loop.run_in_executor(executor, manager.process_all)
-            return ProcessResponse(
-                status="success",
-                message="Full process completed successfully"
-            )
-        else:
-            raise HTTPException(status_code=400, detail=f"Unknown action: {request.action}")
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
+        job = jobs.submit(request.action, run, on_finish=processing_lock.release)
+    except Exception:
+        # The job never started, so on_finish will not release the lock
         processing_lock.release()
+        raise
+    return ProcessResponse(
+        status="accepted",
+        message=f"{description} started",
+        data={"job_id": job.id, "job": job.to_dict()}
+    )
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """Get recent processing jobs, newest first"""
+    return {"status": "success", "jobs": [job.to_dict() for job in jobs.list()]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get a job's state, current stage and counters"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events stream of a job's progress (emails sent, replies
+    classified, reminders sent, ...). Ends after the job's 'done' / 'error'
+    event; reconnecting with Last-Event-ID resumes after that event.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        last_id = int(request.headers.get('last-event-id', -1))
+    except ValueError:
+        last_id = -1
+
+    async def event_stream():
+        nonlocal last_id
+        while True:
+            # Read the state before draining so the final event is never missed
+            finished = job.done
+            for event in job.events_since(last_id):
+                last_id = event['id']
+                yield f"id: {event['id']}\ndata: {json.dumps(event, default=str)}\n\n"
+            if finished or await request.is_disconnected():
+                break
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/changes")
+async def stream_changes(request: Request, since: Optional[int] = None):
+    """
+    Server-Sent Events stream of booking changes. Each event carries the feed
+    version (also its SSE id) and the new status counts:
+    - snapshot: sent on connect with the current version
+    - bookings: changed fields per booking ({booking_id, file_no, fields})
+    - reset: changes are unknown (sheet edited outside a run, or the client's
+      version is too old); reload the booking lists
+    Reconnecting with Last-Event-ID (or ?since=) replays what was missed.
+    """
+    feed = manager.change_feed
+    last_event_id = request.headers.get('last-event-id')
+    if last_event_id is not None:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            since = None
+
+    def sse(event):
+        return f"id: {event['version']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    async def event_stream():
+        nonlocal since
+        if since is None:
+            event = await asyncio.to_thread(feed.current, manager.store)
+            since = event['version']
+            yield sse(event)
+
+        quiet = 0.0
+        while not await request.is_disconnected():
+            await asyncio.to_thread(feed.check_store, manager.store, manager.run_lock.locked())
+            events = feed.events_since(since)
+            if events is None:
+                event = await asyncio.to_thread(feed.current, manager.store)
+                events = [{**event, 'type': 'reset'}]
+            for event in events:
+                since = event['version']
+                yield sse(event)
+
+            if events:
+                quiet = 0.0
+            else:
+                quiet += CHANGE_FEED_POLL_SECONDS
+                if quiet >= CHANGE_FEED_KEEPALIVE_SECONDS:
+                    quiet = 0.0
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(CHANGE_FEED_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/scheduler")
+async def get_scheduler_status():
+    """Get background scheduler state and next/last run timings per stage"""
+    if scheduler is None:
+        return {"enabled": False, "running": False, "stages": []}
+    return {"enabled": True, **scheduler.status()}
+
+@app.get("/api/inbox-listener")
+async def get_inbox_listener_status():
+    """Get IMAP IDLE listener state"""
+    if inbox_listener is None:
+        return {"enabled": False, "running": False}
+    return {"enabled": True, **inbox_listener.status()}
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get conditional GET hit ratio and compression counters"""
+    return {"enabled": HTTP_CACHE_ENABLED, **cache_stats.to_dict()}
 
 @app.get("/api/config")
 async def get_config():
     """Get current configuration"""
-    from sending_update import (
+    from config import (
         GMAIL_ADDRESS, REMINDER_AFTER_HOURS,
         DAYS_TO_CHECK, DELAY_BETWEEN_EMAILS,
         COMPANY_NAME, SENDER_NAME
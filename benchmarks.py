@@ -0,0 +1,273 @@
+"""
+Benchmarks for HCN Email Management System
+Times the booking load/save paths against synthetic workbooks of different sizes
+
+Usage:
+    python benchmarks.py load [--rows 10000 100000]
+    python benchmarks.py save [--rows 1000 10000 50000] [--changes 1 10 100]
+    python benchmarks.py reminders [--rows 100000]
+    python benchmarks.py serialize [--rows 50000]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# The manager builds an OpenAI client on init; no request is ever made here
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ.setdefault('CLASSIFICATION_CACHE_ENABLED', 'false')
+
+from openpyxl import Workbook
+
+from booking_db import BookingRepository
+from booking_store import ChangeSet, RELEVANT_STATUSES
+from excel_loader import CALAMINE_AVAILABLE, read_bookings
+from sending_update import HCNEmailManager
+from serializers import ORJSON_AVAILABLE, frame_records, stream_json, summary_records
+
+BENCHMARK_COLUMNS = [
+    'SrNo', 'FileNo', 'BookingDate', 'GuestName', 'HotelName', 'CityName', 'CountryName',
+    'FromDate', 'ToDate', 'RoomType', 'NoOFRooms', 'NoOfPax', 'Status', 'SupplierName',
+    'SupplierRef', 'SupplierHCN', 'AgentName', 'Agent Email'
+]
+
+
+def make_workbook(path, sheet_name, rows):
+    """Write a synthetic booking sheet (title row, header on row 2, data from row 3)"""
+    rng = random.Random(rows)
+    base = datetime(2026, 1, 1)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(['Hotel Report'])
+    ws.append(BENCHMARK_COLUMNS)
+    for i in range(rows):
+        ws.append([
+            i + 1, f'OSTR{100000 + i}', base, f'MR. GUEST {i:06d}', f'Hotel {i % 97}',
+            f'City {i % 13}', 'India', base + timedelta(days=i % 60), base + timedelta(days=i % 60 + 2),
+            'Deluxe', 1, 2, rng.choice(['Confirmed', 'Vouchered', 'Cancelled']), f'Supplier {i % 7}',
+            f'SR{500000 + i}', None, 'Agent', f'agent{i}@example.com'
+        ])
+    wb.save(path)
+
+
+def apply_changes(df, count):
+    """Simulate a run that sent `count` emails; returns the ChangeSet"""
+    changes = ChangeSet()
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for idx in df.index[:count]:
+        changes.set(df, idx, 'EmailSent', 'Yes')
+        changes.set(df, idx, 'EmailSentTime', now)
+    return changes
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_load(rows_list):
+    """pd.read_excel vs. the streaming loader engines"""
+    engines = ['pandas', 'openpyxl'] + (['calamine'] if CALAMINE_AVAILABLE else [])
+    sheet_name = HCNEmailManager().sheet_name
+    workdir = tempfile.mkdtemp(prefix='hcn_bench_')
+    print(f"{'rows':>8} " + ' '.join(f"{engine:>10}" for engine in engines))
+    try:
+        for rows in rows_list:
+            path = os.path.join(workdir, f'bench_{rows}.xlsx')
+            make_workbook(path, sheet_name, rows)
+            timings = [timed(lambda: read_bookings(path, sheet_name, engine=engine)) for engine in engines]
+            print(f"{rows:>8} " + ' '.join(f"{timing:>9.2f}s" for timing in timings))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_save(rows_list, change_counts):
+    """Full-sheet save vs. ChangeSet save, for the Excel and SQLite backends"""
+    manager = HCNEmailManager()
+    workdir = tempfile.mkdtemp(prefix='hcn_bench_')
+    print(f"{'rows':>8} {'changed':>8} {'excel full':>11} {'excel dirty':>12} {'sqlite full':>12} {'sqlite dirty':>13}")
+    try:
+        for rows in rows_list:
+            template = os.path.join(workdir, f'template_{rows}.xlsx')
+            make_workbook(template, manager.sheet_name, rows)
+
+            for count in change_counts:
+                excel_path = os.path.join(workdir, 'bench.xlsx')
+                db_path = os.path.join(workdir, 'bench.db')
+                shutil.copy(template, excel_path)
+                if os.path.exists(db_path):
+                    os.remove(db_path)
+
+                manager.excel_path = excel_path
+                manager.store.path = excel_path
+                df = manager.read_excel()
+                repository = BookingRepository(db_path)
+                repository.import_dataframe(df)
+
+                changes = apply_changes(df, min(count, rows))
+                excel_full = timed(lambda: manager.save_excel(df))
+                excel_dirty = timed(lambda: manager.save_excel(df, changes))
+                sqlite_full = timed(lambda: repository.save(df))
+                sqlite_dirty = timed(lambda: repository.save(df, changes=changes))
+
+                print(f"{rows:>8} {count:>8} {excel_full:>10.2f}s {excel_dirty:>11.2f}s "
+                      f"{sqlite_full:>11.3f}s {sqlite_dirty:>12.3f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def make_tracking_frame(rows, now):
+    """Synthetic bookings with a spread of sent/reminded/issue states"""
+    rng = random.Random(rows)
+    sent_times = [
+        (now - timedelta(minutes=rng.randint(0, 600))).strftime('%Y-%m-%d %H:%M:%S') if i % 4 else None
+        for i in range(rows)
+    ]
+    df = pd.DataFrame({
+        'FileNo': [f'OSTR{100000 + i}' for i in range(rows)],
+        'Status': [rng.choice(['Confirmed', 'Vouchered', 'Cancelled']) for _ in range(rows)],
+        'EmailSent': ['Yes' if sent else None for sent in sent_times],
+        'EmailSentTime': sent_times,
+        'ReminderSent': [rng.choice(['Yes', None, None]) for _ in range(rows)],
+        'Issue': [rng.choice([None, None, 'Received', 'Critical', 'Non Critical']) for _ in range(rows)],
+    }, dtype=object)
+    df['Status_lower'] = df['Status'].str.lower().str.strip()
+    return df
+
+
+def legacy_reminder_candidates(df, reminder_threshold):
+    """The per-row reminder filter process_all used before it was vectorized"""
+    selected = []
+    for idx, row in df.iterrows():
+        if str(row.get('Status', '')).lower().strip() not in RELEVANT_STATUSES:
+            continue
+        if row.get('EmailSent') != 'Yes':
+            continue
+        issue = row.get('Issue')
+        if pd.notna(issue) and str(issue).strip() in ('Received', 'Critical'):
+            continue
+        if row.get('ReminderSent') == 'Yes':
+            continue
+        sent_time_str = row.get('EmailSentTime')
+        if pd.isna(sent_time_str) or str(sent_time_str).strip() == '':
+            continue
+        try:
+            if datetime.strptime(str(sent_time_str), '%Y-%m-%d %H:%M:%S') > reminder_threshold:
+                continue
+        except ValueError:
+            continue
+        selected.append(idx)
+    return selected
+
+
+def bench_reminders(rows_list):
+    """Per-row iterrows filter vs. find_reminder_candidates' vectorized mask"""
+    manager = HCNEmailManager()
+    now = datetime.now()
+    threshold = now - timedelta(hours=2)
+    print(f"{'rows':>8} {'due':>7} {'iterrows':>10} {'vectorized':>11}")
+    for rows in rows_list:
+        df = make_tracking_frame(rows, now)
+        legacy = []
+        vectorized = []
+        legacy_time = timed(lambda: legacy.extend(legacy_reminder_candidates(df, threshold)))
+        vector_time = timed(lambda: vectorized.extend(manager.find_reminder_candidates(df, threshold).index))
+        assert legacy == vectorized, "vectorized reminder selection differs from the per-row loop"
+        print(f"{rows:>8} {len(vectorized):>7} {legacy_time:>9.3f}s {vector_time:>10.3f}s")
+
+
+def legacy_booking_json(df):
+    """The booking list encoding the API used before serializers.py"""
+    bookings = df.fillna('').to_dict('records')
+    for booking in bookings:
+        for key, value in booking.items():
+            if hasattr(value, 'strftime'):
+                booking[key] = value.strftime('%Y-%m-%d')
+    return json.dumps({"status": "success", "count": len(bookings), "bookings": bookings}).encode('utf-8')
+
+
+def legacy_summary_json(df):
+    """The /api/bookings/summary encoding before serializers.py"""
+    summaries = []
+    for _, row in df.iterrows():
+        summaries.append({
+            "booking_id": int(row['SrNo']) if pd.notna(row['SrNo']) else None,
+            "guest_name": str(row['GuestName']) if pd.notna(row['GuestName']) else '',
+            "check_in": row['FromDate'].strftime('%Y-%m-%d') if pd.notna(row['FromDate']) else '',
+            "check_out": row['ToDate'].strftime('%Y-%m-%d') if pd.notna(row['ToDate']) else '',
+            "hotel_name": str(row['HotelName']) if pd.notna(row['HotelName']) else '',
+            "city": str(row['CityName']) if pd.notna(row['CityName']) else '',
+            "status": str(row['Status']) if pd.notna(row['Status']) else '',
+            "issue": str(row['Issue']) if pd.notna(row['Issue']) else '',
+            "has_hcn": bool(pd.notna(row['SupplierHCN']) and str(row['SupplierHCN']).strip())
+        })
+    return json.dumps({"status": "success", "count": len(summaries), "bookings": summaries}).encode('utf-8')
+
+
+def bench_serialize(rows_list):
+    """Per-cell record loop + json vs. column-wise formatting + streamed encoding"""
+    manager = HCNEmailManager()
+    workdir = tempfile.mkdtemp(prefix='hcn_bench_')
+    print(f"encoder: {'orjson' if ORJSON_AVAILABLE else 'json'}")
+    print(f"{'rows':>8} {'endpoint':>9} {'legacy':>9} {'vectorized':>11} {'size':>10}")
+    try:
+        for rows in rows_list:
+            path = os.path.join(workdir, f'bench_{rows}.xlsx')
+            make_workbook(path, manager.sheet_name, rows)
+            df = manager.ensure_columns(read_bookings(path, manager.sheet_name))
+
+            for name, legacy, current in [
+                ('list', legacy_booking_json,
+                 lambda frame: b''.join(stream_json({"status": "success", "count": len(frame)}, "bookings", frame_records(frame)))),
+                ('summary', legacy_summary_json,
+                 lambda frame: b''.join(stream_json({"status": "success", "count": len(frame)}, "bookings", summary_records(frame)))),
+            ]:
+                legacy_out = []
+                current_out = []
+                legacy_time = timed(lambda: legacy_out.append(legacy(df)))
+                current_time = timed(lambda: current_out.append(current(df)))
+                assert json.loads(legacy_out[0]) == json.loads(current_out[0]), f"{name} output differs"
+                print(f"{rows:>8} {name:>9} {legacy_time:>8.2f}s {current_time:>10.2f}s "
+                      f"{len(current_out[0]) / 1e6:>8.1f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HCN Email Management benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    load_parser = subparsers.add_parser('load', help="time reading the booking sheet")
+    load_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+
+    save_parser = subparsers.add_parser('save', help="time saving tracking columns")
+    save_parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+    save_parser.add_argument('--changes', type=int, nargs='+', default=[1, 10, 100])
+
+    reminders_parser = subparsers.add_parser('reminders', help="time selecting bookings due a reminder")
+    reminders_parser.add_argument('--rows', type=int, nargs='+', default=[100000])
+
+    serialize_parser = subparsers.add_parser('serialize', help="time encoding booking lists as JSON")
+    serialize_parser.add_argument('--rows', type=int, nargs='+', default=[50000])
+
+    args = parser.parse_args()
+    if args.benchmark == 'load':
+        bench_load(args.rows)
+    elif args.benchmark == 'save':
+        bench_save(args.rows, args.changes)
+    elif args.benchmark == 'reminders':
+        bench_reminders(args.rows)
+    elif args.benchmark == 'serialize':
+        bench_serialize(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+SQLite booking repository for HCN Email Management System
+Indexed system of record for bookings, with import/export to the Excel sheet
+so operations staff can keep working with spreadsheets
+
+Usage:
+    python booking_db.py import   # load EXCEL_FILE_PATH into the database
+    python booking_db.py export   # write tracking columns back into the sheet
+"""
+
+import sqlite3
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BOOKING_DB_FILE = "bookings.db"
+
+# Columns the application looks bookings up / filters by
+INDEXED_COLUMNS = ['SrNo', 'FileNo', 'SupplierRef', 'Status', 'Issue']
+
+# Columns written back by the email process
+TRACKING_COLUMNS = ['EmailSent', 'EmailSentTime', 'ReminderSent', 'ReminderTime', 'Issue', 'SupplierHCN']
+
+
+def _quote(name):
+    """Quote a column name for SQL ('Agent Email' etc.)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_sql_value(value):
+    """Convert a pandas/numpy cell to something sqlite3 can store"""
+    if value is None:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat(sep=' ')
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+class BookingRepository:
+    """
+    Bookings stored in SQLite, one row per sheet row.
+
+    `row_id` is the DataFrame index (sheet row - 3), so DataFrames loaded from
+    here line up with the Excel workbook for export.
+    """
+
+    def __init__(self, path=BOOKING_DB_FILE):
+        self.path = path
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def exists(self):
+        """True if the bookings table has been created"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bookings'"
+            ).fetchone()
+        return row is not None
+
+    def import_dataframe(self, df):
+        """Replace all bookings with the rows of `df` (e.g. a freshly read sheet)"""
+        columns = [col for col in df.columns if col != 'Status_lower']
+        datetime_columns = [col for col in columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+
+        conn = self._connect()
+        try:
+            conn.execute("DROP TABLE IF EXISTS bookings")
+            conn.execute("DROP TABLE IF EXISTS booking_columns")
+            conn.execute(
+                f"CREATE TABLE bookings (row_id INTEGER PRIMARY KEY, {', '.join(_quote(c) for c in columns)})"
+            )
+            conn.execute("CREATE TABLE booking_columns (position INTEGER, name TEXT, is_datetime INTEGER)")
+            conn.executemany(
+                "INSERT INTO booking_columns VALUES (?, ?, ?)",
+                [(i, str(col), int(col in datetime_columns)) for i, col in enumerate(columns)]
+            )
+
+            placeholders = ', '.join('?' for _ in range(len(columns) + 1))
+            conn.executemany(
+                f"INSERT INTO bookings VALUES ({placeholders})",
+                (
+                    [int(idx)] + [_to_sql_value(value) for value in values]
+                    for idx, values in zip(df.index, df[columns].itertuples(index=False, name=None))
+                )
+            )
+
+            for col in INDEXED_COLUMNS:
+                if col in columns:
+                    conn.execute(f"CREATE INDEX {_quote('idx_' + col)} ON bookings({_quote(col)})")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def load(self):
+        """Load all bookings as a DataFrame indexed by row_id"""
+        conn = self._connect()
+        try:
+            meta = conn.execute("SELECT name, is_datetime FROM booking_columns ORDER BY position").fetchall()
+            df = pd.read_sql_query("SELECT * FROM bookings ORDER BY row_id", conn, index_col='row_id')
+        finally:
+            conn.close()
+
+        df.index.name = None
+        for name, is_datetime in meta:
+            if is_datetime and name in df.columns:
+                df[name] = pd.to_datetime(df[name], errors='coerce')
+        return df
+
+    def add_columns(self, columns):
+        """Add columns that the sheet did not have yet (e.g. tracking columns)"""
+        conn = self._connect()
+        try:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+            position = conn.execute("SELECT COALESCE(MAX(position), -1) FROM booking_columns").fetchone()[0]
+            for col in columns:
+                if col not in existing:
+                    position += 1
+                    conn.execute(f"ALTER TABLE bookings ADD COLUMN {_quote(col)}")
+                    conn.execute("INSERT INTO booking_columns VALUES (?, ?, 0)", (position, col))
+                    if col in INDEXED_COLUMNS:
+                        conn.execute(f"CREATE INDEX {_quote('idx_' + col)} ON bookings({_quote(col)})")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _diff(self, conn, df, columns):
+        """{row_id: {column: value}} for tracking cells that differ from what is stored"""
+        select = ', '.join(_quote(col) for col in columns)
+        stored = pd.read_sql_query(f"SELECT row_id, {select} FROM bookings", conn, index_col='row_id')
+
+        updates = []
+        for idx, values in zip(df.index, df[columns].itertuples(index=False, name=None)):
+            if idx not in stored.index:
+                continue
+            changed = {}
+            for col, value in zip(columns, values):
+                new_value = _to_sql_value(value)
+                if new_value is None:
+                    continue
+                if _to_sql_value(stored.at[idx, col]) != new_value:
+                    changed[col] = new_value
+            if changed:
+                updates.append((int(idx), changed))
+        return updates
+
+    def save(self, df, columns=TRACKING_COLUMNS, changes=None):
+        """
+        Write back tracking columns.
+
+        With a ChangeSet only its cells are updated; otherwise every row is
+        compared with what is stored. Like save_excel, empty values never
+        overwrite stored ones. Returns the number of rows updated.
+        """
+        columns = [col for col in columns if col in df.columns]
+        self.add_columns(columns)
+
+        conn = self._connect()
+        try:
+            if changes is not None:
+                updates = []
+                for idx in changes.rows():
+                    changed = {}
+                    for col in changes.columns(idx):
+                        value = _to_sql_value(df.at[idx, col]) if col in columns else None
+                        if value is not None:
+                            changed[col] = value
+                    if changed:
+                        updates.append((int(idx), changed))
+            else:
+                updates = self._diff(conn, df, columns)
+
+            for row_id, changed in updates:
+                assignments = ', '.join(f"{_quote(col)} = ?" for col in changed)
+                conn.execute(
+                    f"UPDATE bookings SET {assignments} WHERE row_id = ?",
+                    list(changed.values()) + [row_id]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+        return len(updates)
+
+
+def main():
+    """Import the Excel sheet into the database, or export tracking columns back to it"""
+    from config import BOOKING_DB_PATH
+    from sending_update import HCNEmailManager
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python booking_db.py import|export")
+        return
+
+    manager = HCNEmailManager()
+    repository = BookingRepository(BOOKING_DB_PATH)
+
+    if sys.argv[1] == 'import':
+        df = manager.read_excel()
+        repository.import_dataframe(df)
+        print(f"✅ Imported {len(df)} bookings from {manager.excel_path} into {BOOKING_DB_PATH}")
+    else:
+        df = repository.load()
+        manager.save_excel(df)
+        print(f"✅ Exported {len(df)} bookings from {BOOKING_DB_PATH} to {manager.excel_path}")
+
+
+if __name__ == "__main__":
+    main()
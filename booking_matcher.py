@@ -0,0 +1,137 @@
+"""
+Booking reference index for HCN Email Management System
+Matches an email against every booking's FileNo / SupplierRef / guest name in a
+single pass over the email text (Aho-Corasick multi-pattern search)
+"""
+
+import re
+from collections import deque, namedtuple
+
+import pandas as pd
+
+# Match fields in priority order: a FileNo hit always beats a SupplierRef hit,
+# which beats a guest name hit
+MATCH_FIELDS = ['file_no', 'supplier_ref', 'guest_name']
+
+# index: best matching row; field: which reference matched;
+# candidates: every row matched at that priority (more than one = ambiguous)
+BookingMatch = namedtuple('BookingMatch', ['index', 'field', 'candidates'])
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton over lowercase string patterns"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, pattern, value):
+        """Register `value` to be reported whenever `pattern` occurs"""
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Compute failure links (breadth-first)"""
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_target = self._goto[fail].get(char, 0)
+                self._fail[child] = fail_target if fail_target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """Yield (start, end, value) for every pattern occurrence in `text`"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for pos, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in output[node]:
+                yield pos + 1 - length, pos + 1, value
+
+
+class BookingMatcher:
+    """Reference index over a booking DataFrame, built once per run"""
+
+    def __init__(self, df):
+        self._automaton = AhoCorasick()
+        self._position = {}
+        self._by_file_no = {}
+
+        for position, (idx, row) in enumerate(df.iterrows()):
+            self._position[idx] = position
+
+            file_no = row.get('FileNo')
+            if pd.notna(file_no) and str(file_no).strip():
+                self._add(str(file_no), 'file_no', idx)
+                self._by_file_no.setdefault(str(file_no).strip(), idx)
+
+            supplier_ref = row.get('SupplierRef')
+            if pd.notna(supplier_ref) and str(supplier_ref).strip():
+                self._add(str(supplier_ref), 'supplier_ref', idx)
+
+            guest_name = row.get('GuestName')
+            if pd.notna(guest_name) and len(str(guest_name)) > 5:
+                clean_name = re.sub(r'^(MR\.|MRS\.|MS\.)\s*', '', str(guest_name), flags=re.IGNORECASE)
+                if clean_name.strip():
+                    self._add(clean_name, 'guest_name', idx)
+
+        self._automaton.build()
+
+    def _add(self, pattern, field, idx):
+        self._automaton.add(pattern.lower(), (MATCH_FIELDS.index(field), idx))
+
+    def lookup_file_no(self, file_no):
+        """Exact FileNo -> row index lookup (None if unknown)"""
+        return self._by_file_no.get(str(file_no).strip())
+
+    def match(self, text):
+        """
+        Find the booking an email text refers to.
+
+        Returns a BookingMatch, or None when nothing matches. Within the best
+        priority level, hits contained in a longer hit (e.g. 'OSTR1000' inside
+        'OSTR10001') are ignored; ties go to the earliest row.
+        """
+        hits = {}
+        for start, end, (priority, idx) in self._automaton.iter_matches(text.lower()):
+            hits.setdefault(priority, []).append((start, end, idx))
+        if not hits:
+            return None
+
+        priority = min(hits)
+        level_hits = hits[priority]
+        candidates = set()
+        for start, end, idx in level_hits:
+            contained = any(
+                other_start <= start and end <= other_end and (other_end - other_start) > (end - start)
+                for other_start, other_end, _ in level_hits
+            )
+            if not contained:
+                candidates.add(idx)
+
+        ordered = sorted(candidates, key=self._position.get)
+        return BookingMatch(ordered[0], MATCH_FIELDS[priority], ordered)
@@ -0,0 +1,276 @@
+"""
+Booking list queries for HCN Email Management System
+Filters, sorts and pages the Confirmed/Vouchered bookings against an indexed
+view that is built once per store version
+"""
+
+import base64
+import binascii
+import json
+
+import numpy as np
+import pandas as pd
+
+from booking_store import ISSUE_CATEGORIES, STATUS_CATEGORIES, issue_categories
+
+# Filter name -> sheet column, for the exact-match (case-insensitive) filters
+EQUALITY_FILTERS = {'supplier': 'SupplierName', 'city': 'CityName'}
+
+# Columns added by BookingStore; never listed, sorted on or returned
+HIDDEN_COLUMNS = ['Status_lower']
+
+
+class QueryError(ValueError):
+    """Invalid query parameter (unknown column, bad cursor, ...)"""
+
+
+def _normalize(series):
+    """Lower-cased, stripped text; empty cells become ''"""
+    return series.astype(object).where(series.notna(), '').astype(str).str.strip().str.lower()
+
+
+def _sort_key(series):
+    """Values that sort the way a person expects: dates/numbers by value, text case-insensitively"""
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.notna().sum() == series.notna().sum():
+        return numeric
+    return series.astype(object).where(series.notna(), None).map(
+        lambda value: str(value).strip().lower() if value is not None else None
+    )
+
+
+def _cursor_key(series):
+    """
+    Sort key values as JSON-safe Python values (None = empty), ordered the
+    same way as _sort_key, for keyset cursors
+    """
+    key = _sort_key(series)
+    if pd.api.types.is_datetime64_any_dtype(key):
+        values = key.dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    elif pd.api.types.is_numeric_dtype(key):
+        values = key.astype(float)
+    else:
+        values = key
+    return values.astype(object).where(values.notna(), None).to_numpy()
+
+
+class BookingView:
+    """
+    Read-only query view of the relevant bookings.
+
+    Filter columns are normalized once, equality filters are served from
+    value -> positions indexes, and each sort order is computed once; all of
+    it is rebuilt only when the store loads a new version.
+    """
+
+    def __init__(self, relevant):
+        self.frame = relevant
+        self.size = len(relevant)
+        self.labels = relevant.index.to_numpy()
+        self.category = issue_categories(relevant).to_numpy()
+        self.guest = (
+            _normalize(relevant['GuestName']).reset_index(drop=True)
+            if 'GuestName' in relevant.columns else None
+        )
+        self.check_in = (
+            pd.to_datetime(relevant['FromDate'], errors='coerce').to_numpy()
+            if 'FromDate' in relevant.columns else None
+        )
+        self._indexes = {}
+        self._orders = {}
+
+    def index(self, name):
+        """{normalized value: positions} for an equality filter or 'issue'"""
+        if name not in self._indexes:
+            if name == 'issue':
+                values = pd.Series(self.category)
+            else:
+                column = EQUALITY_FILTERS[name]
+                if column not in self.frame.columns:
+                    self._indexes[name] = {}
+                    return self._indexes[name]
+                values = _normalize(self.frame[column]).reset_index(drop=True)
+            self._indexes[name] = {
+                value: positions.to_numpy() for value, positions in values.groupby(values).groups.items()
+            }
+        return self._indexes[name]
+
+    def order(self, sort):
+        """
+        (order, keys) for a parsed sort spec: positions in sorted order and,
+        per sort column, each position's cursor key (see _cursor_key)
+        """
+        if sort not in self._orders:
+            if not sort:
+                order = np.arange(self.size)
+            else:
+                keys = pd.DataFrame({
+                    f'k{i}': _sort_key(self.frame[column]).reset_index(drop=True)
+                    for i, (column, _) in enumerate(sort)
+                })
+                keys['label'] = self.labels
+                keys['position'] = np.arange(self.size)
+                # Ties are broken by index label (sheet order), which cursors rely on
+                order = keys.sort_values(
+                    [f'k{i}' for i in range(len(sort))] + ['label'],
+                    ascending=[ascending for _, ascending in sort] + [True],
+                    kind='mergesort', na_position='last'
+                )['position'].to_numpy()
+            cursor_keys = [_cursor_key(self.frame[column]) for column, _ in sort]
+            self._orders[sort] = (order, cursor_keys)
+        return self._orders[sort]
+
+    def seek(self, sort, after_keys, after_label):
+        """Index into order(sort) of the first row that sorts after the cursor row"""
+        order, keys = self.order(sort)
+        cursor = list(after_keys) + [after_label]
+        directions = [ascending for _, ascending in sort] + [True]
+
+        def sorts_after(position):
+            row = [column_keys[position] for column_keys in keys] + [self.labels[position]]
+            for value, cursor_value, ascending in zip(row, cursor, directions):
+                # Empty values sort last either way
+                if value is None or cursor_value is None:
+                    if (value is None) != (cursor_value is None):
+                        return value is None
+                    continue
+                if value != cursor_value:
+                    return (value > cursor_value) == ascending
+            return False
+
+        low, high = 0, len(order)
+        try:
+            while low < high:
+                middle = (low + high) // 2
+                if sorts_after(order[middle]):
+                    high = middle
+                else:
+                    low = middle + 1
+        except TypeError:
+            raise QueryError("Cursor no longer matches the data; start from the first page")
+        return low
+
+
+def parse_sort(sort, columns):
+    """'-FromDate,GuestName' -> (('FromDate', False), ('GuestName', True))"""
+    if not sort:
+        return ()
+    spec = []
+    for key in sort.split(','):
+        key = key.strip()
+        ascending = not key.startswith('-')
+        column = key.lstrip('+-')
+        if column not in columns:
+            raise QueryError(f"Unknown sort column: {column}")
+        spec.append((column, ascending))
+    return tuple(spec)
+
+
+def parse_fields(fields, columns):
+    """'FileNo,GuestName' -> ['FileNo', 'GuestName'] (None = no projection)"""
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in columns]
+    if unknown:
+        raise QueryError(f"Unknown field(s): {', '.join(unknown)}")
+    return selected
+
+
+def parse_issue(issue):
+    """'critical,pending' -> {'critical', 'pending'}; accepts sheet values too ('Non Critical')"""
+    categories = set()
+    for value in issue.split(','):
+        value = value.strip()
+        category = ISSUE_CATEGORIES.get(value, value.lower().replace(' ', '_'))
+        if category not in STATUS_CATEGORIES:
+            raise QueryError(f"Unknown issue filter: {value}")
+        categories.add(category)
+    return categories
+
+
+def _plain(value):
+    return value.item() if hasattr(value, 'item') else value  # numpy scalar
+
+
+def encode_cursor(keys, label, sort):
+    """Cursor after a row: its sort key values plus its index label as the tiebreaker"""
+    payload = json.dumps({
+        'keys': [_plain(key) for key in keys],
+        'after': _plain(label),
+        'sort': [list(key) for key in sort]
+    }, default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, sort):
+    """(sort key values, index label) of the last row of the previous page"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        keys = list(payload['keys'])
+        label = payload['after']
+        cursor_sort = tuple((column, ascending) for column, ascending in payload['sort'])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise QueryError("Invalid cursor")
+    if cursor_sort != sort or len(keys) != len(sort):
+        raise QueryError("Cursor was created for a different sort order")
+    return keys, label
+
+
+def query_bookings(view, issue=None, supplier=None, city=None, check_in_from=None,
+                   check_in_to=None, q=None, sort=None, fields=None,
+                   offset=0, limit=None, cursor=None):
+    """
+    Filter, sort and page the view. Returns (page DataFrame, total matches,
+    next_cursor). Paging is by `cursor` (keyset on the sort key values, so
+    pages neither skip nor repeat rows when the sheet reloads in between) or
+    by `offset`; `limit` None returns every match.
+    """
+    columns = [column for column in view.frame.columns if column not in HIDDEN_COLUMNS]
+    sort = parse_sort(sort, columns)
+    selected = parse_fields(fields, columns) or columns
+
+    mask = np.ones(view.size, dtype=bool)
+    for name, value in (('issue', issue), ('supplier', supplier), ('city', city)):
+        if not value:
+            continue
+        index = view.index(name)
+        wanted = parse_issue(value) if name == 'issue' else {value.strip().lower()}
+        allowed = np.zeros(view.size, dtype=bool)
+        for key in wanted:
+            allowed[index.get(key, [])] = True
+        mask &= allowed
+
+    if (check_in_from or check_in_to) and view.check_in is None:
+        mask[:] = False
+    if check_in_from:
+        mask &= view.check_in >= np.datetime64(pd.Timestamp(check_in_from))
+    if check_in_to:
+        mask &= view.check_in <= np.datetime64(pd.Timestamp(check_in_to))
+    if q and q.strip():
+        if view.guest is None:
+            mask[:] = False
+        else:
+            mask &= view.guest.str.contains(q.strip().lower(), regex=False).to_numpy(dtype=bool)
+
+    order, keys = view.order(sort)
+    total = int(mask.sum())
+
+    if cursor:
+        following = order[view.seek(sort, *decode_cursor(cursor, sort)):]
+        positions = following[mask[following]]
+    else:
+        positions = order[mask[order]][offset:]
+
+    has_more = limit is not None and len(positions) > limit
+    if limit is not None:
+        positions = positions[:limit]
+
+    page = view.frame.iloc[positions]
+    next_cursor = None
+    if has_more:
+        last = positions[-1]
+        next_cursor = encode_cursor([column_keys[last] for column_keys in keys], view.labels[last], sort)
+    return page[selected], total, next_cursor
@@ -0,0 +1,237 @@
+"""
+In-memory booking store for HCN Email Management System
+Loads the booking sheet once and serves every reader from a cached snapshot
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Booking statuses the system sends HCN requests for
+RELEVANT_STATUSES = ['confirmed', 'vouchered']
+
+# Issue value -> status count key; an empty Issue counts as 'pending'
+ISSUE_CATEGORIES = {'Received': 'received', 'Critical': 'critical', 'Non Critical': 'non_critical'}
+STATUS_CATEGORIES = ['received', 'critical', 'non_critical', 'pending']
+
+# Breakdown name -> sheet column
+STATUS_BREAKDOWNS = {'supplier': 'SupplierName', 'hotel': 'HotelName', 'city': 'CityName'}
+
+# Columns that identify a single booking (see BookingStore.lookup)
+KEY_COLUMNS = ['SrNo', 'FileNo']
+
+
+def lookup_key(value):
+    """Normalized key: whole numbers as int (SrNo 7, 7.0 and '7' match), text stripped and upper-cased"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return int(value) if float(value).is_integer() else float(value)
+    text = str(value).strip()
+    return int(text) if text.isdigit() else text.upper()
+
+
+def issue_categories(relevant):
+    """Status count key of each booking ('received', ..., 'pending')"""
+    category = relevant['Issue'].map(ISSUE_CATEGORIES)
+    return category.where(relevant['Issue'].notna(), 'pending')
+
+
+def summarize_bookings(relevant):
+    """
+    Status counts for Confirmed/Vouchered bookings, overall and per supplier,
+    hotel and city: {'total', 'received', 'critical', 'non_critical',
+    'pending', 'emailed', 'reminded', 'breakdowns': {...}}
+    """
+    frame = pd.DataFrame({'category': issue_categories(relevant)}, index=relevant.index)
+
+    counts = frame['category'].value_counts()
+    stats = {'total': len(relevant)}
+    for name in STATUS_CATEGORIES:
+        stats[name] = int(counts.get(name, 0))
+    stats['emailed'] = int((relevant['EmailSent'] == 'Yes').sum())
+    stats['reminded'] = int((relevant['ReminderSent'] == 'Yes').sum())
+
+    breakdowns = {}
+    for key, column in STATUS_BREAKDOWNS.items():
+        if column not in relevant.columns:
+            continue
+        groups = relevant[column].astype(object).where(relevant[column].notna(), 'Unknown').astype(str)
+        table = frame.groupby([groups, 'category']).size().unstack(fill_value=0)
+        breakdown = {}
+        for group, row in zip(table.index, table.to_dict('records')):
+            entry = {'total': int(sum(row.values()))}
+            for name in STATUS_CATEGORIES:
+                entry[name] = int(row.get(name, 0))
+            breakdown[group] = entry
+        breakdowns[key] = breakdown
+    stats['breakdowns'] = breakdowns
+    return stats
+
+
+class BookingStore:
+    """
+    Cached, normalized view of the booking sheet.
+
+    The sheet is parsed once and kept in memory together with the derived
+    'Status_lower' column. It is re-read only when the file's mtime/size
+    changes or when invalidate() is called after a write.
+
+    Snapshots are shared between callers and must be treated as read-only;
+    take a .copy() before mutating.
+    """
+
+    def __init__(self, path, loader, view_factory=None):
+        self.path = path
+        self.loader = loader
+        self.view_factory = view_factory
+        self.version = 0
+        self._lock = threading.Lock()
+        self._df = None
+        self._relevant = None
+        self._stats = None
+        self._stats_version = None
+        self._view = None
+        self._view_version = None
+        self._keys = {}
+        self._rows = None
+        self._keys_version = None
+        self._signature = None
+
+    def _file_signature(self):
+        """Return (mtime, size) of the backing file, or None if it is missing"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _ensure_loaded(self):
+        """Reload the snapshot if the backing file changed (caller holds the lock)"""
+        signature = self._file_signature()
+        if self._df is not None and signature == self._signature:
+            return
+
+        df = self.loader()
+        df['Status_lower'] = df['Status'].str.lower().str.strip()
+
+        self._df = df
+        self._relevant = df[df['Status_lower'].isin(RELEVANT_STATUSES)]
+        self._signature = signature
+        self.version += 1
+
+    def snapshot(self):
+        """Get the full booking DataFrame (read-only)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._df
+
+    def relevant(self):
+        """Get Confirmed/Vouchered bookings (read-only)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._relevant
+
+    def current_version(self):
+        """The version of the data on disk now (reloads first if the file changed)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self.version
+
+    def stats(self):
+        """summarize_bookings() of the current snapshot, computed once per version"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._stats_version != self.version:
+                self._stats = summarize_bookings(self._relevant)
+                self._stats_version = self.version
+            return self._stats
+
+    def view(self):
+        """view_factory(relevant bookings) of the current snapshot, built once per version"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._view_version != self.version:
+                self._view = self.view_factory(self._relevant)
+                self._view_version = self.version
+            return self._view
+
+    def lookup(self, column, value):
+        """
+        The booking whose KEY_COLUMNS `column` equals `value`, as a
+        {column: value} dict, or None. Served from a key -> position index
+        and per-column arrays built once per version; the first row wins if a
+        key repeats.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._keys_version != self.version:
+                self._keys = {}
+                self._rows = {col: self._df[col].to_numpy() for col in self._df.columns}
+                self._keys_version = self.version
+            if column not in self._keys:
+                index = {}
+                if column in self._df.columns:
+                    for position, key in enumerate(self._df[column].map(lookup_key)):
+                        if key is not None:
+                            index.setdefault(key, position)
+                self._keys[column] = index
+            position = self._keys[column].get(lookup_key(value))
+            if position is None:
+                return None
+            return {col: values[position] for col, values in self._rows.items()}
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next read reloads it"""
+        with self._lock:
+            self._df = None
+            self._relevant = None
+            self._stats = None
+            self._stats_version = None
+            self._view = None
+            self._view_version = None
+            self._keys = {}
+            self._rows = None
+            self._keys_version = None
+            self._signature = None
+
+
+class ChangeSet:
+    """
+    Cells mutated on a working DataFrame during a run.
+
+    Write through set() instead of df.at[...] so the save step can touch only
+    the changed cells instead of every row of the sheet.
+    """
+
+    def __init__(self):
+        self._cells = {}
+
+    def set(self, df, idx, column, value):
+        """Set df.at[idx, column] and record the cell as dirty"""
+        df.at[idx, column] = value
+        self._cells.setdefault(idx, set()).add(column)
+
+    def rows(self):
+        """Row indexes with at least one changed cell"""
+        return list(self._cells)
+
+    def columns(self, idx):
+        """Changed columns of a row"""
+        return self._cells.get(idx, set())
+
+    def cells(self):
+        """Iterate (row index, column) pairs"""
+        for idx, columns in self._cells.items():
+            for column in columns:
+                yield idx, column
+
+    def clear(self):
+        self._cells = {}
+
+    def __len__(self):
+        return sum(len(columns) for columns in self._cells.values())
@@ -0,0 +1,128 @@
+"""
+Booking change feed for HCN Email Management System
+Numbers every saved change to the bookings so clients can follow them as
+deltas (issue changed, HCN received, reminder sent) instead of re-downloading
+the booking lists and status counts
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+# Columns a run writes; the only ones a delta carries
+FEED_COLUMNS = ['EmailSent', 'EmailSentTime', 'ReminderSent', 'ReminderTime', 'Issue', 'SupplierHCN']
+
+
+def _json_value(value):
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(value, 'item'):  # numpy scalar
+        return value.item()
+    return value
+
+
+def booking_deltas(df, changes):
+    """
+    Changed values of a run, one entry per booking:
+    [{'booking_id': SrNo, 'file_no': FileNo, 'fields': {column: value}}]
+    """
+    deltas = []
+    for idx in changes.rows():
+        columns = [col for col in changes.columns(idx) if col in FEED_COLUMNS and col in df.columns]
+        if not columns:
+            continue
+        row = df.loc[idx]
+        deltas.append({
+            'booking_id': _json_value(row.get('SrNo')),
+            'file_no': _json_value(row.get('FileNo')),
+            'fields': {col: _json_value(row[col]) for col in sorted(columns)}
+        })
+    return deltas
+
+
+class ChangeFeed:
+    """
+    Bounded, versioned log of booking changes.
+
+    Every event gets the next version number. A client that remembers the
+    last version it applied asks for events_since(version); if that version
+    has already dropped out of the log it gets None and must reload.
+    """
+
+    def __init__(self, max_events=500, check_interval=5.0):
+        self.version = 0
+        self.check_interval = check_interval
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._store_version = None
+        self._last_check = 0.0
+
+    def _append(self, kind, stats, store_version, **payload):
+        """Add an event (caller holds the lock)"""
+        self.version += 1
+        event = {
+            'version': self.version,
+            'type': kind,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'stats': stats,
+            **payload
+        }
+        self._events.append(event)
+        self._store_version = store_version
+        return event
+
+    def publish(self, store, deltas):
+        """Record the deltas of a save together with the new status counts"""
+        stats = _counts(store.stats())
+        with self._lock:
+            return self._append('bookings', stats, store.version, changes=deltas)
+
+    def check_store(self, store, busy=False):
+        """
+        Publish a 'reset' event if the store was reloaded from a file changed
+        outside a run (e.g. the sheet was edited by hand), since no deltas are
+        known for that. Runs at most once per check_interval; skipped while a
+        run is saving (`busy`).
+        """
+        now = time.monotonic()
+        if busy or now - self._last_check < self.check_interval:
+            return None
+        self._last_check = now
+
+        stats = _counts(store.stats())
+        with self._lock:
+            if self._store_version is None:
+                self._store_version = store.version
+                return None
+            if store.version == self._store_version:
+                return None
+            return self._append('reset', stats, store.version)
+
+    def current(self, store):
+        """The current version and status counts, for a client that just connected"""
+        stats = _counts(store.stats())
+        with self._lock:
+            if self._store_version is None:
+                self._store_version = store.version
+            return {'version': self.version, 'type': 'snapshot', 'stats': stats}
+
+    def events_since(self, version):
+        """Events after `version`, or None if some of them are no longer kept"""
+        with self._lock:
+            if version > self.version:
+                return None  # from before a restart
+            if version == self.version:
+                return []
+            if not self._events or self._events[0]['version'] > version + 1:
+                return None
+            return [event for event in self._events if event['version'] > version]
+
+
+def _counts(stats):
+    """Status counts without the per-group breakdowns"""
+    return {key: value for key, value in stats.items() if key != 'breakdowns'}
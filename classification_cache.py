@@ -0,0 +1,103 @@
+"""
+Persistent cache of OpenAI reply classifications for HCN Email Management System
+Keyed by a hash of the normalized email, the booking references and the prompt
+version, so re-processing the same inbox costs no API calls
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+CLASSIFICATION_CACHE_FILE = "classification_cache.db"
+
+
+def _normalize(value):
+    """Lowercase and collapse whitespace so re-wrapped copies hash the same"""
+    if value is None or value != value:  # NaN
+        return ''
+    return re.sub(r'\s+', ' ', str(value)).strip().lower()
+
+
+class ClassificationCache:
+    """SQLite-backed {hcn, category, reason} cache with TTL and size-based eviction"""
+
+    def __init__(self, path=CLASSIFICATION_CACHE_FILE, ttl_days=30, max_entries=50000):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS classifications (
+                   key TEXT PRIMARY KEY,
+                   result TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_used REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON classifications(last_used)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(subject, body, booking_info, prompt_version):
+        """Hash of everything the classification depends on"""
+        parts = [
+            str(prompt_version),
+            _normalize(subject),
+            _normalize(body),
+            _normalize(booking_info.get('file_no')),
+            _normalize(booking_info.get('supplier_ref')),
+            _normalize(booking_info.get('guest_name')),
+            _normalize(booking_info.get('hotel_name')),
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached result for `key`, or None if missing/expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM classifications WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """Store a classification result"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now)
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM classifications WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                """DELETE FROM classifications WHERE key IN (
+                       SELECT key FROM classifications ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -20,12 +20,51 @@ GMAIL_APP_PASSWORD = os.getenv('GMAIL_APP_PASSWORD', '')
 # OpenAI API Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 
+# Parallel reply classification: concurrent requests, per-request timeout
+# (seconds) and retries on rate limit / server errors
+OPENAI_CONCURRENCY = int(os.getenv('OPENAI_CONCURRENCY', '8'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '4'))
+
+# Runs a reply is retried after a transient failure (OpenAI timeout / 429 /
+# 5xx, IMAP fetch error) before it is filed as Non Critical for manual review
+MAX_REPLY_ATTEMPTS = int(os.getenv('MAX_REPLY_ATTEMPTS', '3'))
+
+# Classify clearly templated replies with local rules before calling OpenAI
+FAST_PATH_EXTRACTION = os.getenv('FAST_PATH_EXTRACTION', 'true').lower() == 'true'
+
+# Disk cache of OpenAI classifications (SQLite)
+CLASSIFICATION_CACHE_ENABLED = os.getenv('CLASSIFICATION_CACHE_ENABLED', 'true').lower() == 'true'
+CLASSIFICATION_CACHE_FILE = os.getenv('CLASSIFICATION_CACHE_FILE', 'classification_cache.db')
+CLASSIFICATION_CACHE_TTL_DAYS = int(os.getenv('CLASSIFICATION_CACHE_TTL_DAYS', '30'))
+CLASSIFICATION_CACHE_MAX_ENTRIES = int(os.getenv('CLASSIFICATION_CACHE_MAX_ENTRIES', '50000'))
+
 # ========================= DATABASE CONFIGURATION =========================
 
 # Excel Database
 EXCEL_FILE_PATH = os.getenv('EXCEL_FILE_PATH', 'HCN1.xlsx')
 SHEET_NAME = os.getenv('SHEET_NAME', 'HotelReport (1)')
 
+# Booking system of record: 'excel' (read/write the sheet directly) or
+# 'sqlite' (indexed database; sync with the sheet via `python booking_db.py import|export`).
+# Every Excel save rewrites the whole workbook, even for one changed cell
+# (`python benchmarks.py save`: ~1.5s at 2,000 rows, ~16s at 20,000 rows;
+# SQLite writes the same change in ~0.001s), so use 'sqlite' for large sheets.
+BOOKING_BACKEND = os.getenv('BOOKING_BACKEND', 'excel').lower()
+BOOKING_DB_PATH = os.getenv('BOOKING_DB_PATH', 'bookings.db')
+# Above this many rows the Excel backend prints a hint to switch to 'sqlite'
+LARGE_SHEET_ROWS = int(os.getenv('LARGE_SHEET_ROWS', '5000'))
+
+# Sheet reader: 'auto' (calamine if installed, else openpyxl read-only),
+# 'calamine', 'openpyxl' or 'pandas' (legacy full pd.read_excel)
+EXCEL_ENGINE = os.getenv('EXCEL_ENGINE', 'auto').lower()
+EXCEL_CHUNK_SIZE = int(os.getenv('EXCEL_CHUNK_SIZE', '10000'))
+
+# Arrow snapshot of the parsed sheet (requires pyarrow); reused until the
+# workbook's mtime/size change
+BOOKING_SNAPSHOT_ENABLED = os.getenv('BOOKING_SNAPSHOT_ENABLED', 'true').lower() == 'true'
+BOOKING_SNAPSHOT_FILE = os.getenv('BOOKING_SNAPSHOT_FILE', 'booking_snapshot.arrow')
+
 # ========================= EMAIL SETTINGS =========================
 
 # Send reminder after X hours if no HCN received
@@ -34,9 +73,42 @@ REMINDER_AFTER_HOURS = int(os.getenv('REMINDER_AFTER_HOURS', '2'))
 # Check emails from last X days
 DAYS_TO_CHECK = int(os.getenv('DAYS_TO_CHECK', '7'))
 
-# Delay between sending emails (seconds)
+# Only fetch mail newer than the last run (UID checkpoints), instead of
+# re-scanning the whole DAYS_TO_CHECK window every time
+IMAP_INCREMENTAL_SYNC = os.getenv('IMAP_INCREMENTAL_SYNC', 'true').lower() == 'true'
+IMAP_SYNC_STATE_FILE = os.getenv('IMAP_SYNC_STATE_FILE', 'imap_sync_state.json')
+
+# Download bodies only for emails whose headers look like booking replies
+IMAP_HEADER_TRIAGE = os.getenv('IMAP_HEADER_TRIAGE', 'true').lower() == 'true'
+# Number of messages requested per batched IMAP FETCH
+IMAP_FETCH_BATCH_SIZE = int(os.getenv('IMAP_FETCH_BATCH_SIZE', '200'))
+
+# Message-ID -> booking map used to match threaded replies exactly; ids older
+# than MESSAGE_THREADS_RETENTION_DAYS are forgotten
+MESSAGE_THREADS_FILE = os.getenv('MESSAGE_THREADS_FILE', 'message_threads.db')
+MESSAGE_THREADS_RETENTION_DAYS = int(os.getenv('MESSAGE_THREADS_RETENTION_DAYS', '90'))
+
+# Push mode: hold an IMAP IDLE connection and check the inbox as soon as mail
+# arrives; IDLE is renewed every IMAP_IDLE_TIMEOUT_SECONDS (servers drop idle
+# connections after ~29 min) and a catch-up check runs every IMAP_CATCHUP_MINUTES
+ENABLE_IMAP_IDLE = os.getenv('ENABLE_IMAP_IDLE', 'false').lower() == 'true'
+IMAP_IDLE_TIMEOUT_SECONDS = int(os.getenv('IMAP_IDLE_TIMEOUT_SECONDS', '1500'))
+IMAP_CATCHUP_MINUTES = float(os.getenv('IMAP_CATCHUP_MINUTES', '15'))
+
+# Background scheduler: minutes between runs of each stage (0 disables a
+# stage); ENABLE_SCHEDULER also runs it inside the FastAPI backend
+ENABLE_SCHEDULER = os.getenv('ENABLE_SCHEDULER', 'false').lower() == 'true'
+SCHEDULE_SEND_MINUTES = float(os.getenv('SCHEDULE_SEND_MINUTES', '15'))
+SCHEDULE_INBOX_MINUTES = float(os.getenv('SCHEDULE_INBOX_MINUTES', '5'))
+SCHEDULE_REMINDER_MINUTES = float(os.getenv('SCHEDULE_REMINDER_MINUTES', '30'))
+
+# Delay between sending emails (seconds) - legacy, superseded by EMAILS_PER_MINUTE
 DELAY_BETWEEN_EMAILS = int(os.getenv('DELAY_BETWEEN_EMAILS', '2'))
 
+# Sending rate limit (token bucket) - set to the provider's quota
+EMAILS_PER_MINUTE = int(os.getenv('EMAILS_PER_MINUTE', '30'))
+EMAIL_BURST = int(os.getenv('EMAIL_BURST', '10'))
+
 # ========================= COMPANY DETAILS =========================
 
 COMPANY_NAME = os.getenv('COMPANY_NAME', 'Within Earth Travel Pvt. Ltd.')
@@ -58,6 +130,11 @@ BACKEND_HOST = os.getenv('BACKEND_HOST', '0.0.0.0')
 # Frontend
 FRONTEND_PORT = int(os.getenv('FRONTEND_PORT', '3000'))
 
+# HTTP caching: ETags / 304 Not Modified on the read API, and compression
+# (brotli if installed, else gzip) of responses of at least this many bytes
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+HTTP_COMPRESSION_MIN_BYTES = int(os.getenv('HTTP_COMPRESSION_MIN_BYTES', '1000'))
+
 # ========================= VALIDATION =========================
 
 def validate_config():
@@ -73,7 +150,20 @@ def validate_config():
     if not OPENAI_API_KEY or OPENAI_API_KEY.startswith('sk-your-'):
         errors.append("OPENAI_API_KEY is not configured in .env file")
 
-    if not os.path.exists(EXCEL_FILE_PATH):
+    if EMAILS_PER_MINUTE <= 0:
+        errors.append(f"EMAILS_PER_MINUTE must be positive, not {EMAILS_PER_MINUTE}")
+
+    if EMAIL_BURST <= 0:
+        errors.append(f"EMAIL_BURST must be positive, not {EMAIL_BURST}")
+
+    if BOOKING_BACKEND not in ('excel', 'sqlite'):
+        errors.append(f"BOOKING_BACKEND must be 'excel' or 'sqlite', not '{BOOKING_BACKEND}'")
+
+    if EXCEL_ENGINE not in ('auto', 'calamine', 'openpyxl', 'pandas'):
+        errors.append(f"EXCEL_ENGINE must be 'auto', 'calamine', 'openpyxl' or 'pandas', not '{EXCEL_ENGINE}'")
+
+    # With the SQLite backend the sheet is only needed for the first import
+    if not os.path.exists(EXCEL_FILE_PATH) and not (BOOKING_BACKEND == 'sqlite' and os.path.exists(BOOKING_DB_PATH)):
         errors.append(f"Excel file not found: {EXCEL_FILE_PATH}")
 
     if SECRET_KEY == 'your-secret-key-change-this-in-production' or SECRET_KEY == 'your-secret-key-change-this-in-production-use-random-string':
@@ -0,0 +1,152 @@
+"""
+Streaming booking sheet loader for HCN Email Management System
+Reads only the columns the application uses, row by row, instead of
+materializing the whole workbook with pd.read_excel
+"""
+
+from datetime import date, datetime
+
+import pandas as pd
+
+# Columns used by HCNEmailManager and the API; anything else in the sheet is skipped
+BOOKING_COLUMNS = [
+    'SrNo', 'FileNo', 'BookingDate', 'GuestName', 'HotelName', 'CityName', 'CountryName',
+    'FromDate', 'ToDate', 'RoomType', 'NoOFRooms', 'NoOfPax', 'Status', 'SupplierName',
+    'SupplierRef', 'SupplierHCN', 'AgentName', 'Agent Email',
+    'EmailSent', 'EmailSentTime', 'ReminderSent', 'ReminderTime', 'Issue'
+]
+
+DATE_COLUMNS = ['BookingDate', 'FromDate', 'ToDate']
+
+# Sheet layout: title on row 1, header on row 2, data from row 3
+HEADER_ROW = 2
+
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+
+def _iter_openpyxl(path, sheet_name):
+    """Yield sheet rows as tuples (row 1 first) using openpyxl's read-only mode"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb[sheet_name].iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _calamine_value(value):
+    """calamine returns '' for empty cells and floats for every number"""
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _iter_calamine(path, sheet_name):
+    """Yield sheet rows as lists (row 1 first) using the Rust calamine reader"""
+    sheet = CalamineWorkbook.from_path(path).get_sheet_by_name(sheet_name)
+    first_row, first_col = sheet.start
+
+    # calamine starts at the first used cell; pad so positions match the sheet
+    for _ in range(first_row):
+        yield []
+    padding = [None] * first_col
+    for row in sheet.iter_rows():
+        yield padding + [_calamine_value(value) for value in row]
+
+
+def _convert_dates(df):
+    """
+    Make the date columns datetime64 when every filled cell is a date cell.
+    A column holding text as well ("TBA", "15/03/2025" typed as text) keeps
+    its text as read, as pd.read_excel does, instead of turning it into NaT;
+    its date cells still become pd.Timestamp (calamine returns plain
+    datetime.date), so they format like the rest.
+    """
+    for col in DATE_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col].dropna()
+        if all(isinstance(value, (datetime, date)) for value in values):
+            df[col] = pd.to_datetime(df[col])
+        else:
+            df[col] = df[col].map(_to_timestamp).astype(object)
+    return df
+
+
+def _to_timestamp(value):
+    """A date/datetime cell as pd.Timestamp; anything else unchanged"""
+    if isinstance(value, (datetime, date)) and not isinstance(value, pd.Timestamp):
+        return pd.Timestamp(value)
+    return value
+
+
+def iter_booking_chunks(path, sheet_name, columns=BOOKING_COLUMNS, chunk_size=10000, engine='auto'):
+    """
+    Yield the booking sheet as DataFrames of at most `chunk_size` rows.
+
+    Only `columns` that exist in the header are kept, with cells as the
+    reader returns them (read_bookings converts the dates). The index is the
+    sheet row - 3, as with pd.read_excel(header=1): blank rows inside the data
+    are kept (all-NaN) so positions still line up with the workbook for
+    save_excel; trailing blank rows are dropped.
+    """
+    if engine == 'auto':
+        engine = 'calamine' if CALAMINE_AVAILABLE else 'openpyxl'
+    if engine == 'calamine':
+        rows = _iter_calamine(path, sheet_name)
+    elif engine == 'openpyxl':
+        rows = _iter_openpyxl(path, sheet_name)
+    else:
+        raise ValueError(f"Unknown Excel engine: {engine}")
+
+    for _ in range(HEADER_ROW - 1):
+        next(rows, None)
+    header = list(next(rows, None) or [])
+
+    # First occurrence of each wanted column
+    positions = {}
+    for position, name in enumerate(header):
+        if name in columns and name not in positions:
+            positions[name] = position
+    names = [name for name in columns if name in positions]
+    wanted = [positions[name] for name in names]
+
+    records = []
+    blank_run = 0
+    start = 0
+    for row in rows:
+        values = [row[position] if position < len(row) else None for position in wanted]
+        if all(value is None for value in values):
+            blank_run += 1
+            continue
+
+        records.extend([[None] * len(names)] * blank_run)
+        blank_run = 0
+        records.append(values)
+
+        if len(records) >= chunk_size:
+            yield pd.DataFrame(records, columns=names, index=range(start, start + len(records)))
+            start += len(records)
+            records = []
+
+    if records or start == 0:
+        yield pd.DataFrame(records, columns=names, index=range(start, start + len(records)))
+
+
+def read_bookings(path, sheet_name, columns=BOOKING_COLUMNS, chunk_size=10000, engine='auto'):
+    """Read the whole booking sheet (projected to `columns`) into one DataFrame"""
+    if engine == 'pandas':
+        df = pd.read_excel(path, sheet_name=sheet_name, header=HEADER_ROW - 1)
+        return df[[col for col in df.columns if col in columns]]
+
+    chunks = list(iter_booking_chunks(path, sheet_name, columns, chunk_size, engine))
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+    return _convert_dates(df)
@@ -2,6 +2,7 @@ import { Hotel, LogOut, User } from 'lucide-react';
 import { Link, useLocation } from 'react-router-dom';
 import { cn } from '@/utils/helpers';
 import { useAuth } from '@/contexts/AuthContext';
+import { useChangeFeed } from '@/hooks/useBookings';
 
 const navigation = [
   { name: 'Dashboard', href: '/' },
@@ -14,6 +15,7 @@ const navigation = [
 export default function Header() {
   const location = useLocation();
   const { user, logout } = useAuth();
+  useChangeFeed();
 
   return (
     <header className="bg-white shadow-sm">
@@ -0,0 +1,41 @@
+import { ChevronLeft, ChevronRight } from 'lucide-react';
+
+interface PaginationProps {
+  offset: number;
+  pageSize: number;
+  total: number;
+  onChange: (offset: number) => void;
+}
+
+export default function Pagination({ offset, pageSize, total, onChange }: PaginationProps) {
+  if (total <= pageSize) return null;
+
+  const first = offset + 1;
+  const last = Math.min(offset + pageSize, total);
+
+  return (
+    <div className="mt-4 flex items-center justify-between">
+      <p className="text-sm text-gray-600">
+        Showing {first}-{last} of {total}
+      </p>
+      <div className="flex gap-2">
+        <button
+          onClick={() => onChange(Math.max(0, offset - pageSize))}
+          disabled={offset === 0}
+          className="inline-flex items-center px-3 py-1.5 text-sm font-medium rounded-lg border border-gray-300 bg-white text-gray-700 hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+        >
+          <ChevronLeft className="w-4 h-4 mr-1" />
+          Previous
+        </button>
+        <button
+          onClick={() => onChange(offset + pageSize)}
+          disabled={last >= total}
+          className="inline-flex items-center px-3 py-1.5 text-sm font-medium rounded-lg border border-gray-300 bg-white text-gray-700 hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+        >
+          Next
+          <ChevronRight className="w-4 h-4 ml-1" />
+        </button>
+      </div>
+    </div>
+  );
+}
@@ -24,11 +24,22 @@ export default function ProcessButton() {
     const loadingToast = toast.loading('Processing emails... This may take a few minutes');
 
     try {
-      await processEmailsMutation.mutateAsync({ action: 'full_process' });
-      toast.success('Email process completed successfully!', {
-        id: loadingToast,
-        duration: 5000,
+      const job = await processEmailsMutation.mutateAsync({
+        action: 'full_process',
+        onProgress: (event) => {
+          if (event.type === 'stage' || event.type.endsWith('_sent') || event.type === 'reply_classified') {
+            toast.loading(event.message, { id: loadingToast });
+          }
+        },
       });
+      const { emails_sent, replies_classified, reminders_sent } = job.counters;
+      toast.success(
+        `Email process completed: ${emails_sent} sent, ${replies_classified} replies, ${reminders_sent} reminders`,
+        {
+          id: loadingToast,
+          duration: 5000,
+        }
+      );
     } catch (error) {
       toast.error(
         error instanceof Error ? error.message : 'Failed to process emails',
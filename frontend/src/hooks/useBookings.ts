@@ -1,33 +1,37 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useEffect } from 'react';
+import { keepPreviousData, useQuery, useMutation, useQueryClient, type QueryClient } from '@tanstack/react-query';
 import { apiService } from '@/services/api';
-import type { ProcessRequest } from '@/types';
+import type { Booking, BookingDelta, BookingListParams, BookingsResponse, ChangeEvent, JobEvent, ProcessRequest } from '@/types';
 
 export const useStatus = () => {
   return useQuery({
     queryKey: ['status'],
     queryFn: apiService.getStatus,
-    refetchInterval: 30000, // Refetch every 30 seconds
+    staleTime: Infinity, // Kept current by useChangeFeed
   });
 };
 
-export const useAllBookings = () => {
+export const useAllBookings = (params: BookingListParams = {}) => {
   return useQuery({
-    queryKey: ['bookings', 'all'],
-    queryFn: apiService.getAllBookings,
+    queryKey: ['bookings', 'all', params],
+    queryFn: () => apiService.getAllBookings(params),
+    placeholderData: keepPreviousData, // keep the current page visible while the next loads
   });
 };
 
-export const usePendingBookings = () => {
+export const usePendingBookings = (params: BookingListParams = {}) => {
   return useQuery({
-    queryKey: ['bookings', 'pending'],
-    queryFn: apiService.getPendingBookings,
+    queryKey: ['bookings', 'pending', params],
+    queryFn: () => apiService.getPendingBookings(params),
+    placeholderData: keepPreviousData,
   });
 };
 
-export const useCriticalBookings = () => {
+export const useCriticalBookings = (params: BookingListParams = {}) => {
   return useQuery({
-    queryKey: ['bookings', 'critical'],
-    queryFn: apiService.getCriticalBookings,
+    queryKey: ['bookings', 'critical', params],
+    queryFn: () => apiService.getCriticalBookings(params),
+    placeholderData: keepPreviousData,
   });
 };
 
@@ -39,15 +43,86 @@ export const useConfig = () => {
   });
 };
 
-export const useProcessEmails = () => {
-  const queryClient = useQueryClient();
+interface ProcessEmailsVariables extends ProcessRequest {
+  onProgress?: (event: JobEvent) => void;
+}
 
+export const useProcessEmails = () => {
   return useMutation({
-    mutationFn: (request: ProcessRequest) => apiService.processEmails(request),
-    onSuccess: () => {
-      // Invalidate all queries to refresh data
-      queryClient.invalidateQueries({ queryKey: ['status'] });
-      queryClient.invalidateQueries({ queryKey: ['bookings'] });
+    // Start the job, then follow its progress stream until it finishes
+    mutationFn: async ({ onProgress, ...request }: ProcessEmailsVariables) => {
+      const response = await apiService.processEmails(request);
+      const jobId = response.data?.job_id as string;
+      return apiService.watchJob(jobId, onProgress);
     },
+    // Status and booking caches are updated by useChangeFeed as the run saves
   });
 };
+
+const applyDelta = (booking: Booking, delta: BookingDelta): Booking => {
+  const updated: Record<string, unknown> = { ...booking };
+  for (const [column, value] of Object.entries(delta.fields)) {
+    if (column in updated) {
+      updated[column] = value ?? ''; // the list endpoints send '' for empty cells
+    }
+  }
+  return updated as unknown as Booking;
+};
+
+// Patch cached booking pages in place. A page whose membership or order could
+// change (issue-filtered lists, or sorted by a changed column) is refetched.
+const applyChanges = (queryClient: QueryClient, changes: BookingDelta[]) => {
+  const deltas = new Map(changes.map((delta) => [delta.booking_id, delta]));
+  const changedColumns = new Set(changes.flatMap((delta) => Object.keys(delta.fields)));
+
+  for (const [key, list] of queryClient.getQueriesData<BookingsResponse>({ queryKey: ['bookings'] })) {
+    if (!list?.bookings) continue;
+    const [, kind, params = {}] = key as [string, string, BookingListParams?];
+    const sortColumns = (params.sort ?? '').split(',').map((column) => column.replace(/^[-+]/, ''));
+    const filteredByIssue = kind === 'pending' || kind === 'critical' || !!params.issue;
+
+    if ((filteredByIssue && changedColumns.has('Issue')) || sortColumns.some((column) => changedColumns.has(column))) {
+      queryClient.invalidateQueries({ queryKey: key, exact: true });
+      continue;
+    }
+
+    queryClient.setQueryData<BookingsResponse>(key, {
+      ...list,
+      bookings: list.bookings.map((booking) => {
+        const delta = deltas.get(booking.SrNo ?? null);
+        return delta ? applyDelta(booking, delta) : booking;
+      }),
+    });
+  }
+
+  for (const delta of changes) {
+    if (delta.booking_id !== null) {
+      queryClient.invalidateQueries({ queryKey: ['booking', delta.booking_id] });
+    }
+  }
+};
+
+// Keep status counts and booking lists current from the server's change feed
+// instead of polling and re-downloading them
+export const useChangeFeed = () => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    let lastVersion: number | null = null;
+
+    const close = apiService.subscribeChanges((event: ChangeEvent) => {
+      queryClient.setQueryData(['status'], event.stats);
+
+      if (event.type === 'bookings' && event.changes) {
+        applyChanges(queryClient, event.changes);
+      } else if (event.type === 'reset' || (event.type === 'snapshot' && lastVersion !== null && lastVersion !== event.version)) {
+        // Changes we cannot replay: reload whatever lists are cached
+        queryClient.invalidateQueries({ queryKey: ['bookings'] });
+        queryClient.invalidateQueries({ queryKey: ['booking'] });
+      }
+      lastVersion = event.version;
+    });
+
+    return close;
+  }, [queryClient]);
+};
@@ -1,9 +1,15 @@
+import { useState } from 'react';
 import { FileText } from 'lucide-react';
 import BookingTable from '@/components/BookingTable';
+import Pagination from '@/components/Pagination';
 import { useAllBookings } from '@/hooks/useBookings';
 
+const PAGE_SIZE = 50;
+
 export default function AllBookings() {
-  const { data, isLoading, error } = useAllBookings();
+  const [offset, setOffset] = useState(0);
+  const [search, setSearch] = useState('');
+  const { data, isLoading, error } = useAllBookings({ offset, limit: PAGE_SIZE, q: search || undefined });
 
   if (error) {
     return (
@@ -27,12 +33,23 @@ export default function AllBookings() {
             All Bookings
           </h2>
           <p className="mt-2 text-gray-600">
-            {data ? `Showing ${data.count} bookings` : 'Loading bookings...'}
+            {data ? `${data.total} bookings` : 'Loading bookings...'}
           </p>
         </div>
+        <input
+          type="search"
+          value={search}
+          onChange={(e) => {
+            setSearch(e.target.value);
+            setOffset(0);
+          }}
+          placeholder="Search guest name..."
+          className="w-64 px-3 py-2 text-sm border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-primary-500"
+        />
       </div>
 
       <BookingTable bookings={data?.bookings || []} isLoading={isLoading} />
+      <Pagination offset={offset} pageSize={PAGE_SIZE} total={data?.total ?? 0} onChange={setOffset} />
     </div>
   );
 }
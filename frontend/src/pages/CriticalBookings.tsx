@@ -1,9 +1,14 @@
+import { useState } from 'react';
 import { AlertCircle } from 'lucide-react';
 import BookingTable from '@/components/BookingTable';
+import Pagination from '@/components/Pagination';
 import { useCriticalBookings } from '@/hooks/useBookings';
 
+const PAGE_SIZE = 50;
+
 export default function CriticalBookings() {
-  const { data, isLoading, error } = useCriticalBookings();
+  const [offset, setOffset] = useState(0);
+  const { data, isLoading, error } = useCriticalBookings({ offset, limit: PAGE_SIZE });
 
   if (error) {
     return (
@@ -27,12 +32,12 @@ export default function CriticalBookings() {
             Critical Issues
           </h2>
           <p className="mt-2 text-gray-600">
-            {data ? `${data.count} bookings with critical issues requiring immediate attention` : 'Loading critical bookings...'}
+            {data ? `${data.total} bookings with critical issues requiring immediate attention` : 'Loading critical bookings...'}
           </p>
         </div>
       </div>
 
-      {data && data.count > 0 && (
+      {data && data.total > 0 && (
         <div className="mb-6 bg-red-50 border border-red-200 rounded-lg p-4">
           <div className="flex">
             <AlertCircle className="w-5 h-5 text-red-600 mr-2 flex-shrink-0 mt-0.5" />
@@ -48,6 +53,7 @@ export default function CriticalBookings() {
       )}
 
       <BookingTable bookings={data?.bookings || []} isLoading={isLoading} />
+      <Pagination offset={offset} pageSize={PAGE_SIZE} total={data?.total ?? 0} onChange={setOffset} />
     </div>
   );
 }
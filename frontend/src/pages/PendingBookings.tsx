@@ -1,9 +1,14 @@
+import { useState } from 'react';
 import { Clock } from 'lucide-react';
 import BookingTable from '@/components/BookingTable';
+import Pagination from '@/components/Pagination';
 import { usePendingBookings } from '@/hooks/useBookings';
 
+const PAGE_SIZE = 50;
+
 export default function PendingBookings() {
-  const { data, isLoading, error } = usePendingBookings();
+  const [offset, setOffset] = useState(0);
+  const { data, isLoading, error } = usePendingBookings({ offset, limit: PAGE_SIZE });
 
   if (error) {
     return (
@@ -27,12 +32,13 @@ export default function PendingBookings() {
             Pending HCN
           </h2>
           <p className="mt-2 text-gray-600">
-            {data ? `${data.count} bookings awaiting confirmation` : 'Loading pending bookings...'}
+            {data ? `${data.total} bookings awaiting confirmation` : 'Loading pending bookings...'}
           </p>
         </div>
       </div>
 
       <BookingTable bookings={data?.bookings || []} isLoading={isLoading} />
+      <Pagination offset={offset} pageSize={PAGE_SIZE} total={data?.total ?? 0} onChange={setOffset} />
     </div>
   );
 }
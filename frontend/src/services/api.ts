@@ -1,9 +1,14 @@
 import axios from 'axios';
 import type {
   StatusResponse,
+  StatusBreakdownResponse,
   BookingsResponse,
+  BookingListParams,
   ProcessRequest,
   ProcessResponse,
+  Job,
+  JobEvent,
+  ChangeEvent,
   ConfigResponse,
   LoginRequest,
   AuthToken,
@@ -95,9 +100,15 @@ export const apiService = {
     return data;
   },
 
-  // Get all bookings
-  getAllBookings: async (): Promise<BookingsResponse> => {
-    const { data } = await api.get<BookingsResponse>('/api/bookings');
+  // Get status counts per supplier, hotel and city
+  getStatusBreakdown: async (): Promise<StatusBreakdownResponse> => {
+    const { data } = await api.get<StatusBreakdownResponse>('/api/status/breakdown');
+    return data;
+  },
+
+  // Get bookings (paged, filtered and sorted by `params`)
+  getAllBookings: async (params: BookingListParams = {}): Promise<BookingsResponse> => {
+    const { data } = await api.get<BookingsResponse>('/api/bookings', { params });
     return data;
   },
 
@@ -113,15 +124,21 @@ export const apiService = {
     return data;
   },
 
+  // Get booking details by FileNo
+  getBookingByFileNo: async (fileNo: string): Promise<BookingDetails> => {
+    const { data } = await api.get<BookingDetails>(`/api/bookings/by-file/${encodeURIComponent(fileNo)}`);
+    return data;
+  },
+
   // Get pending bookings
-  getPendingBookings: async (): Promise<BookingsResponse> => {
-    const { data } = await api.get<BookingsResponse>('/api/bookings/pending');
+  getPendingBookings: async (params: BookingListParams = {}): Promise<BookingsResponse> => {
+    const { data } = await api.get<BookingsResponse>('/api/bookings/pending', { params });
     return data;
   },
 
   // Get critical bookings
-  getCriticalBookings: async (): Promise<BookingsResponse> => {
-    const { data } = await api.get<BookingsResponse>('/api/bookings/critical');
+  getCriticalBookings: async (params: BookingListParams = {}): Promise<BookingsResponse> => {
+    const { data } = await api.get<BookingsResponse>('/api/bookings/critical', { params });
     return data;
   },
 
@@ -153,12 +170,54 @@ export const apiService = {
 
   // ==================== Process ====================
 
-  // Process emails
+  // Start processing in the background; the response carries the job id
   processEmails: async (request: ProcessRequest): Promise<ProcessResponse> => {
     const { data } = await api.post<ProcessResponse>('/api/process', request);
     return data;
   },
 
+  // Get a processing job's state and counters
+  getJob: async (jobId: string): Promise<Job> => {
+    const { data } = await api.get<Job>(`/api/jobs/${jobId}`);
+    return data;
+  },
+
+  // Follow booking changes; returns a function that closes the stream.
+  // The browser reconnects on its own and resumes from the last version seen.
+  subscribeChanges: (onEvent: (event: ChangeEvent) => void): (() => void) => {
+    const source = new EventSource(`${API_BASE_URL}/api/changes`);
+    source.onmessage = (message) => onEvent(JSON.parse(message.data));
+    return () => source.close();
+  },
+
+  // Follow a job's progress events until it finishes
+  watchJob: (jobId: string, onEvent?: (event: JobEvent) => void): Promise<Job> => {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events`);
+      source.onmessage = (message) => {
+        const event: JobEvent = JSON.parse(message.data);
+        onEvent?.(event);
+        if (event.type === 'done' || event.type === 'error') {
+          source.close();
+          apiService.getJob(jobId).then((job) => {
+            if (job.state === 'failed') {
+              reject(new Error(job.error || 'Processing failed'));
+            } else {
+              resolve(job);
+            }
+          }, reject);
+        }
+      };
+      source.onerror = () => {
+        // The browser reconnects on its own (resuming via Last-Event-ID);
+        // give up only once the stream is closed for good
+        if (source.readyState === EventSource.CLOSED) {
+          reject(new Error('Lost connection to the progress stream'));
+        }
+      };
+    });
+  },
+
   // ==================== Configuration ====================
 
   // Get configuration
@@ -29,12 +29,61 @@ export interface StatusResponse {
   reminded: number;
 }
 
+export interface StatusCounts {
+  total: number;
+  received: number;
+  critical: number;
+  non_critical: number;
+  pending: number;
+}
+
+export interface StatusBreakdownResponse {
+  status: string;
+  breakdowns: {
+    supplier: Record<string, StatusCounts>;
+    hotel: Record<string, StatusCounts>;
+    city: Record<string, StatusCounts>;
+  };
+}
+
+export interface BookingDelta {
+  booking_id: number | null;
+  file_no: string | null;
+  fields: Partial<Record<'EmailSent' | 'EmailSentTime' | 'ReminderSent' | 'ReminderTime' | 'Issue' | 'SupplierHCN', string | null>>;
+}
+
+export interface ChangeEvent {
+  version: number;
+  type: 'snapshot' | 'bookings' | 'reset';
+  time?: string;
+  stats: StatusResponse;
+  changes?: BookingDelta[];
+}
+
 export interface BookingsResponse {
   status: string;
-  count: number;
+  count: number; // rows in this page
+  total: number; // rows matching the filters
+  offset: number | null;
+  limit: number | null;
+  next_cursor: string | null;
   bookings: Booking[];
 }
 
+export interface BookingListParams {
+  offset?: number;
+  limit?: number;
+  cursor?: string;
+  fields?: string; // comma-separated columns
+  sort?: string; // comma-separated columns, '-' for descending
+  issue?: string; // received | critical | non_critical | pending (comma-separated)
+  supplier?: string;
+  city?: string;
+  check_in_from?: string; // YYYY-MM-DD
+  check_in_to?: string;
+  q?: string; // guest name contains
+}
+
 export interface ProcessRequest {
   action: 'send_emails' | 'check_inbox' | 'send_reminders' | 'full_process';
 }
@@ -45,6 +94,36 @@ export interface ProcessResponse {
   data?: Record<string, unknown>;
 }
 
+export type JobState = 'queued' | 'running' | 'succeeded' | 'failed';
+
+export interface Job {
+  id: string;
+  action: ProcessRequest['action'];
+  state: JobState;
+  stage: 'send' | 'inbox' | 'reminders' | null;
+  counters: {
+    emails_sent: number;
+    replies_classified: number;
+    reminders_sent: number;
+  };
+  result: Record<string, unknown> | null;
+  error: string | null;
+  created: string;
+  started: string | null;
+  finished: string | null;
+  event_count: number;
+}
+
+export interface JobEvent {
+  id: number;
+  type: string; // 'stage' | 'email_sent' | 'reply_classified' | 'reminder_sent' | 'info' | 'done' | 'error' | ...
+  message: string;
+  time: string;
+  stage?: string;
+  file_no?: string;
+  category?: string;
+}
+
 export interface ConfigResponse {
   gmail_address: string;
   reminder_after_hours: number;
@@ -0,0 +1,187 @@
+"""
+Rule-based HCN extraction for HCN Email Management System
+Classifies templated supplier replies locally and leaves ambiguous ones to OpenAI
+"""
+
+import re
+
+# Prefixes of our own / supplier system references that are never an HCN
+INTERNAL_REF_PATTERNS = ['OSTR', 'DIDA', 'OTLMA', 'DIDAMA', 'FILE-', 'REF-', 'BKG-']
+
+# "Confirmation No: 12345678", "HCN - ABC123", "Conf# 991", "Hotel confirmation number is X1".
+# Label and value must share a line, so a bare "HCN" at the end of the
+# subject never pairs with the first word of the body.
+LABELED_NUMBER_PATTERN = re.compile(
+    r'\b(?:hotel[ \t]+)?(?:confirmation[ \t]*(?:no\.?|number|num|code|#)?|conf\.?[ \t]*(?:no\.?|#)|hcn(?:[ \t]*(?:no\.?|number|#))?)'
+    r'(?:[ \t]+is)?[ \t]*[:#\-–=]?[ \t]*([A-Z0-9][A-Z0-9\-/]{2,24})',
+    re.IGNORECASE
+)
+
+# Words of a label; seen as a "value" they mean another label follows ("HCN Confirmation no: 123")
+LABEL_WORDS = {'hotel', 'confirmation', 'conf', 'no', 'number', 'num', 'code', 'hcn', 'is'}
+
+# Label values that say the number is not there yet ("Confirmation number: awaited")
+PLACEHOLDER_VALUES = {
+    'pending', 'awaited', 'awaiting', 'tba', 'tbc', 'tbd', 'na', 'n/a', 'nil', 'none',
+    'later', 'soon', 'shortly', 'follow', 'follows', 'required', 'requested'
+}
+
+# Values shaped like a date (20-03-2025, 2025/03/20, 12/03, 12-Mar-2026) or a phone number (+91-98765-43210)
+_DATE_LIKE = re.compile(
+    r'^(?:\d{1,4}[-/.]\d{1,2}[-/.]\d{2,4}|\d{1,2}[-/.]\d{1,2}'
+    r'|\d{1,2}[-/.]?(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*(?:[-/.]?\d{2,4})?)$',
+    re.IGNORECASE
+)
+_PHONE_LIKE = re.compile(r'^\d{2,5}(?:[-/]\d{2,5}){2,}$')
+
+# "no rate issue", "not sold out", "without any rate mismatch" - a negated critical phrase
+_NEGATION_BEFORE = re.compile(r"\b(?:no|not|never|without|isn't|wasn't|aren't|there's no)\s+(?:\w+\s+){0,2}$")
+
+CRITICAL_PHRASES = [
+    'sold out', 'fully booked', 'no room available', 'no rooms available', 'no availability',
+    'rate issue', 'rate mismatch', 'rate not available', 'unable to confirm', 'cannot confirm',
+    'can not confirm', 'booking rejected', 'booking declined', 'request declined'
+]
+
+PENDING_PHRASES = [
+    'will revert', 'will check and revert', 'will get back', 'under process', 'we are checking',
+    'awaiting confirmation', 'will update you', 'will share the confirmation'
+]
+
+# Lines that start the quoted original (our request) in a reply
+_QUOTE_MARKERS = re.compile(
+    r'^\s*(?:On .+ wrote:|-+\s*Original Message\s*-+|From:\s|BOOKING DETAILS:|We kindly request the Hotel Confirmation)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def _clean_ref(value):
+    """Normalize a reference for comparison ('' for missing/NaN)"""
+    if value is None or value != value:  # NaN
+        return ''
+    return str(value).lower().strip()
+
+
+def hcn_rejection_reason(hcn, our_reference, supplier_ref):
+    """
+    Return why `hcn` cannot be a hotel confirmation number (it overlaps our
+    FileNo / SupplierRef or looks like an internal reference), or None if it
+    is acceptable.
+    """
+    hcn_str = str(hcn).strip()
+    hcn_lower = hcn_str.lower()
+    our_ref_lower = _clean_ref(our_reference)
+    supplier_ref_lower = _clean_ref(supplier_ref)
+
+    reason = ''
+    if our_ref_lower and (hcn_lower in our_ref_lower or our_ref_lower in hcn_lower):
+        reason = f"Rejected: '{hcn_str}' matches our FileNo. "
+    elif supplier_ref_lower and (hcn_lower in supplier_ref_lower or supplier_ref_lower in hcn_lower):
+        reason = f"Rejected: '{hcn_str}' matches SupplierRef. "
+
+    for pattern in INTERNAL_REF_PATTERNS:
+        if pattern.lower() in hcn_lower:
+            reason = f"Rejected: '{hcn_str}' looks like internal ref. " + reason
+            break
+
+    return reason or None
+
+
+def _suspicious_value(value):
+    """Why a labeled value should not be trusted without the LLM, or None"""
+    if value.lower() in PLACEHOLDER_VALUES:
+        return 'placeholder'
+    if _DATE_LIKE.match(value):
+        return 'date'
+    if _PHONE_LIKE.match(value) and sum(char.isdigit() for char in value) >= 9:
+        return 'phone number'
+    return None
+
+
+def _find_phrases(text_lower, phrases):
+    """(phrases present, phrases of those that are negated at some occurrence)"""
+    found, negated = [], []
+    for phrase in phrases:
+        start = text_lower.find(phrase)
+        if start < 0:
+            continue
+        found.append(phrase)
+        while start >= 0:
+            if _NEGATION_BEFORE.search(text_lower[max(0, start - 40):start]):
+                negated.append(phrase)
+                break
+            start = text_lower.find(phrase, start + 1)
+    return found, negated
+
+
+def _labeled_matches(text):
+    """
+    Every LABELED_NUMBER_PATTERN match, overlapping ones included: a match
+    whose value is really the next label ("HCN Confirmation no: 4455") must
+    not hide the label it swallowed.
+    """
+    pos = 0
+    while True:
+        match = LABELED_NUMBER_PATTERN.search(text, pos)
+        if match is None:
+            return
+        yield match
+        pos = match.start() + 1
+
+
+def strip_quoted_text(body):
+    """Keep only the supplier's own text, dropping '>' lines and the quoted request"""
+    marker = _QUOTE_MARKERS.search(body)
+    if marker and marker.start() > 0:
+        body = body[:marker.start()]
+    return '\n'.join(line for line in body.splitlines() if not line.lstrip().startswith('>'))
+
+
+def extract_hcn(subject, body, booking_info):
+    """
+    Classify a reply without calling OpenAI.
+
+    Returns {'hcn', 'category', 'reason'} when the email is unambiguous,
+    or None when it should be escalated to the LLM:
+    - exactly one valid labeled number and no critical phrase -> Received
+    - a critical phrase, no labeled number and no "will revert" -> Critical
+    - a "will revert" style phrase and neither of the above -> Non Critical
+    Labels followed by a date, phone number or placeholder ("pending") and
+    negated critical phrases ("no rate issue") always go to the LLM.
+    """
+    text = f"{subject}\n{strip_quoted_text(body)}"
+    text_lower = text.lower()
+
+    our_reference = booking_info.get('file_no', '')
+    supplier_ref = booking_info.get('supplier_ref', '')
+
+    labeled = []
+    for match in _labeled_matches(text):
+        value = match.group(1).strip('-/')
+        if value.lower().rstrip('.') in LABEL_WORDS:
+            continue
+        if _suspicious_value(value):
+            return None
+        if not any(char.isdigit() for char in value):
+            continue  # e.g. "HCN Request", "confirmation for"
+        if hcn_rejection_reason(value, our_reference, supplier_ref):
+            continue
+        if value.upper() not in (v.upper() for v in labeled):
+            labeled.append(value)
+
+    critical, negated = _find_phrases(text_lower, CRITICAL_PHRASES)
+    if negated:
+        return None
+    pending = [phrase for phrase in PENDING_PHRASES if phrase in text_lower]
+
+    if len(labeled) == 1 and not critical:
+        return {'hcn': labeled[0], 'category': 'Received', 'reason': 'Labeled confirmation number (rule-based)'}
+
+    # "cannot confirm yet, will revert" is not a rejection - let the LLM decide
+    if critical and not labeled and not pending:
+        return {'hcn': None, 'category': 'Critical', 'reason': f"Reply says '{critical[0]}' (rule-based)"}
+
+    if pending and not labeled and not critical:
+        return {'hcn': None, 'category': 'Non Critical', 'reason': f"Reply says '{pending[0]}' (rule-based)"}
+
+    return None
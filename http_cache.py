@@ -0,0 +1,261 @@
+"""
+HTTP caching for HCN Email Management System
+Entity tags and conditional GET (304 Not Modified) for the read API, response
+compression (brotli when installed, else gzip) and hit-ratio counters
+"""
+
+import hashlib
+import threading
+import uuid
+import zlib
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+def make_etag(*parts):
+    """Weak entity tag from the values that determine a response"""
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value matches `etag` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
+
+
+class CacheStats:
+    """Counters of the caching middlewares, for /api/cache/stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0          # cacheable GETs
+        self.conditional = 0       # ... that sent If-None-Match
+        self.not_modified = 0      # ... answered 304
+        self.precheck_hits = 0     # ... answered 304 without running the endpoint
+        self.compressed = {}       # encoding -> responses
+        self.bytes_in = 0          # body bytes before compression
+        self.bytes_out = 0         # ... after
+
+    def count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def count_compressed(self, encoding):
+        with self._lock:
+            self.compressed[encoding] = self.compressed.get(encoding, 0) + 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'conditional_requests': self.conditional,
+                'not_modified': self.not_modified,
+                'precheck_hits': self.precheck_hits,
+                'hit_ratio': round(self.not_modified / self.requests, 4) if self.requests else 0.0,
+                'conditional_hit_ratio': round(self.not_modified / self.conditional, 4) if self.conditional else 0.0,
+                'compressed_responses': dict(self.compressed),
+                'compression_ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None
+            }
+
+
+class ConditionalGetMiddleware:
+    """
+    Tags GET responses under `rules` with an ETag derived from `version()`
+    (the data they are built from) plus the request path and query, and
+    answers a matching If-None-Match with 304.
+
+    `rules` is a list of (path prefix, precheck). With precheck the 304 is
+    sent before the endpoint runs; without it (endpoints behind auth) the
+    endpoint runs and only its body is dropped. Responses that set their own
+    ETag (finer-grained, e.g. a single booking) are passed through as is.
+
+    `version()` may block (it can reload the bookings), so it runs in the
+    threadpool rather than on the event loop.
+    """
+
+    def __init__(self, app, version, rules, stats=None):
+        self.app = app
+        self.version = version
+        self.rules = rules
+        self.stats = stats or CacheStats()
+        # Versions restart with the process; the boot id keeps old tags from matching
+        self.boot_id = uuid.uuid4().hex
+
+    def _precheck(self, path):
+        """None if `path` is not cacheable, else whether to check before running the endpoint"""
+        for prefix, precheck in self.rules:
+            if path == prefix or path.startswith(prefix.rstrip('/') + '/'):
+                return precheck
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            await self.app(scope, receive, send)
+            return
+        precheck = self._precheck(scope['path'])
+        if precheck is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get('if-none-match')
+        version = await anyio.to_thread.run_sync(self.version)
+        etag = make_etag(self.boot_id, version, scope['path'], scope.get('query_string', b''))
+        self.stats.count(requests=1, conditional=1 if if_none_match else 0)
+
+        if precheck and etag_matches(if_none_match, etag):
+            self.stats.count(not_modified=1, precheck_hits=1)
+            await send_not_modified(send, etag)
+            return
+
+        dropping = False
+
+        async def send_tagged(message):
+            nonlocal dropping
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                if 'etag' in headers:
+                    if message['status'] == 304:
+                        self.stats.count(not_modified=1)
+                elif message['status'] == 200:
+                    if etag_matches(if_none_match, etag):
+                        self.stats.count(not_modified=1)
+                        dropping = True
+                        await send_not_modified(send, etag)
+                        return
+                    headers['ETag'] = etag
+                    headers.setdefault('Cache-Control', 'no-cache')
+            elif dropping:
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_tagged)
+
+
+async def send_not_modified(send, etag):
+    await send({
+        'type': 'http.response.start',
+        'status': 304,
+        'headers': [(b'etag', etag.encode('latin-1')), (b'cache-control', b'no-cache')]
+    })
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class _Compressor:
+    """Streaming brotli/gzip compressor; each chunk is flushed so streams stay live"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=4)
+        else:
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data, final):
+        if self.encoding == 'br':
+            return self._brotli.process(data) + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def negotiate_encoding(accept_encoding):
+    """'br' or 'gzip' from an Accept-Encoding header, or None"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if BROTLI_AVAILABLE and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies of at least `minimum_size` bytes (and every
+    streamed response) with brotli or gzip, as the client accepts. Event
+    streams, empty responses and already-encoded bodies are left alone.
+    """
+
+    def __init__(self, app, minimum_size=1000, stats=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.stats = stats or CacheStats()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if message['type'] != 'http.response.body':
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                content_type = headers.get('content-type', '')
+                if not (
+                    'content-encoding' in headers
+                    or content_type.startswith('text/event-stream')
+                    or start['status'] in (204, 304)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    compressor = _Compressor(encoding)
+                    self.stats.count_compressed(encoding)
+                    headers['Content-Encoding'] = encoding
+                    headers.add_vary_header('Accept-Encoding')
+                    if 'content-length' in headers:
+                        del headers['Content-Length']
+                    if not more_body:
+                        compressed = compressor.compress(body, final=True)
+                        self.stats.count(bytes_in=len(body), bytes_out=len(compressed))
+                        headers['Content-Length'] = str(len(compressed))
+                        await send(start)
+                        start = None
+                        await send({**message, 'body': compressed})
+                        return
+                await send(start)
+                start = None
+
+            if compressor is not None:
+                compressed = compressor.compress(body, final=not more_body)
+                self.stats.count(bytes_in=len(body), bytes_out=len(compressed))
+                message = {**message, 'body': compressed}
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
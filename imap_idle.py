@@ -0,0 +1,278 @@
+"""
+IMAP IDLE listener for HCN Email Management System
+Holds an IDLE connection to the inbox and runs the inbox stage as soon as the
+server announces new mail, with a periodic catch-up scan and reconnection
+
+Usage:
+    python imap_idle.py              # run until Ctrl+C
+    ENABLE_IMAP_IDLE=true            # or run inside the FastAPI backend
+"""
+
+import imaplib
+import itertools
+import re
+import select
+import ssl
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from config import IMAP_IDLE_TIMEOUT_SECONDS, IMAP_CATCHUP_MINUTES
+
+# Longest single wait, so stop() is noticed promptly
+_POLL_SECONDS = 1.0
+
+# Longest wait between reconnect attempts while the server is unreachable
+_MAX_BACKOFF_SECONDS = 300
+
+_NEW_MAIL_PATTERN = re.compile(rb'^\* \d+ (EXISTS|RECENT)', re.IGNORECASE)
+
+
+# Fallback command tags; imaplib's own tags use only the letters A-P, so 'Z' never collides
+_fallback_tags = itertools.count(1)
+
+
+def supports_idle(mail):
+    return 'IDLE' in mail.capabilities
+
+
+def new_command_tag(mail):
+    """
+    A fresh tag for a command sent by hand. imaplib has no public way to send
+    IDLE (before Python 3.14), so use its private tag counter when present
+    and fall back to our own tag sequence if a release drops it.
+    """
+    make_tag = getattr(mail, '_new_tag', None)
+    if callable(make_tag):
+        return make_tag()
+    return b'Z%d' % next(_fallback_tags)
+
+
+def _readable(mail):
+    """
+    True if response data can be read without blocking. imaplib reads through
+    a buffered file, so lines that arrived together with an earlier one
+    ("+ idling" and "* 4 EXISTS" in one segment) sit in `mail.file` where
+    select() cannot see them: peek the buffer with the socket non-blocking,
+    which also pulls in anything waiting on the socket (or decrypted by SSL).
+    """
+    peek = getattr(mail.file, 'peek', None)
+    if peek is None:
+        readable, _, _ = select.select([mail.sock], [], [], 0)
+        return bool(readable)
+
+    timeout = mail.sock.gettimeout()
+    mail.sock.setblocking(False)
+    try:
+        # b'' at end of stream is readable too: readline() then reports the close
+        return bool(peek(1)) or _at_eof(mail)
+    except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+
+def _at_eof(mail):
+    readable, _, _ = select.select([mail.sock], [], [], 0)
+    return bool(readable)
+
+
+def idle(mail, timeout, stop_event=None):
+    """
+    IDLE on the selected mailbox (RFC 2177) until the server announces new
+    mail, `timeout` seconds pass or `stop_event` is set.
+
+    Returns True if an EXISTS/RECENT notification arrived. Raises
+    imaplib.IMAP4.abort if the connection breaks.
+    """
+    tag = new_command_tag(mail)
+    mail.send(tag + b' IDLE\r\n')
+    line = mail.readline()
+    if not line.startswith(b'+'):
+        raise mail.abort(f"IDLE rejected: {line!r}")
+
+    new_mail = False
+    deadline = time.monotonic() + timeout
+    while not new_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (stop_event is not None and stop_event.is_set()):
+            break
+        if not _readable(mail):
+            select.select([mail.sock], [], [], min(remaining, _POLL_SECONDS))
+            if not _readable(mail):
+                continue
+
+        line = mail.readline()
+        if not line or line.upper().startswith(b'* BYE'):
+            raise mail.abort("connection closed during IDLE")
+        if _NEW_MAIL_PATTERN.match(line):
+            new_mail = True
+
+    mail.send(b'DONE\r\n')
+    while True:
+        line = mail.readline()
+        if not line:
+            raise mail.abort("connection closed while leaving IDLE")
+        if line.startswith(tag):
+            if not line[len(tag):].strip().upper().startswith(b'OK'):
+                raise mail.abort(f"IDLE failed: {line!r}")
+            return new_mail
+        if _NEW_MAIL_PATTERN.match(line):
+            new_mail = True
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class InboxListener:
+    """
+    Runs HCNEmailManager.run_stage('inbox') whenever IDLE reports new mail.
+
+    The inbox stage does its own UID search from the incremental sync
+    checkpoint, so a wake-up fetches only the messages that arrived. A
+    catch-up run happens on every (re)connect and every `catchup_interval`
+    seconds, covering notifications lost while disconnected.
+    """
+
+    def __init__(self, manager, idle_timeout=IMAP_IDLE_TIMEOUT_SECONDS,
+                 catchup_interval=IMAP_CATCHUP_MINUTES * 60, connect=None):
+        self.manager = manager
+        self.idle_timeout = idle_timeout
+        self.catchup_interval = catchup_interval
+        self.connect = connect or manager.connect_gmail_imap
+        self.connected = False
+        self.reconnects = 0
+        self.runs = 0
+        self.last_run = None
+        self.last_reason = None
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start listening in a daemon thread"""
+        if self.running:
+            return
+        if self.manager.sync_state is None:
+            print("⚠️  IMAP_INCREMENTAL_SYNC is off; every wake-up rescans the whole DAYS_TO_CHECK window")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='hcn-imap-idle', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        return {
+            'running': self.running,
+            'connected': self.connected,
+            'reconnects': self.reconnects,
+            'runs': self.runs,
+            'last_run': _iso(self.last_run),
+            'last_reason': self.last_reason,
+            'last_result': self.last_result,
+            'last_error': self.last_error
+        }
+
+    def _process(self, reason):
+        print(f"📬 IMAP listener: checking inbox ({reason})")
+        self.last_result = self.manager.run_stage('inbox')
+        self.runs += 1
+        self.last_run = time.time()
+        self.last_reason = reason
+
+    def _listen(self, mail):
+        """IDLE on one connection until it breaks or stop() is called"""
+        self._process('catch-up')
+        next_catchup = time.monotonic() + self.catchup_interval
+
+        while not self._stop.is_set():
+            wait = min(self.idle_timeout, max(0.0, next_catchup - time.monotonic()))
+            if supports_idle(mail):
+                new_mail = idle(mail, wait, self._stop)
+            else:
+                # Server without IDLE: degrade to polling at the catch-up interval
+                new_mail = False
+                self._stop.wait(wait)
+                mail.noop()
+
+            if self._stop.is_set():
+                return
+            if new_mail:
+                self._process('new mail')
+            elif time.monotonic() >= next_catchup:
+                self._process('catch-up')
+            else:
+                continue
+            next_catchup = time.monotonic() + self.catchup_interval
+
+    def _loop(self):
+        backoff = 1
+        while not self._stop.is_set():
+            mail = self.connect()
+            if mail is None:
+                self.last_error = "could not connect"
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+                continue
+
+            self.connected = True
+            connected_at = time.monotonic()
+            try:
+                self._listen(mail)
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                self.last_error = str(e)
+                self.reconnects += 1
+                print(f"🔌 IMAP listener: connection lost ({e}), reconnecting...")
+            except Exception as e:
+                self.last_error = str(e)
+                self.reconnects += 1
+                print(f"❌ IMAP listener: {e}")
+                traceback.print_exc()
+            finally:
+                self.connected = False
+                try:
+                    mail.logout()
+                except Exception:
+                    pass
+
+            # Back off only when connections keep failing quickly
+            if time.monotonic() - connected_at > _MAX_BACKOFF_SECONDS:
+                backoff = 1
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+
+
+def main():
+    from config import validate_config
+    from sending_update import HCNEmailManager
+
+    errors = validate_config()
+    if errors:
+        print("\n⚠️  Configuration Errors:")
+        for error in errors:
+            print(f"   - {error}")
+        return
+
+    listener = InboxListener(HCNEmailManager())
+    print("📡 IMAP IDLE listener started (Ctrl+C to stop)")
+    listener.start()
+    try:
+        while listener.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping listener...")
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Incremental IMAP inbox sync for HCN Email Management System
+Persists the last seen UID (and UIDVALIDITY) per mailbox so each run only
+asks the server for mail that arrived since the previous run, and fetches
+messages in batches: headers first, then only the text parts
+"""
+
+import base64
+import email
+import imaplib
+import json
+import os
+import quopri
+import re
+import threading
+from html.parser import HTMLParser
+
+SYNC_STATE_FILE = "imap_sync_state.json"
+
+
+class IMAPSyncState:
+    """UID checkpoints per mailbox, stored as JSON"""
+
+    def __init__(self, path=SYNC_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Persist checkpoints (atomic replace so a crash never truncates the file)"""
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._state, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def get(self, mailbox):
+        """Return {'uidvalidity': int, 'last_uid': int} for a mailbox, or None"""
+        with self._lock:
+            return self._state.get(mailbox)
+
+    def update(self, mailbox, uidvalidity, last_uid):
+        """Advance the checkpoint for a mailbox (never moves backwards)"""
+        with self._lock:
+            current = self._state.get(mailbox)
+            attempts = {}
+            if current and current.get('uidvalidity') == uidvalidity:
+                last_uid = max(last_uid, current.get('last_uid', 0))
+                # Attempt counts are only needed for messages still ahead of the checkpoint
+                attempts = {uid: n for uid, n in current.get('attempts', {}).items() if int(uid) > last_uid}
+            self._state[mailbox] = {'uidvalidity': uidvalidity, 'last_uid': last_uid}
+            if attempts:
+                self._state[mailbox]['attempts'] = attempts
+
+    def record_failures(self, mailbox, uidvalidity, uids, max_attempts):
+        """
+        Count a failed attempt for each UID. Returns the UIDs that have now
+        failed `max_attempts` times and should be given up on.
+        """
+        if not uids:
+            return set()
+        with self._lock:
+            current = self._state.get(mailbox)
+            if not current or current.get('uidvalidity') != uidvalidity:
+                current = {'uidvalidity': uidvalidity, 'last_uid': 0}
+                self._state[mailbox] = current
+            attempts = current.setdefault('attempts', {})
+            exhausted = set()
+            for uid in set(uids):
+                attempts[str(uid)] = attempts.get(str(uid), 0) + 1
+                if attempts[str(uid)] >= max_attempts:
+                    exhausted.add(uid)
+            return exhausted
+
+
+def get_uidvalidity(mail, mailbox='INBOX'):
+    """Get the UIDVALIDITY of a mailbox, or None if the server did not report it"""
+    typ, data = mail.status(mailbox, '(UIDVALIDITY)')
+    if typ != 'OK' or not data or not data[0]:
+        return None
+    match = re.search(rb'UIDVALIDITY (\d+)', data[0])
+    return int(match.group(1)) if match else None
+
+
+def search_uids(mail, criteria):
+    """Run a UID SEARCH and return the matching UIDs as ints"""
+    typ, data = mail.uid('SEARCH', None, criteria)
+    if typ != 'OK' or not data or not data[0]:
+        return []
+    return [int(uid) for uid in data[0].split()]
+
+
+def find_new_uids(mail, sync_state, mailbox_key, since_date, mailbox='INBOX'):
+    """
+    Find UIDs that need processing.
+
+    Returns (uids, uidvalidity, full_scan). With a valid checkpoint only
+    `UID > last_uid` is requested; when there is no checkpoint or UIDVALIDITY
+    changed, falls back to a `SINCE since_date` window scan.
+    """
+    uidvalidity = get_uidvalidity(mail, mailbox)
+    checkpoint = sync_state.get(mailbox_key) if sync_state else None
+
+    if checkpoint and uidvalidity is not None and checkpoint.get('uidvalidity') == uidvalidity:
+        last_uid = int(checkpoint.get('last_uid', 0))
+        # "n:*" always includes the highest UID, even when it is below n
+        uids = [uid for uid in search_uids(mail, f'UID {last_uid + 1}:*') if uid > last_uid]
+        return uids, uidvalidity, False
+
+    return search_uids(mail, f'(SINCE {since_date})'), uidvalidity, True
+
+
+# ==================== BATCHED FETCH ====================
+
+TRIAGE_HEADER_FIELDS = 'SUBJECT FROM IN-REPLY-TO REFERENCES MESSAGE-ID'
+
+
+def compress_uid_set(uids):
+    """Turn [1, 2, 3, 7] into the IMAP sequence set '1:3,7'"""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(a) if a == b else f'{a}:{b}' for a, b in ranges)
+
+
+def _skip_spaces(data, pos):
+    while pos < len(data) and data[pos:pos + 1] in (b' ', b'\r', b'\n'):
+        pos += 1
+    return pos
+
+
+def _parse_value(data, pos, literals):
+    """Parse one IMAP value (list, quoted string, literal, NIL or atom) at `pos`"""
+    char = data[pos:pos + 1]
+
+    if char == b'(':
+        items = []
+        pos += 1
+        while True:
+            pos = _skip_spaces(data, pos)
+            if pos >= len(data):
+                return items, pos
+            if data[pos:pos + 1] == b')':
+                return items, pos + 1
+            item, pos = _parse_value(data, pos, literals)
+            items.append(item)
+
+    if char == b'"':
+        out = bytearray()
+        pos += 1
+        while pos < len(data) and data[pos:pos + 1] != b'"':
+            if data[pos:pos + 1] == b'\\':
+                pos += 1
+            out += data[pos:pos + 1]
+            pos += 1
+        return bytes(out), pos + 1
+
+    if char == b'\x00':
+        end = data.index(b'\x00', pos + 1)
+        return literals[int(data[pos + 1:end])], end + 1
+
+    # Atom; section specifiers like BODY[HEADER.FIELDS (A B)] are kept whole
+    start = pos
+    depth = 0
+    while pos < len(data):
+        char = data[pos:pos + 1]
+        if char == b'[':
+            depth += 1
+        elif char == b']':
+            depth -= 1
+        elif depth == 0 and char in (b' ', b'(', b')'):
+            break
+        pos += 1
+    atom = data[start:pos]
+    return (None if atom.upper() == b'NIL' else atom), pos
+
+
+def parse_fetch_response(data):
+    """
+    Parse imaplib FETCH response data into one {ITEM: value} dict per message.
+
+    imaplib splits each message around its literals ({n} strings); literals
+    are swapped for placeholders so the response can be parsed as one
+    s-expression per message.
+    """
+    messages = []
+    current = None
+
+    def flush():
+        if current is None:
+            return
+        text, literals = current
+        start = text.find(b'(')
+        if start < 0:
+            return
+        items, _ = _parse_value(text, start, literals)
+        attrs = {}
+        for i in range(0, len(items) - 1, 2):
+            key = items[i]
+            if isinstance(key, bytes):
+                attrs[key.decode('ascii', errors='ignore').upper()] = items[i + 1]
+        messages.append(attrs)
+
+    for part in data or []:
+        if isinstance(part, tuple):
+            meta, literal = part
+        else:
+            meta, literal = part, None
+        if not isinstance(meta, bytes):
+            continue
+
+        if re.match(rb'^\d+ \(', meta):
+            flush()
+            current = (b'', [])
+
+        if current is None:
+            continue
+        text, literals = current
+        if literal is not None:
+            meta = re.sub(rb'\{\d+\}$', b'\x00' + str(len(literals)).encode() + b'\x00', meta)
+            literals.append(literal)
+        current = (text + meta, literals)
+
+    flush()
+    return messages
+
+
+def _walk_text_parts(structure, prefix=''):
+    """[(section, encoding, charset, subtype)] for every text/plain and text/html part"""
+    if not isinstance(structure, list) or not structure:
+        return []
+
+    # Multipart: leading child structures, then the subtype
+    if isinstance(structure[0], list):
+        parts = []
+        for n, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            parts.extend(_walk_text_parts(child, f'{prefix}{n}.'))
+        return parts
+
+    media_type = (structure[0] or b'').decode('ascii', errors='ignore').lower()
+    subtype = (structure[1] or b'').decode('ascii', errors='ignore').lower() if len(structure) > 1 else ''
+    if media_type != 'text' or subtype not in ('plain', 'html'):
+        return []
+
+    charset = 'utf-8'
+    params = structure[2] if len(structure) > 2 and isinstance(structure[2], list) else []
+    for i in range(0, len(params) - 1, 2):
+        if isinstance(params[i], bytes) and params[i].lower() == b'charset' and params[i + 1]:
+            charset = params[i + 1].decode('ascii', errors='ignore')
+    encoding = structure[5].decode('ascii', errors='ignore').lower() if len(structure) > 5 and structure[5] else '7bit'
+
+    # A single-part message's body is section 1
+    section = prefix[:-1] if prefix else '1'
+    return [(section, encoding, charset, subtype)]
+
+
+def find_text_parts(structure):
+    """
+    Walk a parsed BODYSTRUCTURE and return [(section, encoding, charset, subtype)]
+    for every text/plain part, or for the text/html parts when a message has
+    no plain text at all (HTML-only replies).
+    """
+    parts = _walk_text_parts(structure)
+    plain = [part for part in parts if part[3] == 'plain']
+    return plain or parts
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML body"""
+
+    _BLOCK_TAGS = {'br', 'p', 'div', 'tr', 'li', 'table', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    _HIDDEN_TAGS = {'script', 'style', 'head', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._HIDDEN_TAGS:
+            self._hidden += 1
+        elif tag in self._BLOCK_TAGS:
+            self.chunks.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self._HIDDEN_TAGS:
+            self._hidden = max(0, self._hidden - 1)
+        elif tag in self._BLOCK_TAGS:
+            self.chunks.append('\n')
+
+    def handle_data(self, data):
+        if not self._hidden:
+            self.chunks.append(data)
+
+
+def html_to_text(markup):
+    """Strip tags from an HTML body, keeping line breaks at block elements"""
+    parser = _TextExtractor()
+    parser.feed(markup)
+    parser.close()
+    lines = (' '.join(line.split()) for line in ''.join(parser.chunks).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def decode_part(payload, encoding, charset):
+    """Decode a fetched body part using its transfer encoding and charset"""
+    if payload is None:
+        return ''
+    if encoding == 'base64':
+        payload = base64.b64decode(payload, validate=False)
+    elif encoding == 'quoted-printable':
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset, errors='ignore')
+    except LookupError:
+        return payload.decode('utf-8', errors='ignore')
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_headers(mail, uids, batch_size=200):
+    """
+    Phase 1: batched header + BODYSTRUCTURE fetch.
+
+    Returns ({uid: {'headers': Message, 'parts': [...]}}, failed_uids).
+    Uses BODY.PEEK so triage does not mark anything as read.
+    """
+    results = {}
+    failed = []
+    items = f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({TRIAGE_HEADER_FIELDS})])'
+
+    for batch in _batches(list(uids), batch_size):
+        try:
+            typ, data = mail.uid('FETCH', compress_uid_set(batch), items)
+            if typ != 'OK':
+                raise imaplib.IMAP4.error(f"FETCH returned {typ}")
+        except Exception:
+            failed.extend(batch)
+            continue
+
+        for attrs in parse_fetch_response(data):
+            uid = attrs.get('UID')
+            if uid is None:
+                continue
+            header_bytes = next(
+                (value for key, value in attrs.items() if key.startswith('BODY[HEADER')), b''
+            ) or b''
+            results[int(uid)] = {
+                'headers': email.message_from_bytes(header_bytes),
+                'parts': find_text_parts(attrs.get('BODYSTRUCTURE'))
+            }
+
+    # Messages the server did not return (e.g. expunged meanwhile) are dropped
+    return results, failed
+
+
+def fetch_text_bodies(mail, header_results, batch_size=200):
+    """
+    Phase 2: batched fetch of only the text parts of the given messages
+    (HTML parts are reduced to their text).
+
+    `header_results` is {uid: entry} from fetch_headers(); messages with the
+    same part layout are fetched together. Messages with no text part at all
+    get an empty body so they are still analysed (and checkpointed) rather
+    than silently skipped. Returns ({uid: body}, failed_uids).
+    """
+    layouts = {}
+    bodies = {}
+    for uid, entry in header_results.items():
+        if entry['parts']:
+            layouts.setdefault(tuple(entry['parts']), []).append(uid)
+        else:
+            bodies[uid] = ''
+
+    failed = []
+
+    for parts, layout_uids in layouts.items():
+        sections = ' '.join(f'BODY.PEEK[{section}]' for section, _, _, _ in parts)
+        for batch in _batches(layout_uids, batch_size):
+            try:
+                typ, data = mail.uid('FETCH', compress_uid_set(batch), f'(UID {sections})')
+                if typ != 'OK':
+                    raise imaplib.IMAP4.error(f"FETCH returned {typ}")
+            except Exception:
+                failed.extend(batch)
+                continue
+
+            for attrs in parse_fetch_response(data):
+                uid = attrs.get('UID')
+                if uid is None:
+                    continue
+                body = ''
+                for section, encoding, charset, subtype in parts:
+                    text = decode_part(attrs.get(f'BODY[{section}]'), encoding, charset)
+                    body += html_to_text(text) if subtype == 'html' else text
+                bodies[int(uid)] = body
+
+    return bodies, failed
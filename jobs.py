@@ -0,0 +1,144 @@
+"""
+Background job tracking for HCN Email Management System
+Runs long processing actions off the request thread and records their state,
+per-stage counters and progress events for polling or streaming
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Progress event kind -> job counter it increments
+EVENT_COUNTERS = {
+    'email_sent': 'emails_sent',
+    'reply_classified': 'replies_classified',
+    'reminder_sent': 'reminders_sent',
+}
+
+# States after which a job never changes again
+FINISHED_STATES = ('succeeded', 'failed')
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class Job:
+    """One processing run: state, counters and the ordered list of progress events"""
+
+    def __init__(self, action):
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.state = 'queued'
+        self.stage = None
+        self.counters = {counter: 0 for counter in EVENT_COUNTERS.values()}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.state in FINISHED_STATES
+
+    def add_event(self, kind, message, **fields):
+        """Record a progress event (called from the worker thread)"""
+        with self._lock:
+            if kind == 'stage':
+                self.stage = fields.get('stage')
+            counter = EVENT_COUNTERS.get(kind)
+            if counter:
+                self.counters[counter] += 1
+            self.events.append({
+                'id': len(self.events),
+                'type': kind,
+                'message': message,
+                'time': _iso(time.time()),
+                **fields
+            })
+
+    def events_since(self, last_id):
+        """Events with id > last_id"""
+        with self._lock:
+            return self.events[last_id + 1:]
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'action': self.action,
+                'state': self.state,
+                'stage': self.stage,
+                'counters': dict(self.counters),
+                'result': self.result,
+                'error': self.error,
+                'created': _iso(self.created),
+                'started': _iso(self.started),
+                'finished': _iso(self.finished),
+                'event_count': len(self.events)
+            }
+
+
+class JobManager:
+    """Runs jobs on a single worker thread and keeps the most recent ones"""
+
+    def __init__(self, max_jobs=50):
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, action, func, on_finish=None):
+        """
+        Queue func(progress) and return its Job immediately. `progress` is
+        the job's add_event; `on_finish` runs after the job ends either way.
+        """
+        job = Job(action)
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs beyond max_jobs
+            finished = [j for j in self._jobs.values() if j.done]
+            for old in sorted(finished, key=lambda j: j.created)[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[old.id]
+        try:
+            self._executor.submit(self._run, job, func, on_finish)
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise
+        return job
+
+    def _run(self, job, func, on_finish):
+        job.state = 'running'
+        job.started = time.time()
+        try:
+            job.result = func(job.add_event)
+            # The final event goes out before the state flips, so a stream
+            # that stops once the job is done never misses it
+            job.add_event('done', f"{job.action} finished")
+            job.state = 'succeeded'
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.add_event('error', f"{job.action} failed: {e}")
+            job.state = 'failed'
+        finally:
+            job.finished = time.time()
+            if on_finish is not None:
+                on_finish()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Known jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
@@ -0,0 +1,136 @@
+"""
+Message thread tracking for HCN Email Management System
+Gives every HCN request a deterministic Message-ID and resolves replies back to
+their booking through the In-Reply-To / References headers
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+MESSAGE_THREADS_FILE = "message_threads.db"
+
+# Previous whole-file JSON map; imported into MESSAGE_THREADS_FILE on first use
+LEGACY_THREADS_FILE = "message_threads.json"
+
+_MESSAGE_ID_PATTERN = re.compile(r'<[^<>\s]+>')
+
+
+def make_message_id(file_no, kind, sent_time, sender_address):
+    """
+    Build the Message-ID for a request email.
+
+    `kind` is 'initial' or 'reminder' and `sent_time` the timestamp stored in
+    EmailSentTime / ReminderTime, so the id can be rebuilt from the sheet and
+    a deliberate re-send gets a new id instead of being de-duplicated.
+    """
+    slug = re.sub(r'[^A-Za-z0-9-]+', '-', str(file_no)).strip('-') or 'booking'
+    stamp = re.sub(r'\D', '', str(sent_time))
+    domain = sender_address.split('@')[-1] if '@' in str(sender_address) else 'hcn.local'
+    return f"<hcn.{slug}.{kind}.{stamp}@{domain}>"
+
+
+def parse_message_ids(value):
+    """Extract the <...> message ids from an In-Reply-To / References header"""
+    if not value:
+        return []
+    return _MESSAGE_ID_PATTERN.findall(str(value))
+
+
+class ThreadIndex:
+    """
+    Persistent Message-ID -> FileNo map for the emails we sent, in SQLite.
+
+    Recorded ids are buffered and written in one transaction by save(), which
+    also forgets ids older than `retention_days` (replies to them are past
+    DAYS_TO_CHECK and long since matched or handled by hand).
+    """
+
+    def __init__(self, path=MESSAGE_THREADS_FILE, retention_days=90, legacy_path=LEGACY_THREADS_FILE):
+        if path.endswith('.json'):
+            # Older .env files still point MESSAGE_THREADS_FILE at the JSON map
+            legacy_path, path = path, os.path.splitext(path)[0] + '.db'
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS threads (
+                   message_id TEXT PRIMARY KEY,
+                   file_no TEXT NOT NULL,
+                   recorded_at REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_threads_recorded_at ON threads(recorded_at)")
+        self._conn.commit()
+        if legacy_path and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+
+    def _migrate(self, legacy_path):
+        """Import the old message_threads.json map (kept as <name>.migrated)"""
+        try:
+            with open(legacy_path, 'r') as f:
+                threads = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO threads (message_id, file_no, recorded_at) VALUES (?, ?, ?)",
+                [(message_id, str(file_no), now) for message_id, file_no in threads.items()]
+            )
+            self._conn.commit()
+        os.replace(legacy_path, legacy_path + '.migrated')
+        print(f"📥 Migrated {len(threads)} message threads from {legacy_path} to {self.path}")
+
+    def save(self):
+        """Write the ids recorded since the last save and prune expired ones"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO threads (message_id, file_no, recorded_at) VALUES (?, ?, ?)",
+                [(message_id, file_no, recorded_at) for message_id, (file_no, recorded_at) in pending.items()]
+            )
+            self._conn.execute(
+                "DELETE FROM threads WHERE recorded_at < ?", (time.time() - self.retention_seconds,)
+            )
+            self._conn.commit()
+
+    def record(self, message_id, file_no):
+        """Remember that `message_id` was sent for booking `file_no`"""
+        with self._lock:
+            self._pending[message_id] = (str(file_no), time.time())
+
+    def resolve(self, headers):
+        """
+        Return the FileNo a reply belongs to, or None if it is not threaded
+        onto one of our emails. In-Reply-To wins; References are checked
+        newest first.
+        """
+        candidates = parse_message_ids(headers.get('In-Reply-To'))
+        candidates += reversed(parse_message_ids(headers.get('References')))
+
+        with self._lock:
+            for message_id in candidates:
+                if message_id in self._pending:
+                    return self._pending[message_id][0]
+                row = self._conn.execute(
+                    "SELECT file_no FROM threads WHERE message_id = ?", (message_id,)
+                ).fetchone()
+                if row is not None:
+                    return row[0]
+        return None
+
+    def __len__(self):
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+            return stored + len(self._pending)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
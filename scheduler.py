@@ -0,0 +1,178 @@
+"""
+Background scheduler for HCN Email Management System
+Runs the send, inbox-check and reminder stages on their own intervals instead
+of waiting for someone to start a run from the menu or the API
+
+Usage:
+    python scheduler.py              # run until Ctrl+C
+    ENABLE_SCHEDULER=true            # or run inside the FastAPI backend
+"""
+
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from config import (
+    SCHEDULE_SEND_MINUTES,
+    SCHEDULE_INBOX_MINUTES,
+    SCHEDULE_REMINDER_MINUTES
+)
+from sending_update import STAGES, HCNEmailManager
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class StageSchedule:
+    """Interval and run history of one stage"""
+
+    def __init__(self, stage, interval_seconds):
+        self.stage = stage
+        self.interval = interval_seconds
+        self.next_run = time.time()
+        self.last_started = None
+        self.last_finished = None
+        self.last_duration = None
+        self.last_result = None
+        self.last_error = None
+        self.runs = 0
+        self.skipped = 0
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'interval_seconds': self.interval,
+            'next_run': _iso(self.next_run),
+            'last_started': _iso(self.last_started),
+            'last_finished': _iso(self.last_finished),
+            'last_duration_seconds': round(self.last_duration, 3) if self.last_duration is not None else None,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'runs': self.runs,
+            'skipped': self.skipped
+        }
+
+
+class Scheduler:
+    """
+    Runs HCNEmailManager stages on independent intervals from one daemon thread.
+
+    A stage that comes due while another run holds the manager's run lock
+    (e.g. a full process started from the API) is skipped until its next
+    interval rather than queued behind it.
+    """
+
+    def __init__(self, manager, intervals=None):
+        if intervals is None:
+            intervals = {
+                'send': SCHEDULE_SEND_MINUTES * 60,
+                'inbox': SCHEDULE_INBOX_MINUTES * 60,
+                'reminders': SCHEDULE_REMINDER_MINUTES * 60
+            }
+        self.manager = manager
+        # An interval of 0 disables the stage
+        self.schedules = {
+            stage: StageSchedule(stage, intervals[stage])
+            for stage in STAGES if intervals.get(stage)
+        }
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='hcn-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop after the current stage finishes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        """Next/last run timings of every stage"""
+        return {
+            'running': self.running,
+            'stages': [schedule.to_dict() for schedule in self.schedules.values()]
+        }
+
+    def run_due(self):
+        """Run every stage whose next run time has passed (in STAGES order)"""
+        for schedule in self.schedules.values():
+            if self._stop.is_set():
+                return
+            if time.time() >= schedule.next_run:
+                self._run(schedule)
+
+    def _run(self, schedule):
+        started = time.time()
+        try:
+            result = self.manager.run_stage(schedule.stage, blocking=False)
+            if result is None:
+                schedule.skipped += 1
+                print(f"⏭️  Scheduler: {schedule.stage} skipped (another run in progress)")
+            else:
+                schedule.runs += 1
+                schedule.last_started = started
+                schedule.last_finished = time.time()
+                schedule.last_duration = schedule.last_finished - started
+                schedule.last_result = result
+                schedule.last_error = None
+        except Exception as e:
+            schedule.runs += 1
+            schedule.last_started = started
+            schedule.last_finished = time.time()
+            schedule.last_duration = schedule.last_finished - started
+            schedule.last_error = str(e)
+            print(f"❌ Scheduler: {schedule.stage} failed: {e}")
+            traceback.print_exc()
+
+        # Next run is measured from this run's start; a run longer than the
+        # interval makes the stage due again immediately, never twice at once
+        schedule.next_run = started + schedule.interval
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_due()
+            if not self.schedules:
+                return
+            next_run = min(schedule.next_run for schedule in self.schedules.values())
+            self._stop.wait(max(0.0, next_run - time.time()))
+
+
+def main():
+    from config import validate_config
+
+    errors = validate_config()
+    if errors:
+        print("\n⚠️  Configuration Errors:")
+        for error in errors:
+            print(f"   - {error}")
+        return
+
+    scheduler = Scheduler(HCNEmailManager())
+    print("🕒 HCN scheduler started:")
+    for schedule in scheduler.schedules.values():
+        print(f"   {schedule.stage}: every {schedule.interval / 60:g} min")
+    print("   (Ctrl+C to stop)")
+
+    scheduler.start()
+    try:
+        while scheduler.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping scheduler...")
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,19 +13,35 @@ Categories:
 """
 
 import pandas as pd
-import smtplib
 import imaplib
-import email
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
+from email.utils import parseaddr
 from datetime import datetime, timedelta
 from openai import OpenAI
+import openai
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
 import time
 import os
 import json
 import re
+import sys
 from openpyxl import load_workbook
+from booking_store import BookingStore, ChangeSet, RELEVANT_STATUSES, summarize_bookings
+from booking_db import BookingRepository
+from booking_query import BookingView
+from change_feed import ChangeFeed, booking_deltas
+from excel_loader import read_bookings
+from snapshot_cache import SnapshotCache
+from smtp_sender import SMTPSender, TokenBucket
+from booking_matcher import BookingMatcher
+from classification_cache import ClassificationCache
+from hcn_extractor import extract_hcn, hcn_rejection_reason
+from message_threads import ThreadIndex, make_message_id
+from imap_sync import IMAPSyncState, find_new_uids, fetch_headers, fetch_text_bodies
 
 # ========================= CONFIGURATION =========================
 # Import all configuration from config.py (which loads from .env file)
@@ -35,28 +51,92 @@ from config import (
     OPENAI_API_KEY,
     EXCEL_FILE_PATH,
     SHEET_NAME,
+    BOOKING_BACKEND,
+    LARGE_SHEET_ROWS,
+    BOOKING_DB_PATH,
+    EXCEL_ENGINE,
+    EXCEL_CHUNK_SIZE,
+    BOOKING_SNAPSHOT_ENABLED,
+    BOOKING_SNAPSHOT_FILE,
     REMINDER_AFTER_HOURS,
     DAYS_TO_CHECK,
-    DELAY_BETWEEN_EMAILS,
+    IMAP_INCREMENTAL_SYNC,
+    IMAP_SYNC_STATE_FILE,
+    IMAP_HEADER_TRIAGE,
+    IMAP_FETCH_BATCH_SIZE,
+    MESSAGE_THREADS_FILE,
+    MESSAGE_THREADS_RETENTION_DAYS,
+    OPENAI_CONCURRENCY,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_RETRIES,
+    MAX_REPLY_ATTEMPTS,
+    FAST_PATH_EXTRACTION,
+    CLASSIFICATION_CACHE_ENABLED,
+    CLASSIFICATION_CACHE_FILE,
+    CLASSIFICATION_CACHE_TTL_DAYS,
+    CLASSIFICATION_CACHE_MAX_ENTRIES,
+    EMAILS_PER_MINUTE,
+    EMAIL_BURST,
     COMPANY_NAME,
     SENDER_NAME
 )
 # =================================================================
 
+# Bump whenever the analyze_with_openai prompt or validation changes, so cached
+# classifications made with the old prompt are not reused
+ANALYSIS_PROMPT_VERSION = 1
+
+# Subject words that make an email worth downloading even when it is not a
+# threaded reply and does not mention a booking reference
+TRIAGE_SUBJECT_KEYWORDS = ['hcn', 'confirm', 'booking', 'reservation']
+
+# Stages of process_all that can also be run on their own (run_stage)
+STAGES = ['send', 'inbox', 'reminders']
+
+
+def is_transient_error(e):
+    """True for OpenAI errors worth retrying later: timeouts, connection errors, 429 and 5xx"""
+    if isinstance(e, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(e, openai.APIStatusError) and (e.status_code == 429 or e.status_code >= 500)
+
 
 class HCNEmailManager:
     def __init__(self):
         self.gmail_address = GMAIL_ADDRESS
         self.gmail_password = GMAIL_APP_PASSWORD
-        self.openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        # Retries are handled by create_completion_with_retry
+        self.openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
         self.excel_path = EXCEL_FILE_PATH
         self.sheet_name = SHEET_NAME
+        self.repository = BookingRepository(BOOKING_DB_PATH) if BOOKING_BACKEND == 'sqlite' else None
+        self._large_sheet_hinted = False
+        self.snapshot_cache = SnapshotCache(
+            self.excel_path, self.sheet_name, BOOKING_SNAPSHOT_FILE
+        ) if BOOKING_SNAPSHOT_ENABLED else None
+        self.store = BookingStore(
+            BOOKING_DB_PATH if self.repository else self.excel_path, self.load_bookings, BookingView
+        )
+        self.sync_state = IMAPSyncState(IMAP_SYNC_STATE_FILE) if IMAP_INCREMENTAL_SYNC else None
+        self.thread_index = ThreadIndex(MESSAGE_THREADS_FILE, retention_days=MESSAGE_THREADS_RETENTION_DAYS)
+        self.classification_stats = {'local': 0, 'openai': 0}
+        # Held by whichever process run / stage is reading and saving bookings
+        self.run_lock = threading.Lock()
+        # Progress callback of the current run (see report)
+        self._progress = None
+        # Saved changes, for clients following the bookings (see persist)
+        self.change_feed = ChangeFeed()
+        self.classification_cache = ClassificationCache(
+            CLASSIFICATION_CACHE_FILE,
+            ttl_days=CLASSIFICATION_CACHE_TTL_DAYS,
+            max_entries=CLASSIFICATION_CACHE_MAX_ENTRIES
+        ) if CLASSIFICATION_CACHE_ENABLED else None
     
     # ==================== EXCEL FUNCTIONS ====================
     
     def read_excel(self):
-        """Read bookings from Excel"""
-        df = pd.read_excel(self.excel_path, sheet_name=self.sheet_name, header=1)
+        """Read bookings from Excel (only the columns the system uses)"""
+        df = read_bookings(self.excel_path, self.sheet_name, chunk_size=EXCEL_CHUNK_SIZE, engine=EXCEL_ENGINE)
         df = self.ensure_columns(df)
         return df
     
@@ -72,10 +152,24 @@ class HCNEmailManager:
         for col, default in new_columns.items():
             if col not in df.columns:
                 df[col] = default
+        
+        # Tracking columns hold text; an all-empty column is read as float,
+        # which would reject the string values written by process_all
+        for col in list(new_columns) + ['SupplierHCN']:
+            if col in df.columns and df[col].dtype != object:
+                df[col] = df[col].astype(object)
         return df
     
-    def save_excel(self, df):
-        """Save updated data to Excel"""
+    def save_excel(self, df, changes=None):
+        """
+        Save updated data to Excel.
+        With a ChangeSet only the changed cells are written; without one every
+        row's tracking columns are written (full export).
+        """
+        if changes is not None and not len(changes):
+            print(f"   ✅ Excel unchanged")
+            return
+        
         wb = load_workbook(self.excel_path)
         ws = wb[self.sheet_name]
         
@@ -96,17 +190,80 @@ class HCNEmailManager:
                 ws.cell(row=2, column=max_col, value=col_name)
         
         # Update data rows (data starts from row 3)
-        for idx, row in df.iterrows():
-            excel_row = idx + 3
-            
-            for col_name in ['EmailSent', 'EmailSentTime', 'ReminderSent', 'ReminderTime', 'Issue', 'SupplierHCN']:
-                if col_name in columns and col_name in df.columns:
-                    value = row.get(col_name)
-                    if pd.notna(value):
-                        ws.cell(row=excel_row, column=columns[col_name], value=value)
+        tracked = ['EmailSent', 'EmailSentTime', 'ReminderSent', 'ReminderTime', 'Issue', 'SupplierHCN']
+        if changes is not None:
+            cells = [(idx, col_name) for idx, col_name in changes.cells() if col_name in tracked]
+        else:
+            cells = [(idx, col_name) for idx in df.index for col_name in tracked]
+        
+        for idx, col_name in cells:
+            if col_name in columns and col_name in df.columns:
+                value = df.at[idx, col_name]
+                if pd.notna(value):
+                    ws.cell(row=idx + 3, column=columns[col_name], value=value)
+        
+        # The snapshot can be rebuilt from `df` only if it came from the
+        # workbook we are overwriting (an incremental save of a loaded sheet)
+        snapshot_current = (
+            self.snapshot_cache is not None and changes is not None and self.snapshot_cache.is_fresh()
+        )
         
         wb.save(self.excel_path)
-        print(f"   ✅ Excel saved")
+        if snapshot_current:
+            self.snapshot_cache.write(df)
+        elif self.snapshot_cache is not None:
+            self.snapshot_cache.invalidate()
+        self.store.invalidate()
+        print(f"   ✅ Excel saved ({len(cells)} cells)")
+    
+    def read_excel_cached(self):
+        """Read bookings from the Arrow snapshot, re-parsing the sheet only if it changed"""
+        if self.snapshot_cache is None:
+            return self.read_excel()
+        
+        df = self.snapshot_cache.load()
+        if df is not None:
+            return self.ensure_columns(df)
+        
+        source_key = self.snapshot_cache.source_key()
+        df = self.read_excel()
+        self.snapshot_cache.write(df, source_key)
+        return df
+    
+    def load_bookings(self):
+        """Read bookings from the configured backend (Excel sheet or SQLite database)"""
+        if self.repository is None:
+            df = self.read_excel_cached()
+            if len(df) > LARGE_SHEET_ROWS and not self._large_sheet_hinted:
+                # Each Excel save rewrites the whole workbook; see BOOKING_BACKEND in config.py
+                print(f"   💡 {len(df)} bookings: saves rewrite the whole sheet. "
+                      f"Set BOOKING_BACKEND=sqlite for much faster saves.")
+                self._large_sheet_hinted = True
+            return df
+        
+        if not self.repository.exists():
+            print(f"   📥 Importing {self.excel_path} into {self.repository.path}...")
+            self.repository.import_dataframe(self.read_excel())
+        return self.ensure_columns(self.repository.load())
+    
+    def save_bookings(self, df, changes=None):
+        """
+        Save tracking columns to the configured backend (only `changes` when
+        given). Returns False if there was nothing to save; the store is then
+        left as it is, so its version does not move.
+        """
+        if changes is not None and not len(changes):
+            print(f"   ✅ Bookings unchanged")
+            return False
+        
+        if self.repository is None:
+            self.save_excel(df, changes)
+            return True
+        
+        updated = self.repository.save(df, changes=changes)
+        self.store.invalidate()
+        print(f"   ✅ Database saved ({updated} bookings updated)")
+        return True
     
     # ==================== EMAIL FUNCTIONS ====================
     
@@ -174,19 +331,31 @@ Reference: {file_no}
 """
         return subject, body
     
-    def send_email(self, recipient, subject, body):
-        """Send email via Gmail SMTP"""
+    def create_smtp_sender(self):
+        """Create a persistent, rate-limited Gmail SMTP session for a batch of sends"""
+        rate_limiter = TokenBucket(rate=EMAILS_PER_MINUTE / 60.0, capacity=EMAIL_BURST)
+        return SMTPSender(self.gmail_address, self.gmail_password, rate_limiter=rate_limiter)
+    
+    def send_email(self, recipient, subject, body, sender=None, message_id=None, in_reply_to=None):
+        """Send email via Gmail SMTP (reusing `sender`'s session when given)"""
         try:
             msg = MIMEMultipart()
             msg['From'] = self.gmail_address
             msg['To'] = recipient
             msg['Subject'] = subject
+            if message_id:
+                msg['Message-ID'] = message_id
+            if in_reply_to:
+                # Keep reminders in the same thread as the initial request
+                msg['In-Reply-To'] = in_reply_to
+                msg['References'] = in_reply_to
             msg.attach(MIMEText(body, 'plain'))
             
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls()
-                server.login(self.gmail_address, self.gmail_password)
-                server.send_message(msg)
+            if sender is not None:
+                sender.send(msg)
+            else:
+                with SMTPSender(self.gmail_address, self.gmail_password) as one_off:
+                    one_off.send(msg)
             return True, "Sent"
         except Exception as e:
             return False, str(e)
@@ -204,6 +373,16 @@ Reference: {file_no}
             print(f"❌ Gmail error: {str(e)}")
             return None
     
+    def disconnect_gmail_imap(self, mail):
+        """Log out of an IMAP connection, dropping the socket if LOGOUT fails"""
+        try:
+            mail.logout()
+        except Exception:
+            try:
+                mail.shutdown()
+            except Exception:
+                pass
+    
     def decode_header_value(self, header):
         """Decode email header"""
         if not header:
@@ -217,26 +396,56 @@ Reference: {file_no}
                 result += part
         return result
     
-    def get_email_body(self, msg):
-        """Extract email body"""
-        body = ""
-        if msg.is_multipart():
-            for part in msg.walk():
-                if part.get_content_type() == "text/plain":
-                    try:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            body += payload.decode('utf-8', errors='ignore')
-                    except:
-                        pass
-        else:
-            try:
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    body = payload.decode('utf-8', errors='ignore')
-            except:
-                body = str(msg.get_payload())
-        return body
+    def is_reply_candidate(self, matcher, headers):
+        """Cheap header-only check whether an email could be a booking reply"""
+        sender = parseaddr(self.decode_header_value(headers['From']))[1].lower()
+        if sender and sender == self.gmail_address.lower():
+            return False  # our own sent copy
+        
+        if not IMAP_HEADER_TRIAGE:
+            return True
+        
+        if headers['In-Reply-To'] or headers['References']:
+            return True
+        
+        subject = self.decode_header_value(headers['Subject'])
+        subject_lower = subject.lower().strip()
+        if subject_lower.startswith(('re:', 'fw:', 'fwd:')):
+            return True
+        if any(keyword in subject_lower for keyword in TRIAGE_SUBJECT_KEYWORDS):
+            return True
+        return matcher.match(subject) is not None
+    
+    def fetch_inbox_messages(self, mail, uids, matcher):
+        """
+        Two-phase fetch: batched headers for triage, then the text parts
+        (plain, or HTML reduced to text) of candidate replies only.
+        Returns (messages, failed_uids) where messages are dicts with
+        uid/subject/body/headers, in UID order.
+        """
+        header_results, failed_uids = fetch_headers(mail, uids, IMAP_FETCH_BATCH_SIZE)
+        
+        candidates = {
+            uid: entry for uid, entry in header_results.items()
+            if self.is_reply_candidate(matcher, entry['headers'])
+        }
+        print(f"   Triage: {len(candidates)} of {len(header_results)} emails look like replies")
+        
+        bodies, body_failed = fetch_text_bodies(mail, candidates, IMAP_FETCH_BATCH_SIZE)
+        failed_uids.extend(body_failed)
+        
+        messages = []
+        for uid in sorted(candidates):
+            if uid not in bodies:
+                continue
+            headers = candidates[uid]['headers']
+            messages.append({
+                'uid': uid,
+                'subject': self.decode_header_value(headers['Subject']),
+                'body': bodies[uid],
+                'headers': headers
+            })
+        return messages, failed_uids
     
     # ==================== OPENAI ANALYSIS ====================
     
@@ -246,7 +455,15 @@ Reference: {file_no}
         - Received: HCN number is provided
         - Critical: Cannot provide HCN (no room, rate issue, sold out, etc.)
         - Non Critical: Everything else
+        Results are cached on disk, keyed by the email, booking and prompt version.
         """
+        cache_key = None
+        if self.classification_cache is not None:
+            cache_key = self.classification_cache.make_key(subject, body[:3000], booking_info, ANALYSIS_PROMPT_VERSION)
+            cached = self.classification_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
             our_reference = booking_info.get('file_no', '')
             supplier_ref = booking_info.get('supplier_ref', '')
@@ -308,7 +525,7 @@ Respond with ONLY this JSON:
     "reason": "brief explanation"
 }}"""
 
-            response = self.openai_client.chat.completions.create(
+            response = self.create_completion_with_retry(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You analyze hotel emails and extract HCN numbers. Respond with JSON only."},
@@ -330,31 +547,9 @@ Respond with ONLY this JSON:
             # VALIDATION: Make sure HCN is not our reference number
             hcn = result.get('hcn_number')
             if hcn:
-                hcn_str = str(hcn).strip()
-                hcn_lower = hcn_str.lower()
-                our_ref_lower = str(our_reference).lower().strip()
-                supplier_ref_lower = str(supplier_ref).lower().strip()
-                
-                is_invalid = False
-                
-                # Check if HCN matches our references
-                if our_ref_lower and (hcn_lower == our_ref_lower or hcn_lower in our_ref_lower or our_ref_lower in hcn_lower):
-                    is_invalid = True
-                    result['reason'] = f"Rejected: '{hcn_str}' matches our FileNo. " + result.get('reason', '')
-                
-                elif supplier_ref_lower and (hcn_lower == supplier_ref_lower or hcn_lower in supplier_ref_lower or supplier_ref_lower in hcn_lower):
-                    is_invalid = True
-                    result['reason'] = f"Rejected: '{hcn_str}' matches SupplierRef. " + result.get('reason', '')
-                
-                # Check for common internal reference patterns
-                internal_patterns = ['OSTR', 'DIDA', 'OTLMA', 'DIDAMA', 'FILE-', 'REF-', 'BKG-']
-                for pattern in internal_patterns:
-                    if pattern.lower() in hcn_lower:
-                        is_invalid = True
-                        result['reason'] = f"Rejected: '{hcn_str}' looks like internal ref. " + result.get('reason', '')
-                        break
-                
-                if is_invalid:
+                rejection = hcn_rejection_reason(hcn, our_reference, supplier_ref)
+                if rejection:
+                    result['reason'] = rejection + result.get('reason', '')
                     result['hcn_number'] = None
                     if result.get('category') == 'Received':
                         result['category'] = 'Non Critical'
@@ -363,70 +558,124 @@ Respond with ONLY this JSON:
             if result.get('category') == 'Critical' and result.get('hcn_number'):
                 result['hcn_number'] = None
             
-            return {
+            analysis = {
                 'hcn': result.get('hcn_number'),
                 'category': result.get('category', 'Non Critical'),
                 'reason': result.get('reason', '')
             }
+            if cache_key is not None:
+                self.classification_cache.put(cache_key, analysis)
+            return analysis
             
         except Exception as e:
             print(f"      ⚠️ OpenAI error: {str(e)}")
-            return {'hcn': None, 'category': 'Non Critical', 'reason': 'Analysis failed'}
+            if is_transient_error(e):
+                return {'hcn': None, 'category': 'Non Critical', 'reason': 'Analysis failed', 'failed': True}
+            # Would fail the same way again (bad request, unparseable answer) - leave it to a person
+            return {'hcn': None, 'category': 'Non Critical', 'reason': f'Needs review: analysis failed ({e})'}
     
-    def find_matching_booking(self, df, subject, body):
-        """Find which booking the email is about"""
-        text = f"{subject} {body}".lower()
+    def create_completion_with_retry(self, **kwargs):
+        """Chat completion with a per-request timeout and jittered exponential backoff on 429/5xx"""
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            try:
+                return self.openai_client.chat.completions.create(timeout=OPENAI_TIMEOUT, **kwargs)
+            except (openai.RateLimitError, openai.APIConnectionError, openai.APIStatusError) as e:
+                if not is_transient_error(e) or attempt == OPENAI_MAX_RETRIES:
+                    raise
+                # Full jitter: sleep a random amount up to the exponential cap
+                time.sleep(random.uniform(0, min(30.0, 1.0 * 2 ** attempt)))
+    
+    def classify_replies(self, replies):
+        """
+        Classify replies, results in input order. Unambiguous templated replies
+        are resolved by the rule-based extractor; the rest go to
+        analyze_with_openai concurrently.
+        """
+        results = [None] * len(replies)
+        escalated = []
+        for i, reply in enumerate(replies):
+            if FAST_PATH_EXTRACTION:
+                results[i] = extract_hcn(reply['subject'], reply['body'], reply['booking_info'])
+            if results[i] is None:
+                escalated.append(i)
         
-        for idx, row in df.iterrows():
-            file_no = str(row.get('FileNo', ''))
-            supplier_ref = str(row.get('SupplierRef', ''))
-            guest_name = str(row.get('GuestName', ''))
-            
-            if file_no and file_no.lower() in text:
-                return idx
-            if supplier_ref and pd.notna(row.get('SupplierRef')) and supplier_ref.lower() in text:
-                return idx
-            if guest_name and len(guest_name) > 5:
-                clean_name = re.sub(r'^(MR\.|MRS\.|MS\.)\s*', '', guest_name, flags=re.IGNORECASE)
-                if clean_name.lower() in text:
-                    return idx
-        return None
+        self.classification_stats['local'] += len(replies) - len(escalated)
+        self.classification_stats['openai'] += len(escalated)
+        
+        if escalated:
+            with ThreadPoolExecutor(max_workers=OPENAI_CONCURRENCY) as pool:
+                analyses = pool.map(
+                    lambda i: self.analyze_with_openai(replies[i]['subject'], replies[i]['body'], replies[i]['booking_info']),
+                    escalated
+                )
+                for i, analysis in zip(escalated, analyses):
+                    results[i] = analysis
+        return results
+    
+    def find_matching_booking(self, df, subject, body, matcher=None):
+        """Find which booking the email is about (pass a prebuilt BookingMatcher when matching many emails)"""
+        if matcher is None:
+            matcher = BookingMatcher(df)
+        match = matcher.match(f"{subject} {body}")
+        return match.index if match else None
     
     # ==================== MAIN PROCESS ====================
     
-    def process_all(self):
+    def find_reminder_candidates(self, df, reminder_threshold):
         """
-        Main process:
-        1. Send initial emails to new bookings
-        2. Check inbox and analyze replies with OpenAI
-        3. Auto-send reminders if no HCN after 2 hours
+        Bookings due a reminder:
+        1. Confirmed/Vouchered status
+        2. Email was sent
+        3. No HCN received (Issue is empty/Pending OR Non Critical)
+        4. NOT Critical (needs manual action)
+        5. NOT already Received
+        6. Reminder not sent yet
+        7. Initial email sent at or before `reminder_threshold`
         """
-        print("\n" + "="*60)
-        print("HCN EMAIL MANAGEMENT - PROCESSING")
-        print("="*60)
-        
-        df = self.read_excel()
-        now = datetime.now()
-        reminder_threshold = now - timedelta(hours=REMINDER_AFTER_HOURS)
-        
-        # Filter relevant bookings (Confirmed/Vouchered)
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
+        status = df['Status_lower'] if 'Status_lower' in df.columns else df['Status'].str.lower().str.strip()
+        issue = df['Issue'].where(df['Issue'].notna(), '').astype(str).str.strip()
+        sent_time = pd.to_datetime(df['EmailSentTime'].astype(str), format='%Y-%m-%d %H:%M:%S', errors='coerce')
         
-        # ========== STEP 1: SEND INITIAL EMAILS ==========
+        mask = (
+            status.isin(RELEVANT_STATUSES) &
+            (df['EmailSent'] == 'Yes') &
+            ~issue.isin(['Received', 'Critical']) &
+            (df['ReminderSent'] != 'Yes') &
+            (sent_time <= reminder_threshold)
+        )
+        return df[mask]
+    
+    # ==================== PROCESS STAGES ====================
+    
+    def report(self, kind, message, **fields):
+        """
+        Print a progress line and pass it to the current run's progress
+        callback as progress(kind, message, **fields) - e.g. kind='email_sent'
+        with file_no=...
+        """
+        print(message)
+        if self._progress is not None:
+            try:
+                self._progress(kind, message.strip(), **fields)
+            except Exception as e:
+                print(f"   ⚠️ Progress callback failed: {e}")
+    
+    def send_initial_emails(self, df, changes, sender, now):
+        """Stage 1: send the HCN request to bookings not emailed yet. Returns the number sent"""
         print("\n" + "-"*60)
-        print("📤 STEP 1: Checking for new bookings to email...")
+        self.report('stage', "📤 STEP 1: Checking for new bookings to email...", stage='send')
         print("-"*60)
         
         # Find bookings that need initial email
         new_bookings = df[
-            (df['Status_lower'].isin(['confirmed', 'vouchered'])) &
+            (df['Status_lower'].isin(RELEVANT_STATUSES)) &
             (pd.isna(df['SupplierHCN']) | (df['SupplierHCN'].astype(str).str.strip() == '')) &
             (df['EmailSent'] != 'Yes')
         ]
         
         initial_sent = 0
         if len(new_bookings) > 0:
-            print(f"   Found {len(new_bookings)} new bookings to email")
+            self.report('info', f"   Found {len(new_bookings)} new bookings to email")
             
             for idx in new_bookings.index:
                 row = df.loc[idx]
@@ -436,25 +685,33 @@ Respond with ONLY this JSON:
                     continue
                 
                 subject, body = self.create_email_content(row, is_reminder=False)
-                success, msg = self.send_email(recipient, subject, body)
+                sent_time = now.strftime('%Y-%m-%d %H:%M:%S')
+                message_id = make_message_id(row.get('FileNo'), 'initial', sent_time, self.gmail_address)
+                success, msg = self.send_email(recipient, subject, body, sender=sender, message_id=message_id)
                 
                 if success:
-                    df.at[idx, 'EmailSent'] = 'Yes'
-                    df.at[idx, 'EmailSentTime'] = now.strftime('%Y-%m-%d %H:%M:%S')
+                    self.thread_index.record(message_id, row.get('FileNo'))
+                    changes.set(df, idx, 'EmailSent', 'Yes')
+                    changes.set(df, idx, 'EmailSentTime', sent_time)
                     initial_sent += 1
-                    print(f"   [✓] {row.get('FileNo')} | {row.get('GuestName')} -> {recipient}")
+                    self.report('email_sent', f"   [✓] {row.get('FileNo')} | {row.get('GuestName')} -> {recipient}",
+                                file_no=row.get('FileNo'))
                 else:
-                    print(f"   [✗] {row.get('FileNo')}: {msg}")
-                
-                time.sleep(DELAY_BETWEEN_EMAILS)
+                    self.report('email_failed', f"   [✗] {row.get('FileNo')}: {msg}", file_no=row.get('FileNo'))
             
-            print(f"   ✅ Sent {initial_sent} initial emails")
+            self.report('info', f"   ✅ Sent {initial_sent} initial emails")
         else:
-            print("   No new bookings to email")
+            self.report('info', "   No new bookings to email")
         
-        # ========== STEP 2: CHECK INBOX & ANALYZE ==========
+        return initial_sent
+    
+    def check_inbox(self, df, changes, now):
+        """
+        Stage 2: match inbox replies to bookings and classify them.
+        Returns {'Received': n, 'Critical': n, 'Non Critical': n}.
+        """
         print("\n" + "-"*60)
-        print("📥 STEP 2: Checking inbox for replies...")
+        self.report('stage', "📥 STEP 2: Checking inbox for replies...", stage='inbox')
         print("-"*60)
         
         mail = self.connect_gmail_imap()
@@ -462,157 +719,264 @@ Respond with ONLY this JSON:
         
         if mail:
             date_since = (now - timedelta(days=DAYS_TO_CHECK)).strftime('%d-%b-%Y')
-            _, nums = mail.search(None, f'(SINCE {date_since})')
-            email_ids = nums[0].split()
-            print(f"   Checking {len(email_ids)} emails...")
+            mailbox_key = f"{self.gmail_address}:INBOX"
+            try:
+                email_uids, uidvalidity, full_scan = find_new_uids(mail, self.sync_state, mailbox_key, date_since)
+                scan_mode = f"last {DAYS_TO_CHECK} days" if full_scan else "new since last run"
+                self.report('info', f"   Checking {len(email_uids)} emails ({scan_mode})...")
+                
+                matcher = BookingMatcher(df)
+                messages, failed_uids = self.fetch_inbox_messages(mail, email_uids, matcher)
+            finally:
+                self.disconnect_gmail_imap(mail)
             
             processed = set()
             
-            for num in email_ids:
-                try:
-                    _, data = mail.fetch(num, '(RFC822)')
-                    msg = email.message_from_bytes(data[0][1])
-                    
-                    subject = self.decode_header_value(msg['Subject'])
-                    body = self.get_email_body(msg)
-                    
-                    if not body.strip():
-                        continue
-                    
-                    match_idx = self.find_matching_booking(df, subject, body)
-                    
-                    if match_idx is not None and match_idx not in processed:
-                        row = df.loc[match_idx]
-                        
-                        # Skip if already has Issue (already processed)
-                        if pd.notna(row.get('Issue')) and str(row.get('Issue')).strip():
-                            continue
-                        
-                        print(f"\n   📩 Reply found: {row.get('FileNo')} | {row.get('GuestName')}")
-                        print(f"      🤖 Analyzing with OpenAI...")
-                        
-                        booking_info = {
-                            'guest_name': row.get('GuestName'),
-                            'hotel_name': row.get('HotelName'),
-                            'file_no': row.get('FileNo'),
-                            'supplier_ref': row.get('SupplierRef', '')
-                        }
-                        
-                        analysis = self.analyze_with_openai(subject, body, booking_info)
-                        category = analysis['category']
-                        
-                        if category == 'Received' and analysis['hcn']:
-                            df.at[match_idx, 'SupplierHCN'] = analysis['hcn']
-                            df.at[match_idx, 'Issue'] = 'Received'
-                            print(f"      ✅ RECEIVED - HCN: {analysis['hcn']}")
-                            replies_processed['Received'] += 1
-                        elif category == 'Critical':
-                            df.at[match_idx, 'Issue'] = 'Critical'
-                            print(f"      🚨 CRITICAL - {analysis['reason']}")
-                            replies_processed['Critical'] += 1
-                        else:
-                            df.at[match_idx, 'Issue'] = 'Non Critical'
-                            print(f"      ℹ️  NON CRITICAL - {analysis['reason']}")
-                            replies_processed['Non Critical'] += 1
-                        
-                        processed.add(match_idx)
-                        
-                except Exception as e:
+            # Match every message first, then classify all candidates concurrently
+            replies = []
+            for message in messages:
+                subject = message['subject']
+                body = message['body']
+                
+                if not body.strip():
+                    continue
+                
+                # Exact thread match first; text search only for broken threads
+                match = None
+                thread_file_no = self.thread_index.resolve(message['headers'])
+                match_idx = matcher.lookup_file_no(thread_file_no) if thread_file_no else None
+                if match_idx is None:
+                    match = matcher.match(f"{subject} {body}")
+                    match_idx = match.index if match else None
+                
+                if match_idx is None or match_idx in processed:
+                    continue
+                
+                row = df.loc[match_idx]
+                
+                if match is not None and len(match.candidates) > 1:
+                    others = ', '.join(str(df.at[i, 'FileNo']) for i in match.candidates[1:])
+                    print(f"\n   ⚠️ Ambiguous {match.field} match for {row.get('FileNo')} (also: {others})")
+                
+                # Skip if already has Issue (already processed)
+                if pd.notna(row.get('Issue')) and str(row.get('Issue')).strip():
                     continue
+                
+                print(f"   📩 Reply found: {row.get('FileNo')} | {row.get('GuestName')}")
+                replies.append({
+                    'uid': message['uid'],
+                    'index': match_idx,
+                    'subject': subject,
+                    'body': body,
+                    'booking_info': {
+                        'guest_name': row.get('GuestName'),
+                        'hotel_name': row.get('HotelName'),
+                        'file_no': row.get('FileNo'),
+                        'supplier_ref': row.get('SupplierRef', '')
+                    }
+                })
+                processed.add(match_idx)
             
-            mail.logout()
+            if replies:
+                self.report('info', f"\n   🤖 Analyzing {len(replies)} replies...")
+            self.classification_stats = {'local': 0, 'openai': 0}
+            cache_hits_before = self.classification_cache.hits if self.classification_cache else 0
+            analyses = self.classify_replies(replies)
+            if replies:
+                local = self.classification_stats['local']
+                cached = (self.classification_cache.hits if self.classification_cache else 0) - cache_hits_before
+                print(f"   ⚡ Resolved locally: {local} of {len(replies)} ({local * 100 // len(replies)}%), "
+                      f"from cache: {cached}, sent to OpenAI: {self.classification_stats['openai'] - cached}")
+            if self.classification_cache is not None:
+                self.classification_cache.evict()
+            
+            # Count retries; messages that keep failing are given up on so the checkpoint can pass them
+            analysis_failed = [reply['uid'] for reply, analysis in zip(replies, analyses) if analysis.get('failed')]
+            exhausted = set()
+            if self.sync_state is not None and uidvalidity is not None:
+                exhausted = self.sync_state.record_failures(
+                    mailbox_key, uidvalidity, failed_uids + analysis_failed, MAX_REPLY_ATTEMPTS
+                )
+            for uid in sorted(set(failed_uids) & exhausted):
+                self.report('warning', f"   ⚠️ Could not fetch message UID {uid} after {MAX_REPLY_ATTEMPTS} attempts, skipping it")
+            retry_uids = [uid for uid in failed_uids + analysis_failed if uid not in exhausted]
+            
+            # Apply all results in a single pass
+            for reply, analysis in zip(replies, analyses):
+                match_idx = reply['index']
+                file_no = reply['booking_info']['file_no']
+                category = analysis['category']
+                
+                if analysis.get('failed') and reply['uid'] in exhausted:
+                    changes.set(df, match_idx, 'Issue', 'Non Critical')
+                    self.report('reply_failed', f"   ⚠️ {file_no}: analysis failed {MAX_REPLY_ATTEMPTS} times, "
+                                f"marked NON CRITICAL for review", file_no=file_no, category='Non Critical')
+                    replies_processed['Non Critical'] += 1
+                elif analysis.get('failed'):
+                    # Leave the booking pending so the reply is retried next run
+                    self.report('reply_failed', f"   ⚠️ {file_no}: analysis failed, will retry", file_no=file_no)
+                elif category == 'Received' and analysis['hcn']:
+                    changes.set(df, match_idx, 'SupplierHCN', analysis['hcn'])
+                    changes.set(df, match_idx, 'Issue', 'Received')
+                    self.report('reply_classified', f"   ✅ {file_no}: RECEIVED - HCN: {analysis['hcn']}",
+                                file_no=file_no, category='Received')
+                    replies_processed['Received'] += 1
+                elif category == 'Critical':
+                    changes.set(df, match_idx, 'Issue', 'Critical')
+                    self.report('reply_classified', f"   🚨 {file_no}: CRITICAL - {analysis['reason']}",
+                                file_no=file_no, category='Critical')
+                    replies_processed['Critical'] += 1
+                else:
+                    changes.set(df, match_idx, 'Issue', 'Non Critical')
+                    self.report('reply_classified', f"   ℹ️  {file_no}: NON CRITICAL - {analysis['reason']}",
+                                file_no=file_no, category='Non Critical')
+                    replies_processed['Non Critical'] += 1
+            
+            # Advance the checkpoint; failed messages are retried on the next run
+            if self.sync_state is not None and uidvalidity is not None and email_uids:
+                last_uid = min(retry_uids) - 1 if retry_uids else max(email_uids)
+                self.sync_state.update(mailbox_key, uidvalidity, last_uid)
             
             total_replies = sum(replies_processed.values())
-            print(f"\n   ✅ Processed {total_replies} replies")
+            self.report('info', f"\n   ✅ Processed {total_replies} replies")
         else:
-            print("   ❌ Could not connect to Gmail")
+            self.report('warning', "   ❌ Could not connect to Gmail")
         
-        # ========== STEP 3: SEND REMINDERS ==========
+        return replies_processed
+    
+    def send_reminders(self, df, changes, sender, now):
+        """Stage 3: remind suppliers that have not sent an HCN. Returns the number sent"""
         print("\n" + "-"*60)
-        print("🔔 STEP 3: Checking for reminders (2+ hours, no HCN)...")
+        self.report('stage', "🔔 STEP 3: Checking for reminders (2+ hours, no HCN)...", stage='reminders')
         print("-"*60)
         
         reminders_sent = 0
+        reminder_threshold = now - timedelta(hours=REMINDER_AFTER_HOURS)
+        candidates = self.find_reminder_candidates(df, reminder_threshold)
+        if len(candidates) > 0:
+            self.report('info', f"   Found {len(candidates)} bookings due a reminder")
         
-        for idx, row in df.iterrows():
-            # Conditions for reminder:
-            # 1. Confirmed/Vouchered status
-            # 2. Email was sent
-            # 3. No HCN received (Issue is empty/Pending OR Non Critical)
-            # 4. NOT Critical (needs manual action)
-            # 5. NOT already Received
-            # 6. Reminder not sent yet
-            # 7. 2+ hours passed since initial email
-            
-            status = str(row.get('Status', '')).lower().strip()
-            if status not in ['confirmed', 'vouchered']:
-                continue
-            
-            if row.get('EmailSent') != 'Yes':
-                continue
-            
-            # Skip if already got HCN or has Critical issue
-            issue = row.get('Issue')
-            if pd.notna(issue):
-                issue_str = str(issue).strip()
-                if issue_str == 'Received':
-                    continue  # Got HCN, no reminder needed
-                if issue_str == 'Critical':
-                    continue  # Critical issue, needs manual action
-            
-            # Skip if already reminded
-            if row.get('ReminderSent') == 'Yes':
-                continue
-            
-            # Check if 2+ hours passed
-            sent_time_str = row.get('EmailSentTime')
-            if pd.isna(sent_time_str) or str(sent_time_str).strip() == '':
-                continue
-            
-            try:
-                sent_time = datetime.strptime(str(sent_time_str), '%Y-%m-%d %H:%M:%S')
-                if sent_time > reminder_threshold:
-                    continue  # Less than 2 hours, skip
-            except:
-                continue
-            
-            # Send reminder
+        for idx, row in candidates.iterrows():
             recipient = self.get_recipient_email(row)
             if not recipient:
                 continue
             
             subject, body = self.create_email_content(row, is_reminder=True)
-            success, msg = self.send_email(recipient, subject, body)
+            reminder_time = now.strftime('%Y-%m-%d %H:%M:%S')
+            message_id = make_message_id(row.get('FileNo'), 'reminder', reminder_time, self.gmail_address)
+            initial_id = make_message_id(row.get('FileNo'), 'initial', row.get('EmailSentTime'), self.gmail_address)
+            success, msg = self.send_email(recipient, subject, body, sender=sender,
+                                           message_id=message_id, in_reply_to=initial_id)
             
             if success:
-                df.at[idx, 'ReminderSent'] = 'Yes'
-                df.at[idx, 'ReminderTime'] = now.strftime('%Y-%m-%d %H:%M:%S')
+                self.thread_index.record(message_id, row.get('FileNo'))
+                changes.set(df, idx, 'ReminderSent', 'Yes')
+                changes.set(df, idx, 'ReminderTime', reminder_time)
                 reminders_sent += 1
                 issue_status = str(row.get('Issue')).strip() if pd.notna(row.get('Issue')) else "Pending"
-                print(f"   [✓] REMINDER: {row.get('FileNo')} | {row.get('GuestName')} | Was: {issue_status}")
-            
-            time.sleep(DELAY_BETWEEN_EMAILS)
+                self.report('reminder_sent', f"   [✓] REMINDER: {row.get('FileNo')} | {row.get('GuestName')} | Was: {issue_status}",
+                            file_no=row.get('FileNo'))
         
         if reminders_sent > 0:
-            print(f"\n   ✅ Sent {reminders_sent} reminders")
+            self.report('info', f"\n   ✅ Sent {reminders_sent} reminders")
         else:
-            print("   No reminders needed (all within 2 hours or already reminded)")
+            self.report('info', "   No reminders needed (all within 2 hours or already reminded)")
+        
+        return reminders_sent
+    
+    def persist(self, df, changes):
+        """Save a run's changes, then the inbox checkpoint and thread index, then publish them"""
+        saved = self.save_bookings(df, changes)
+        
+        # Only checkpoint the inbox once the results are safely saved
+        if self.sync_state is not None:
+            self.sync_state.save()
+        self.thread_index.save()
+        
+        # Every save reloads the store; publishing records the new version, so
+        # check_store does not mistake our own write for an outside edit
+        if saved:
+            try:
+                self.change_feed.publish(self.store, booking_deltas(df, changes))
+            except Exception as e:
+                print(f"   ⚠️ Could not publish changes: {e}")
+    
+    def run_stage(self, stage, blocking=True, progress=None):
+        """
+        Run one stage ('send', 'inbox' or 'reminders') on a fresh copy of the
+        bookings and save only what it changed.
+        Returns the stage result, or None if another run holds the lock and
+        `blocking` is False. `progress` receives report() events.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        if not self.run_lock.acquire(blocking=blocking):
+            return None
+        
+        self._progress = progress
+        try:
+            df = self.store.snapshot().copy()
+            changes = ChangeSet()
+            now = datetime.now()
+            
+            if stage == 'inbox':
+                result = self.check_inbox(df, changes, now)
+            else:
+                with self.create_smtp_sender() as sender:
+                    if stage == 'send':
+                        result = self.send_initial_emails(df, changes, sender, now)
+                    else:
+                        result = self.send_reminders(df, changes, sender, now)
+            
+            self.persist(df, changes)
+            return result
+        finally:
+            self._progress = None
+            self.run_lock.release()
+    
+    def process_all(self, progress=None):
+        """
+        Main process:
+        1. Send initial emails to new bookings
+        2. Check inbox and analyze replies with OpenAI
+        3. Auto-send reminders if no HCN after 2 hours
+        Returns the counts of this run. `progress` receives report() events.
+        """
+        with self.run_lock:
+            self._progress = progress
+            try:
+                return self._process_all()
+            finally:
+                self._progress = None
+    
+    def _process_all(self):
+        print("\n" + "="*60)
+        print("HCN EMAIL MANAGEMENT - PROCESSING")
+        print("="*60)
+        
+        # Work on a private copy; 'Status_lower' is precomputed by the store
+        df = self.store.snapshot().copy()
+        now = datetime.now()
+        
+        # Every cell written below is recorded so the save touches only those
+        changes = ChangeSet()
+        
+        # One SMTP session is shared by the send and reminder steps
+        with self.create_smtp_sender() as sender:
+            initial_sent = self.send_initial_emails(df, changes, sender, now)
+            replies_processed = self.check_inbox(df, changes, now)
+            reminders_sent = self.send_reminders(df, changes, sender, now)
         
         # ========== SAVE & SUMMARY ==========
-        self.save_excel(df)
+        self.persist(df, changes)
         
         # Show summary
         print("\n" + "="*60)
         print("📊 SUMMARY")
         print("="*60)
         
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-        
-        received = (relevant['Issue'] == 'Received').sum()
-        critical = (relevant['Issue'] == 'Critical').sum()
-        non_critical = (relevant['Issue'] == 'Non Critical').sum()
-        pending = relevant['Issue'].isna().sum()
-        reminded = (relevant['ReminderSent'] == 'Yes').sum()
+        relevant = df[df['Status_lower'].isin(RELEVANT_STATUSES)]
+        stats = summarize_bookings(relevant)
         
         print(f"\nThis Run:")
         print(f"   📤 Initial emails sent: {initial_sent}")
@@ -620,11 +984,11 @@ Respond with ONLY this JSON:
         print(f"   🔔 Reminders sent: {reminders_sent}")
         
         print(f"\nOverall Status:")
-        print(f"   ✅ Received (HCN): {received}")
-        print(f"   🚨 Critical: {critical}")
-        print(f"   ℹ️  Non Critical: {non_critical}")
-        print(f"   ⏳ Pending: {pending}")
-        print(f"   🔔 Total reminded: {reminded}")
+        print(f"   ✅ Received (HCN): {stats['received']}")
+        print(f"   🚨 Critical: {stats['critical']}")
+        print(f"   ℹ️  Non Critical: {stats['non_critical']}")
+        print(f"   ⏳ Pending: {stats['pending']}")
+        print(f"   🔔 Total reminded: {stats['reminded']}")
         
         # Show critical issues
         critical_rows = relevant[relevant['Issue'] == 'Critical']
@@ -636,31 +1000,21 @@ Respond with ONLY this JSON:
         print("\n" + "="*60)
         print("✅ PROCESS COMPLETE")
         print("="*60)
+        
+        return {
+            'initial_sent': initial_sent,
+            'replies_processed': replies_processed,
+            'reminders_sent': reminders_sent
+        }
     
     def get_summary_stats(self):
         """Get summary statistics as a dictionary (for API)"""
-        df = self.read_excel()
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-
-        total = len(relevant)
-        emailed = int((relevant['EmailSent'] == 'Yes').sum())
-        reminded = int((relevant['ReminderSent'] == 'Yes').sum())
-
-        received = int((relevant['Issue'] == 'Received').sum())
-        critical = int((relevant['Issue'] == 'Critical').sum())
-        non_critical = int((relevant['Issue'] == 'Non Critical').sum())
-        pending = int(relevant['Issue'].isna().sum())
+        stats = self.store.stats()
+        return {key: value for key, value in stats.items() if key != 'breakdowns'}
 
-        return {
-            'total': total,
-            'received': received,
-            'critical': critical,
-            'non_critical': non_critical,
-            'pending': pending,
-            'emailed': emailed,
-            'reminded': reminded
-        }
+    def get_status_breakdowns(self):
+        """Status counts per supplier, hotel and city (for API)"""
+        return self.store.stats()['breakdowns']
 
     def show_status(self):
         """Show current status only"""
@@ -668,37 +1022,27 @@ Respond with ONLY this JSON:
         print("📊 STATUS OVERVIEW")
         print("="*60)
 
-        df = self.read_excel()
-        df['Status_lower'] = df['Status'].str.lower().str.strip()
-        relevant = df[df['Status_lower'].isin(['confirmed', 'vouchered'])]
-
-        total = len(relevant)
-        emailed = (relevant['EmailSent'] == 'Yes').sum()
-        reminded = (relevant['ReminderSent'] == 'Yes').sum()
-
-        received = (relevant['Issue'] == 'Received').sum()
-        critical = (relevant['Issue'] == 'Critical').sum()
-        non_critical = (relevant['Issue'] == 'Non Critical').sum()
-        pending = relevant['Issue'].isna().sum()
+        relevant = self.store.relevant()
+        stats = self.store.stats()
 
-        print(f"\nTotal Confirmed/Vouchered: {total}")
+        print(f"\nTotal Confirmed/Vouchered: {stats['total']}")
         print(f"\n📤 Emails:")
-        print(f"   Initial sent: {emailed}")
-        print(f"   Reminders sent: {reminded}")
+        print(f"   Initial sent: {stats['emailed']}")
+        print(f"   Reminders sent: {stats['reminded']}")
 
         print(f"\n📥 Status (via OpenAI):")
-        print(f"   ✅ Received (HCN): {received}")
-        print(f"   🚨 Critical: {critical}")
-        print(f"   ℹ️  Non Critical: {non_critical}")
-        print(f"   ⏳ Pending: {pending}")
+        print(f"   ✅ Received (HCN): {stats['received']}")
+        print(f"   🚨 Critical: {stats['critical']}")
+        print(f"   ℹ️  Non Critical: {stats['non_critical']}")
+        print(f"   ⏳ Pending: {stats['pending']}")
 
         # Show details
-        if critical > 0:
+        if stats['critical'] > 0:
             print(f"\n🚨 CRITICAL ISSUES:")
             for _, row in relevant[relevant['Issue'] == 'Critical'].iterrows():
                 print(f"   • {row.get('FileNo')} | {row.get('GuestName')} | {row.get('HotelName')}")
 
-        if pending > 0:
+        if stats['pending'] > 0:
             print(f"\n⏳ PENDING (Awaiting reply):")
             pending_rows = relevant[relevant['Issue'].isna()]
             for _, row in pending_rows.head(10).iterrows():
@@ -727,15 +1071,29 @@ def main():
     
     manager = HCNEmailManager()
     
+    # Non-interactive: python sending_update.py send|inbox|reminders|all|status
+    if len(sys.argv) > 1:
+        command = sys.argv[1]
+        if command == 'all':
+            manager.process_all()
+        elif command == 'status':
+            manager.show_status()
+        elif command in STAGES:
+            manager.run_stage(command)
+        else:
+            print(f"Usage: python sending_update.py [{'|'.join(STAGES)}|all|status]")
+        return
+    
     while True:
         print("\n" + "-"*40)
         print("MENU:")
         print("1. Run Process (Send → Check → Remind)")
         print("2. Show Status")
-        print("3. Exit")
+        print("3. Start Scheduler (runs stages automatically)")
+        print("4. Exit")
         print("-"*40)
         
-        choice = input("Choice (1-3): ").strip()
+        choice = input("Choice (1-4): ").strip()
         
         if choice == '1':
             confirm = input("Run full process? (yes/no): ").strip().lower()
@@ -744,6 +1102,16 @@ def main():
         elif choice == '2':
             manager.show_status()
         elif choice == '3':
+            from scheduler import Scheduler
+            scheduler = Scheduler(manager)
+            scheduler.start()
+            print("🕒 Scheduler running (Ctrl+C to return to the menu)")
+            try:
+                while scheduler.running:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                scheduler.stop()
+        elif choice == '4':
             print("Goodbye!")
             break
         else:
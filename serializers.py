@@ -0,0 +1,113 @@
+"""
+JSON serialization of booking DataFrames for HCN Email Management System
+Formats each column once (dates as YYYY-MM-DD, empty cells as '') instead of
+inspecting every cell, and encodes with orjson when it is installed
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Rows encoded per chunk of a streamed response
+STREAM_CHUNK_ROWS = 5000
+
+# infer_dtype results of object columns that cannot hold dates
+_PLAIN_TYPES = ('string', 'empty', 'integer', 'floating', 'mixed-integer-float', 'boolean', 'decimal')
+
+
+def dumps(obj):
+    """Encode to JSON bytes; values JSON does not know are sent as strings"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def _format_value(value):
+    if hasattr(value, 'strftime'):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def format_column(series):
+    """One column as JSON-ready values: dates as text, empty cells as ''"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime(DATE_FORMAT).astype(object).where(series.notna(), '')
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in _PLAIN_TYPES:
+        # Mixed cells (e.g. a date typed into a text column) - the only per-value path
+        series = series.map(_format_value)
+    if series.hasnans:
+        return series.astype(object).where(series.notna(), '')
+    return series
+
+
+def format_record(row):
+    """One {column: value} row as JSON-ready values, by the same rules as format_column"""
+    record = {}
+    for column, value in row.items():
+        if isinstance(value, np.datetime64):
+            value = pd.Timestamp(value)
+        if value is None or pd.isna(value):
+            record[column] = ''
+        elif hasattr(value, 'strftime'):
+            record[column] = value.strftime(DATE_FORMAT)
+        elif isinstance(value, np.generic):
+            record[column] = value.item()
+        else:
+            record[column] = value
+    return record
+
+
+def frame_records(frame):
+    """DataFrame rows as JSON-ready dicts, built from whole formatted columns"""
+    columns = list(frame.columns)
+    values = [format_column(frame[column]).tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def summary_records(relevant):
+    """Rows of /api/bookings/summary: key details of each booking"""
+    def text(column):
+        series = relevant[column]
+        return series.astype(object).where(series.notna(), '').astype(str)
+
+    def day(column):
+        series = pd.to_datetime(relevant[column], errors='coerce')
+        return series.dt.strftime(DATE_FORMAT).astype(object).where(series.notna(), '')
+
+    srno = pd.to_numeric(relevant['SrNo'], errors='coerce')
+    hcn = relevant['SupplierHCN']
+    summary = pd.DataFrame({
+        'booking_id': srno.astype('Int64').astype(object).where(srno.notna(), None),
+        'guest_name': text('GuestName'),
+        'check_in': day('FromDate'),
+        'check_out': day('ToDate'),
+        'hotel_name': text('HotelName'),
+        'city': text('CityName'),
+        'status': text('Status'),
+        'issue': text('Issue'),
+        'has_hcn': hcn.notna() & (hcn.astype(str).str.strip() != '')
+    }, index=relevant.index)
+    return frame_records(summary)
+
+
+def stream_json(envelope, key, records, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Yield `envelope` as JSON with `records` (a list of dicts) as its last
+    field under `key`, encoding chunk_rows records at a time so the first
+    bytes go out before the whole list is encoded.
+    """
+    head = dumps({**envelope, key: []})
+    yield head[:-2]  # everything up to and including the list's '['
+    for start in range(0, len(records), chunk_rows):
+        body = dumps(records[start:start + chunk_rows])[1:-1]
+        yield body if start == 0 else b',' + body
+    yield b']}'
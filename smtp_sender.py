@@ -0,0 +1,109 @@
+"""
+Persistent SMTP sending for HCN Email Management System
+Keeps one authenticated session open across a batch and rate limits sends
+"""
+
+import smtplib
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        if not rate > 0:
+            raise ValueError(f"TokenBucket rate must be positive, not {rate}")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPSender:
+    """
+    Reusable SMTP session.
+
+    Connects (STARTTLS + login) lazily on the first send, reuses the session for
+    every following message and reconnects transparently if the server drops it.
+    Use as a context manager so the session is closed after the batch.
+    """
+
+    def __init__(self, address, password, host='smtp.gmail.com', port=587, rate_limiter=None):
+        self.address = address
+        self.password = password
+        self.host = host
+        self.port = port
+        self.rate_limiter = rate_limiter
+        self.sent_count = 0
+        self._server = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def connect(self):
+        """Open and authenticate a new SMTP session"""
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=60)
+        try:
+            server.starttls()
+            server.login(self.address, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def close(self):
+        """Close the SMTP session if one is open"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+        self._server = None
+
+    def send(self, msg):
+        """Send a message, reconnecting once if the session was dropped"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+
+        with self._lock:
+            if self._server is None:
+                self.connect()
+            try:
+                self._server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.connect()
+                self._server.send_message(msg)
+            except smtplib.SMTPResponseException as e:
+                # 421: server is closing the channel (e.g. per-session message cap)
+                if e.smtp_code != 421:
+                    raise
+                self.connect()
+                self._server.send_message(msg)
+            self.sent_count += 1
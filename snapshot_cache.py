@@ -0,0 +1,158 @@
+"""
+Columnar snapshot of the booking sheet for HCN Email Management System
+Keeps an Arrow IPC (Feather) copy of the parsed sheet next to the workbook so
+loads skip xlsx parsing until the workbook changes
+"""
+
+import json
+import os
+from datetime import date, datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+BOOKING_SNAPSHOT_FILE = "booking_snapshot.arrow"
+
+# Bump when the snapshot layout or the loader's output changes
+SNAPSHOT_FORMAT = 2
+
+# Derived columns added by BookingStore; rebuilt on every load
+_DERIVED_COLUMNS = ['Status_lower']
+
+# Suffix of the timestamp column holding the date cells of a mixed date/text column
+_DATE_PART_SUFFIX = '__dates'
+
+
+def _is_date(value):
+    return isinstance(value, (datetime, date)) and not pd.isna(value)
+
+
+def _arrow_safe(df):
+    """
+    Arrow needs one type per column; object columns mixing e.g. numbers and
+    text (a SupplierRef column with some numeric refs) are stored as text.
+    A column mixing dates and text (FromDate "TBA") is split instead: the
+    text stays in the column and the date cells go to a timestamp column
+    `<col>__dates`, so they come back as Timestamps. Returns (df, split columns).
+    """
+    df = df.drop(columns=[col for col in _DERIVED_COLUMNS if col in df.columns])
+    date_parts = []
+    for col in list(df.columns):
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+            continue
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        is_date = df[col].map(_is_date).astype(bool)
+        if is_date.any():
+            df[col + _DATE_PART_SUFFIX] = pd.to_datetime(df[col].where(is_date, None))
+            df[col] = df[col].where(~is_date, None)
+            date_parts.append(col)
+        df[col] = df[col].map(lambda value: str(value) if pd.notna(value) else None)
+    return df, date_parts
+
+
+def _restore_date_parts(df, date_parts):
+    """Merge the `<col>__dates` columns written by _arrow_safe back into their columns"""
+    for col in date_parts:
+        dates = df.pop(col + _DATE_PART_SUFFIX).astype(object)
+        df[col] = pd.Series(
+            [stamp if not pd.isna(stamp) else None if pd.isna(text) else text
+             for stamp, text in zip(dates, df[col])],
+            index=df.index, dtype=object
+        )
+    return df
+
+
+class SnapshotCache:
+    """
+    Arrow IPC snapshot keyed to the source workbook's path, sheet, mtime and
+    size. The key is stored in the file's schema metadata, so a snapshot is
+    only used while the workbook is unchanged.
+    """
+
+    def __init__(self, source_path, sheet_name, path=BOOKING_SNAPSHOT_FILE):
+        self.source_path = source_path
+        self.sheet_name = sheet_name
+        self.path = path
+
+    def source_key(self):
+        """Identity of the current workbook, or None if it is missing"""
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return None
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'source': os.path.abspath(self.source_path),
+            'sheet': self.sheet_name,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        }
+
+    def _stored_key(self):
+        """Key the snapshot was written for (reads only the schema)"""
+        try:
+            with pa.memory_map(self.path) as source:
+                schema = pa.ipc.open_file(source).schema
+        except (OSError, pa.ArrowInvalid):
+            return None
+        metadata = schema.metadata or {}
+        raw = metadata.get(b'hcn_source')
+        return json.loads(raw) if raw else None
+
+    def is_fresh(self):
+        """True if the snapshot matches the workbook as it is on disk now"""
+        if not PYARROW_AVAILABLE:
+            return False
+        source_key = self.source_key()
+        return source_key is not None and self._stored_key() == source_key
+
+    def load(self):
+        """Return the snapshot as a DataFrame, or None if missing or stale"""
+        if not self.is_fresh():
+            return None
+        table = feather.read_table(self.path, memory_map=True)
+        metadata = table.schema.metadata or {}
+        date_parts = json.loads(metadata.get(b'hcn_date_parts', b'[]'))
+        return _restore_date_parts(table.to_pandas(), date_parts)
+
+    def write(self, df, source_key=None):
+        """
+        Write `df` as the snapshot of the workbook. Pass the source_key() taken
+        before the workbook was read, so a file changed in the meantime is not
+        mistaken for the one `df` came from; defaults to the file as it is now.
+        """
+        if not PYARROW_AVAILABLE:
+            return
+        if source_key is None:
+            source_key = self.source_key()
+        if source_key is None:
+            return
+
+        safe_df, date_parts = _arrow_safe(df)
+        table = pa.Table.from_pandas(safe_df, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'hcn_source'] = json.dumps(source_key).encode('utf-8')
+        metadata[b'hcn_date_parts'] = json.dumps(date_parts).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+
+        # Write then rename so readers never see a half-written file
+        tmp_path = self.path + '.tmp'
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self):
+        """Remove the snapshot"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,26 @@
+"""
+Shared fixtures for the test suite
+"""
+
+from datetime import date, datetime
+
+import pytest
+from openpyxl import Workbook
+
+SHEET_NAME = 'HotelReport (1)'
+
+
+@pytest.fixture
+def mixed_date_workbook(tmp_path):
+    """A small booking sheet whose FromDate column mixes date cells and text"""
+    path = tmp_path / 'bookings.xlsx'
+    wb = Workbook()
+    ws = wb.active
+    ws.title = SHEET_NAME
+    ws.append(['Hotel Report'])
+    ws.append(['FileNo', 'BookingDate', 'GuestName', 'FromDate', 'ToDate', 'Status'])
+    ws.append(['OSTR1', datetime(2025, 12, 1), 'MR. A', datetime(2026, 1, 1), datetime(2026, 1, 3), 'Confirmed'])
+    ws.append(['OSTR2', datetime(2025, 12, 2), 'MR. B', 'TBA', datetime(2026, 1, 5), 'Confirmed'])
+    ws.append(['OSTR3', datetime(2025, 12, 3), 'MR. C', date(2026, 2, 14), datetime(2026, 2, 16), 'Vouchered'])
+    wb.save(path)
+    return str(path)
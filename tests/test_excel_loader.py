@@ -0,0 +1,29 @@
+"""
+Tests for the streaming booking sheet reader
+Run with: python -m pytest tests
+"""
+
+import pandas as pd
+import pytest
+
+from conftest import SHEET_NAME
+from excel_loader import CALAMINE_AVAILABLE, read_bookings
+
+ENGINES = ['openpyxl'] + (['calamine'] if CALAMINE_AVAILABLE else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_mixed_date_column_keeps_text_and_types_dates(mixed_date_workbook, engine):
+    df = read_bookings(mixed_date_workbook, SHEET_NAME, engine=engine)
+
+    assert df.at[0, 'FromDate'] == pd.Timestamp(2026, 1, 1)
+    assert isinstance(df.at[0, 'FromDate'], pd.Timestamp)
+    assert df.at[1, 'FromDate'] == 'TBA'
+    assert isinstance(df.at[2, 'FromDate'], pd.Timestamp)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_all_date_column_becomes_datetime64(mixed_date_workbook, engine):
+    df = read_bookings(mixed_date_workbook, SHEET_NAME, engine=engine)
+    assert pd.api.types.is_datetime64_any_dtype(df['ToDate'])
+    assert pd.api.types.is_datetime64_any_dtype(df['BookingDate'])
@@ -0,0 +1,84 @@
+"""
+Tests for the rule-based HCN extraction
+Run with: python -m pytest tests
+"""
+
+import pytest
+
+from hcn_extractor import extract_hcn, hcn_rejection_reason
+
+BOOKING = {'file_no': 'OSTR100002', 'supplier_ref': 'DIDA77881'}
+
+
+def category(subject, body):
+    result = extract_hcn(subject, body, BOOKING)
+    return result and (result['category'], result['hcn'])
+
+
+@pytest.mark.parametrize('body, hcn', [
+    ('Confirmation No: 12345678', '12345678'),
+    ('HCN - ABC123', 'ABC123'),
+    ('Conf# 991', '991'),
+    ('Hotel confirmation number is X1234', 'X1234'),
+    ('HCN Confirmation no: 4455', '4455'),
+    ('Hotel confirmation no: 4455\nThanks, confirmation no: 4455', '4455'),
+])
+def test_single_labeled_number_is_received(body, hcn):
+    assert category('Re: HCN Request', body) == ('Received', hcn)
+
+
+def test_two_different_numbers_escalate():
+    body = 'Confirmation no: 4455 for the first room\nconfirmation no: 4456 for the second'
+    assert extract_hcn('Re: HCN', body, BOOKING) is None
+
+
+def test_label_does_not_pair_with_the_next_line():
+    # "HCN" ends the subject; "Confirmation" starts the body - neither may hide the real label
+    assert category('Re: HCN', 'Confirmation no: 4455') == ('Received', '4455')
+    assert extract_hcn('Re: HCN', 'Confirmation no: 4455\nconfirmation no: 4456', BOOKING) is None
+    assert extract_hcn('Re: HCN', '2 rooms\nPlease check', BOOKING) is None
+
+
+@pytest.mark.parametrize('value', ['12/03', '12-03', '20-03-2025', '2025/03/20', '12-Mar-2026', '12Mar'])
+def test_date_values_escalate(value):
+    assert extract_hcn('Re: HCN Request', f'HCN {value}', BOOKING) is None
+
+
+@pytest.mark.parametrize('body', [
+    'Confirmation number: pending',
+    'HCN: +91-98765-43210',
+])
+def test_placeholder_and_phone_values_escalate(body):
+    assert extract_hcn('Re: HCN Request', body, BOOKING) is None
+
+
+def test_own_references_are_not_an_hcn():
+    assert category('Re: HCN Request', 'Confirmation no: OSTR100002\nConfirmation no: 556677') == (
+        'Received', '556677'
+    )
+
+
+def test_critical_and_pending_phrases():
+    assert category('Re: HCN Request', 'Sorry, the hotel is sold out.') == ('Critical', None)
+    assert category('Re: HCN Request', 'We will revert shortly.') == ('Non Critical', None)
+    assert extract_hcn('Re: HCN Request', 'There is no rate issue, confirming soon', BOOKING) is None
+
+
+def test_quoted_request_is_ignored():
+    body = 'Confirmation no: 4455\n\nOn Mon, 1 Jan 2026 ops wrote:\n> HCN no: 9999'
+    assert category('Re: HCN Request', body) == ('Received', '4455')
+
+
+@pytest.mark.parametrize('hcn, reason', [
+    ('OSTR100002', 'looks like internal ref'),
+    ('100002', 'matches our FileNo'),
+    ('77881', 'matches SupplierRef'),
+    ('DIDA-55', 'looks like internal ref'),
+])
+def test_rejection_reason(hcn, reason):
+    assert reason in hcn_rejection_reason(hcn, BOOKING['file_no'], BOOKING['supplier_ref'])
+
+
+def test_rejection_reason_accepts_unrelated_number():
+    assert hcn_rejection_reason('556677', BOOKING['file_no'], BOOKING['supplier_ref']) is None
+    assert hcn_rejection_reason('556677', float('nan'), None) is None
@@ -0,0 +1,227 @@
+"""
+Tests for imap_idle against a small in-process IMAP server
+Run with: python -m pytest tests
+"""
+
+import imaplib
+import socketserver
+import threading
+import time
+
+import pytest
+
+import imap_idle
+from imap_idle import InboxListener, idle, new_command_tag
+
+
+class FakeIMAPHandler(socketserver.StreamRequestHandler):
+    """
+    Speaks just enough IMAP4rev1 for imaplib plus IDLE. Each IDLE takes the
+    next behaviour from server.script: 'exists' announces new mail, 'burst'
+    sends the continuation and EXISTS in a single write, 'expunge' sends
+    EXPUNGE then EXISTS in a single write, 'drop' closes the connection,
+    'wait' (the default) waits for DONE.
+    """
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+        self.wfile.flush()
+
+    def handle(self):
+        self.reply('* OK fake IMAP ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, command = line.decode('ascii').split()[:2]
+            command = command.upper()
+            self.server.commands.append(command)
+
+            if command == 'CAPABILITY':
+                self.reply('* CAPABILITY IMAP4rev1 IDLE')
+            elif command == 'SELECT':
+                self.reply('* 3 EXISTS')
+            elif command == 'LOGOUT':
+                self.reply('* BYE logging out')
+                self.reply(f'{tag} OK LOGOUT completed')
+                return
+            elif command == 'IDLE':
+                behaviour = self.server.script.pop(0) if self.server.script else 'wait'
+                if behaviour == 'burst':
+                    self.reply('+ idling\r\n* 4 EXISTS')
+                else:
+                    self.reply('+ idling')
+                if behaviour == 'expunge':
+                    time.sleep(0.05)
+                    self.reply('* 2 EXPUNGE\r\n* 4 EXISTS')
+                if behaviour == 'drop':
+                    return
+                if behaviour == 'exists':
+                    time.sleep(0.05)
+                    self.reply('* 4 EXISTS')
+                done = self.rfile.readline()
+                if not done:
+                    return
+                self.server.commands.append(done.strip().decode('ascii'))
+                self.reply(f'{tag} OK IDLE terminated')
+                continue
+            self.reply(f'{tag} OK {command} completed')
+
+
+@pytest.fixture
+def server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeIMAPHandler)
+    server.daemon_threads = True
+    server.commands = []
+    server.script = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def connect_to(server):
+    def connect():
+        mail = imaplib.IMAP4('127.0.0.1', server.server_address[1])
+        mail.login('user', 'password')
+        mail.select('inbox')
+        return mail
+    return connect
+
+
+class FakeManager:
+    """Counts inbox runs; `done` is set after `runs_wanted` of them"""
+
+    sync_state = object()
+
+    def __init__(self, runs_wanted):
+        self.runs = 0
+        self.runs_wanted = runs_wanted
+        self.done = threading.Event()
+
+    def run_stage(self, stage):
+        self.runs += 1
+        if self.runs >= self.runs_wanted:
+            self.done.set()
+        return {'stage': stage}
+
+
+class RecordingEvent(threading.Event):
+    """Stop event whose waits return at once and are recorded (reconnect backoff)"""
+
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return self.is_set()
+
+
+def make_listener(server, manager, connect=None):
+    listener = InboxListener(manager, idle_timeout=0.5, catchup_interval=3600,
+                             connect=connect or connect_to(server))
+    listener._stop = RecordingEvent()
+
+    # Record why each run happened
+    listener.reasons = []
+    process = listener._process
+
+    def recording_process(reason):
+        listener.reasons.append(reason)
+        process(reason)
+    listener._process = recording_process
+    return listener
+
+
+def test_new_command_tag_falls_back_without_private_api():
+    class Mail:
+        pass
+    first, second = new_command_tag(Mail()), new_command_tag(Mail())
+    assert first.startswith(b'Z') and first != second
+
+
+def test_idle_returns_on_exists_and_sends_done(server):
+    server.script = ['exists']
+    mail = connect_to(server)()
+    assert idle(mail, timeout=5) is True
+    assert server.commands[-2:] == ['IDLE', 'DONE']
+    # The connection is still usable after leaving IDLE
+    assert mail.noop()[0] == 'OK'
+    mail.logout()
+
+
+@pytest.mark.parametrize('behaviour', ['burst', 'expunge'])
+def test_idle_sees_exists_buffered_with_another_line(server, behaviour):
+    # EXISTS arrives in the same write as the line before it, so it is
+    # already in imaplib's buffer when select() would be asked
+    server.script = [behaviour]
+    mail = connect_to(server)()
+    start = time.monotonic()
+    assert idle(mail, timeout=5) is True
+    assert time.monotonic() - start < 1
+    assert server.commands[-2:] == ['IDLE', 'DONE']
+    assert mail.noop()[0] == 'OK'
+    mail.logout()
+
+
+def test_idle_times_out_without_new_mail(server):
+    mail = connect_to(server)()
+    assert idle(mail, timeout=0.2) is False
+    assert server.commands[-1] == 'DONE'
+    mail.logout()
+
+
+def test_idle_raises_abort_when_connection_drops(server):
+    server.script = ['drop']
+    mail = connect_to(server)()
+    with pytest.raises(imaplib.IMAP4.abort):
+        idle(mail, timeout=5)
+
+
+def test_listener_catches_up_then_runs_on_new_mail(server):
+    server.script = ['exists']
+    manager = FakeManager(runs_wanted=2)
+    listener = make_listener(server, manager)
+    listener.start()
+    assert manager.done.wait(10)
+    listener.stop(10)
+
+    assert listener.reasons == ['catch-up', 'new mail']
+    assert 'DONE' in server.commands
+    assert server.commands[-1] == 'LOGOUT'
+    assert not listener.running
+
+
+def test_listener_reconnects_after_drop_and_catches_up(server):
+    server.script = ['drop', 'exists']
+    manager = FakeManager(runs_wanted=3)
+    listener = make_listener(server, manager)
+    listener.start()
+    assert manager.done.wait(10)
+    listener.stop(10)
+
+    assert listener.reasons == ['catch-up', 'catch-up', 'new mail']
+    assert listener.reconnects == 1
+    assert listener._stop.waits[0] == 1
+
+
+def test_listener_backs_off_exponentially_while_unreachable(server, monkeypatch):
+    monkeypatch.setattr(imap_idle, '_MAX_BACKOFF_SECONDS', 8)
+    attempts = []
+    real_connect = connect_to(server)
+
+    def flaky_connect():
+        attempts.append(time.monotonic())
+        return real_connect() if len(attempts) > 5 else None
+
+    manager = FakeManager(runs_wanted=1)
+    listener = make_listener(server, manager, connect=flaky_connect)
+    listener.start()
+    assert manager.done.wait(10)
+    listener.stop(10)
+
+    assert len(attempts) == 6
+    assert listener._stop.waits[:5] == [1, 2, 4, 8, 8]
+    assert listener.last_error == "could not connect"
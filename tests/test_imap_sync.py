@@ -0,0 +1,63 @@
+"""
+Tests for the body-part selection in imap_sync
+Run with: python -m pytest tests
+"""
+
+from imap_sync import fetch_text_bodies, find_text_parts, html_to_text, parse_fetch_response
+
+
+def bodystructure(text):
+    """Parse a BODYSTRUCTURE the way fetch_headers() receives it"""
+    attrs = parse_fetch_response([f'1 (UID 7 BODYSTRUCTURE {text})'.encode()])[0]
+    return attrs['BODYSTRUCTURE']
+
+
+PLAIN = '("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 10 1)'
+HTML = '("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 40 2)'
+PDF = '("APPLICATION" "PDF" ("NAME" "a.pdf") NIL NIL "BASE64" 5000)'
+
+
+class FakeMail:
+    def __init__(self, payload):
+        self.payload = payload
+        self.fetched = []
+
+    def uid(self, command, uid_set, items):
+        self.fetched.append(items)
+        return 'OK', [(f'1 (UID 7 BODY[1] {{{len(self.payload)}}}'.encode(), self.payload), b')']
+
+
+def test_prefers_plain_text_over_html_alternative():
+    structure = bodystructure(f'({PLAIN}{HTML} "ALTERNATIVE")')
+    assert find_text_parts(structure) == [('1', '7bit', 'utf-8', 'plain')]
+
+
+def test_falls_back_to_html_when_there_is_no_plain_part():
+    assert find_text_parts(bodystructure(HTML)) == [('1', 'quoted-printable', 'utf-8', 'html')]
+    assert find_text_parts(bodystructure(f'({HTML}{PDF} "MIXED")')) == [
+        ('1', 'quoted-printable', 'utf-8', 'html')
+    ]
+
+
+def test_html_to_text_drops_markup_and_hidden_content():
+    markup = (
+        '<html><head><style>p {color: red}</style></head><body>'
+        '<p>Dear team,</p><p>Confirmation&nbsp;no: <b>AB1234</b></p><script>x()</script>'
+        '</body></html>'
+    )
+    assert html_to_text(markup) == 'Dear team,\nConfirmation no: AB1234'
+
+
+def test_html_only_reply_body_is_fetched_as_text():
+    mail = FakeMail(b'<div>Confirmation no: =3Cb=3EAB1234=3C/b=3E</div>')
+    entry = {'headers': None, 'parts': find_text_parts(bodystructure(HTML))}
+    bodies, failed = fetch_text_bodies(mail, {7: entry})
+    assert bodies == {7: 'Confirmation no: AB1234'}
+    assert failed == []
+
+
+def test_message_without_text_parts_gets_empty_body():
+    mail = FakeMail(b'')
+    bodies, failed = fetch_text_bodies(mail, {7: {'headers': None, 'parts': []}})
+    assert bodies == {7: ''} and failed == []
+    assert mail.fetched == []
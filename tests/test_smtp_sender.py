@@ -0,0 +1,26 @@
+"""
+Tests for the send rate limiter
+Run with: python -m pytest tests
+"""
+
+import time
+
+import pytest
+
+from smtp_sender import TokenBucket
+
+
+@pytest.mark.parametrize('rate', [0, -1, 0.0])
+def test_token_bucket_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=10)
+
+
+def test_token_bucket_spends_burst_then_waits_for_refill():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.monotonic() - start < 0.01
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.015
@@ -0,0 +1,41 @@
+"""
+Tests for the Arrow snapshot of the booking sheet
+Run with: python -m pytest tests
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from conftest import SHEET_NAME
+from excel_loader import CALAMINE_AVAILABLE, read_bookings
+from snapshot_cache import PYARROW_AVAILABLE, SnapshotCache
+
+pytestmark = pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow is not installed")
+
+ENGINES = ['openpyxl'] + (['calamine'] if CALAMINE_AVAILABLE else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_snapshot_load_matches_cold_load_on_mixed_date_column(mixed_date_workbook, tmp_path, engine):
+    cold = read_bookings(mixed_date_workbook, SHEET_NAME, engine=engine)
+    cache = SnapshotCache(mixed_date_workbook, SHEET_NAME, str(tmp_path / 'snapshot.arrow'))
+    cache.write(cold)
+    warm = cache.load()
+
+    pd.testing.assert_frame_equal(warm, cold)
+    # Date cells still format as dates in the emails, text stays text
+    from_date = warm.at[0, 'FromDate']
+    assert isinstance(from_date, datetime) and from_date.strftime('%d-%b-%Y') == '01-Jan-2026'
+    assert warm.at[1, 'FromDate'] == 'TBA'
+
+
+def test_snapshot_is_stale_after_the_workbook_changes(mixed_date_workbook, tmp_path):
+    cache = SnapshotCache(mixed_date_workbook, SHEET_NAME, str(tmp_path / 'snapshot.arrow'))
+    cache.write(read_bookings(mixed_date_workbook, SHEET_NAME, engine='openpyxl'))
+    assert cache.is_fresh()
+
+    with open(mixed_date_workbook, 'ab') as f:
+        f.write(b'\0')
+    assert cache.load() is None